@@ -0,0 +1,55 @@
+import os
+import time
+from boto3.dynamodb.types import TypeDeserializer
+
+from functions.bootstrap import get_client
+from functions.instrumentation import instrument_handler
+from functions.ticket_archive import write_archive
+
+ARCHIVE_BUCKET = os.environ['TICKET_ARCHIVE_BUCKET']
+
+deserializer = TypeDeserializer()
+
+
+@instrument_handler('archiveExpiredTickets')
+def handler(event, context):
+    """
+    Archive tickets removed from the hot table by DynamoDB TTL.
+    Triggered by the tickets table stream (filtered to TTL deletions); the old images are
+    grouped per user and written to S3 as compressed JSON lines. get_user_tickets only reads
+    them when the client opts in with includeArchived=true.
+    """
+    tickets_by_user = {}
+    records = event.get('Records', [])
+
+    for record in records:
+        if record.get('eventName') != 'REMOVE':
+            continue
+
+        old_image = record.get('dynamodb', {}).get('OldImage')
+        if not old_image:
+            continue
+
+        ticket = {key: deserializer.deserialize(value) for key, value in old_image.items()}
+        tickets_by_user.setdefault(ticket.get('userId', 'unknown'), []).append(ticket)
+
+    if not tickets_by_user:
+        print("Archived 0 expired tickets for 0 users")
+        return {'archived': 0}
+
+    # The archive keys derive from the batch itself, so a retried batch rewrites the same objects
+    first = records[0].get('dynamodb', {})
+    archived_at = first.get('ApproximateCreationDateTime') or time.time()
+    first_sequence = first.get('SequenceNumber', '0')
+    last_sequence = records[-1].get('dynamodb', {}).get('SequenceNumber', first_sequence)
+
+    archived = 0
+    for user_id, tickets in tickets_by_user.items():
+        # Let failures raise so the stream retries the batch instead of losing tickets
+        key = write_archive(get_client('s3'), ARCHIVE_BUCKET, user_id, tickets,
+                            archived_at, first_sequence, last_sequence)
+        archived += len(tickets)
+        print(f"📦 Archived {len(tickets)} tickets for user {user_id} to s3://{ARCHIVE_BUCKET}/{key}")
+
+    print(f"Archived {archived} expired tickets for {len(tickets_by_user)} users")
+    return {'archived': archived}
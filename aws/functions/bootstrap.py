@@ -0,0 +1,79 @@
+import os
+
+import boto3
+from botocore.config import Config
+
+from functions.capacity import instrument_dynamodb
+from functions.instrumentation import instrument_client
+
+# Shared botocore settings: fail fast on a bad connection instead of eating the Lambda timeout,
+# keep connections alive between invocations, and allow enough pooled connections for the
+# parallel writers (verdict_writer.MAX_WRITE_WORKERS) and dispatcher threads
+BOTO_CONFIG = Config(
+    connect_timeout=2,
+    read_timeout=10,
+    retries={'max_attempts': 4, 'mode': 'standard'},
+    max_pool_connections=32,
+    tcp_keepalive=True
+)
+
+HTTP_POOL_SIZE = 16
+
+# Container-scoped; created on first use and reused by every later invocation
+_clients = {}
+_resources = {}
+_tables = {}
+_http_session = None
+
+
+def get_client(service_name):
+    """
+    Low-level boto3 client for the service, created once per container.
+    API calls are timed, and DynamoDB calls also report consumed capacity.
+    """
+    client = _clients.get(service_name)
+    if client is None:
+        client = _clients[service_name] = instrument_client(boto3.client(
+            service_name, region_name=os.environ.get('REGION'), config=BOTO_CONFIG
+        ))
+        if service_name == 'dynamodb':
+            instrument_dynamodb(client)
+    return client
+
+
+def get_resource(service_name):
+    """boto3 resource for the service, created once per container"""
+    resource = _resources.get(service_name)
+    if resource is None:
+        resource = _resources[service_name] = boto3.resource(
+            service_name, region_name=os.environ.get('REGION'), config=BOTO_CONFIG
+        )
+        instrument_client(resource.meta.client)
+        if service_name == 'dynamodb':
+            instrument_dynamodb(resource.meta.client)
+    return resource
+
+
+def get_table(table_name):
+    """DynamoDB Table resource, created once per container"""
+    table = _tables.get(table_name)
+    if table is None:
+        table = _tables[table_name] = get_resource('dynamodb').Table(table_name)
+    return table
+
+
+def get_http_session():
+    """
+    Keep-alive requests session for the results API.
+    requests is only needed by the fetch path, so it is imported on first use.
+    """
+    global _http_session
+    if _http_session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        _http_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        _http_session.mount('https://', adapter)
+        _http_session.mount('http://', adapter)
+    return _http_session
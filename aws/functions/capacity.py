@@ -0,0 +1,60 @@
+from functions.instrumentation import record_capacity
+
+# DynamoDB consumed-capacity accounting. instrument_dynamodb(client) makes every call on the
+# client request ReturnConsumedCapacity=INDEXES and books the reported read and write units
+# on the current invocation per (operation, table, index); instrument_handler emits them
+# with the invocation's timings. GSI/LSI units show up under their index name, the base
+# table under 'table', so index write amplification and scans are visible per call site.
+
+# Operations that accept ReturnConsumedCapacity, and the kind of units they consume
+CAPACITY_OPERATIONS = {
+    'GetItem': 'read', 'Query': 'read', 'Scan': 'read', 'BatchGetItem': 'read', 'TransactGetItems': 'read',
+    'PutItem': 'write', 'UpdateItem': 'write', 'DeleteItem': 'write', 'BatchWriteItem': 'write',
+    'TransactWriteItems': 'write'
+}
+
+BASE_TABLE = 'table'
+
+
+def _request_capacity(params, model, **kwargs):
+    if model.name in CAPACITY_OPERATIONS:
+        params.setdefault('ReturnConsumedCapacity', 'INDEXES')
+
+
+def _units(consumed, kind):
+    """(read, write) units of one ConsumedCapacity entry; plain CapacityUnits go by the operation kind"""
+    read = consumed.get('ReadCapacityUnits')
+    write = consumed.get('WriteCapacityUnits')
+    if read is None and write is None:
+        units = consumed.get('CapacityUnits', 0.0)
+        return (units, 0.0) if kind == 'read' else (0.0, units)
+    return read or 0.0, write or 0.0
+
+
+def book_consumed_capacity(operation, consumed_capacity):
+    """Book a response's ConsumedCapacity (one entry, or a list for batch/transact calls)"""
+    kind = CAPACITY_OPERATIONS.get(operation, 'read')
+    entries = consumed_capacity if isinstance(consumed_capacity, list) else [consumed_capacity]
+    for entry in entries:
+        table_name = entry.get('TableName', 'unknown')
+        indexes = dict(entry.get('GlobalSecondaryIndexes') or {}, **(entry.get('LocalSecondaryIndexes') or {}))
+        # Without a per-table breakdown the total belongs to the base table
+        base = entry.get('Table') or (entry if not indexes else {})
+        if base:
+            record_capacity(operation, table_name, BASE_TABLE, *_units(base, kind))
+        for index_name, consumed in indexes.items():
+            record_capacity(operation, table_name, index_name, *_units(consumed, kind))
+
+
+def _book_response(parsed, model, **kwargs):
+    consumed_capacity = (parsed or {}).get('ConsumedCapacity')
+    if consumed_capacity:
+        book_consumed_capacity(model.name, consumed_capacity)
+
+
+def instrument_dynamodb(client):
+    """Request and book consumed capacity on every call of a DynamoDB client; returns the client"""
+    events = client.meta.events
+    events.register('before-parameter-build.dynamodb', _request_capacity, unique_id='capacity-request')
+    events.register('after-call.dynamodb', _book_response, unique_id='capacity-book')
+    return client
@@ -0,0 +1,122 @@
+import datetime
+import json
+
+from functions.bootstrap import get_client
+from functions.instrumentation import METRICS_NAMESPACE, instrument_handler
+from functions.results_availability import VIETNAM_TZ
+
+# Daily rollup of the per-invocation DynamoDB capacity metrics (capacity.py): sums every
+# (Handler, Operation, TableName, Index) series over one Vietnam calendar day and logs the
+# result as one JSON line, with totals per handler and per table.
+
+CAPACITY_METRICS = ('ReadCapacityUnits', 'WriteCapacityUnits', 'CapacityRequests')
+CAPACITY_DIMENSIONS = ('Handler', 'Operation', 'TableName', 'Index')
+
+# GetMetricData accepts at most 500 queries per request
+METRIC_QUERY_LIMIT = 500
+
+
+def list_capacity_series(cloudwatch):
+    """Every (Handler, Operation, TableName, Index) combination that has capacity metrics"""
+    series = set()
+    paginator = cloudwatch.get_paginator('list_metrics')
+    for page in paginator.paginate(Namespace=METRICS_NAMESPACE, MetricName='CapacityRequests'):
+        for metric in page['Metrics']:
+            dimensions = {d['Name']: d['Value'] for d in metric['Dimensions']}
+            if set(dimensions) == set(CAPACITY_DIMENSIONS):
+                series.add(tuple(dimensions[name] for name in CAPACITY_DIMENSIONS))
+    return sorted(series)
+
+
+def sum_series(cloudwatch, series, start, end):
+    """Returns: {series: {metric name: daily sum}}"""
+    queries = [
+        (key, metric_name)
+        for key in series
+        for metric_name in CAPACITY_METRICS
+    ]
+    totals = {key: dict.fromkeys(CAPACITY_METRICS, 0.0) for key in series}
+
+    for offset in range(0, len(queries), METRIC_QUERY_LIMIT):
+        chunk = queries[offset:offset + METRIC_QUERY_LIMIT]
+        request = [
+            {
+                'Id': f"m{i}",
+                'MetricStat': {
+                    'Metric': {
+                        'Namespace': METRICS_NAMESPACE,
+                        'MetricName': metric_name,
+                        'Dimensions': [{'Name': name, 'Value': value} for name, value in zip(CAPACITY_DIMENSIONS, key)]
+                    },
+                    'Period': 86400,
+                    'Stat': 'Sum'
+                },
+                'ReturnData': True
+            }
+            for i, (key, metric_name) in enumerate(chunk)
+        ]
+        paginator = cloudwatch.get_paginator('get_metric_data')
+        for page in paginator.paginate(MetricDataQueries=request, StartTime=start, EndTime=end):
+            for result in page['MetricDataResults']:
+                key, metric_name = chunk[int(result['Id'][1:])]
+                totals[key][metric_name] += sum(result['Values'])
+
+    return totals
+
+
+def build_rollup(day, totals):
+    rows = []
+    by_handler = {}
+    by_table = {}
+    for (handler_name, operation, table_name, index_name), sums in totals.items():
+        if not sums['CapacityRequests']:
+            continue
+        row = {
+            'handler': handler_name,
+            'operation': operation,
+            'table': table_name,
+            'index': index_name,
+            'readUnits': round(sums['ReadCapacityUnits'], 3),
+            'writeUnits': round(sums['WriteCapacityUnits'], 3),
+            'requests': int(sums['CapacityRequests'])
+        }
+        rows.append(row)
+        for group, name in ((by_handler, handler_name), (by_table, f"{table_name}/{index_name}")):
+            entry = group.setdefault(name, {'readUnits': 0.0, 'writeUnits': 0.0})
+            entry['readUnits'] = round(entry['readUnits'] + row['readUnits'], 3)
+            entry['writeUnits'] = round(entry['writeUnits'] + row['writeUnits'], 3)
+
+    rows.sort(key=lambda row: -(row['readUnits'] + row['writeUnits']))
+    return {
+        'date': day.isoformat(),
+        'readUnits': round(sum(row['readUnits'] for row in rows), 3),
+        'writeUnits': round(sum(row['writeUnits'] for row in rows), 3),
+        'byHandler': by_handler,
+        'byTable': by_table,
+        'rows': rows
+    }
+
+
+@instrument_handler('capacityRollup')
+def handler(event, context):
+    """
+    Roll up yesterday's capacity (Vietnam time), or event['date'] (YYYY-MM-DD).
+    """
+    target_date = (event or {}).get('date')
+    if target_date:
+        day = datetime.date.fromisoformat(target_date)
+    else:
+        day = datetime.datetime.now(VIETNAM_TZ).date() - datetime.timedelta(days=1)
+
+    start = datetime.datetime(day.year, day.month, day.day, tzinfo=VIETNAM_TZ)
+    end = start + datetime.timedelta(days=1)
+
+    cloudwatch = get_client('cloudwatch')
+    series = list_capacity_series(cloudwatch)
+    rollup = build_rollup(day, sum_series(cloudwatch, series, start, end))
+
+    print(json.dumps({'capacityRollup': rollup}))
+    for row in rollup['rows'][:20]:
+        print(f"📦 {row['handler']} {row['operation']} {row['table']}/{row['index']}: "
+              f"R{row['readUnits']:g} W{row['writeUnits']:g} ({row['requests']} requests)")
+    return rollup
@@ -0,0 +1,231 @@
+import json
+from itertools import product
+
+from functions.draw_index import get_draws_index, lookup_number
+from functions.instrumentation import instrument_handler
+from functions.provinces import get_province_key, get_region_from_province
+
+# Upper bound on evaluated combinations (e.g. 6 positions with 4 readings each)
+MAX_CANDIDATES = 4096
+
+
+def validate_digit_confidences(digit_confidences, length):
+    """
+    digitConfidences must be a list of one number in [0, 1] per digit of the ticket number.
+    Returns: the confidences as floats
+    Raises: ValueError otherwise
+    """
+    if not isinstance(digit_confidences, list) or len(digit_confidences) != length:
+        raise ValueError(f'digitConfidences must be a list of {length} numbers, one per digit')
+
+    confidences = []
+    for position, confidence in enumerate(digit_confidences):
+        if isinstance(confidence, bool) or not isinstance(confidence, (int, float)) or not 0 <= confidence <= 1:
+            raise ValueError(f'Invalid digitConfidences value at position {position}: {confidence}')
+        confidences.append(float(confidence))
+    return confidences
+
+
+def build_digit_options(ticket_number, alternatives, digit_confidences=None):
+    """
+    Build the candidate readings for every digit position.
+    alternatives: {position: [{'digit': '7', 'confidence': 0.2}, ...]} (position as int or str)
+    digit_confidences: optional per-position confidence of the digit in ticket_number;
+                       defaults to 1 minus the confidence given to that position's alternatives
+    Returns: list (one entry per position) of [(digit, confidence), ...]
+    Raises: ValueError on malformed input
+    """
+    if digit_confidences is not None:
+        digit_confidences = validate_digit_confidences(digit_confidences, len(ticket_number))
+
+    options = []
+
+    for position, read_digit in enumerate(ticket_number):
+        position_alternatives = alternatives.get(str(position), alternatives.get(position, [])) or []
+
+        readings = {}
+        for alternative in position_alternatives:
+            digit = str(alternative.get('digit', ''))
+            confidence = float(alternative.get('confidence', 0))
+            if len(digit) != 1 or not digit.isdigit() or not 0 <= confidence <= 1:
+                raise ValueError(f'Invalid alternative at position {position}: {alternative}')
+            if digit != read_digit:
+                readings[digit] = max(readings.get(digit, 0), confidence)
+
+        if digit_confidences is not None:
+            read_confidence = digit_confidences[position]
+        else:
+            read_confidence = max(0.0, 1.0 - sum(readings.values()))
+        readings[read_digit] = read_confidence
+
+        options.append(sorted(readings.items(), key=lambda reading: -reading[1]))
+
+    return options
+
+
+def evaluate_candidates(index, province, options):
+    """
+    Evaluate every combination of digit readings against the compiled draw index.
+    Returns: (winning candidates ranked by confidence, number of candidates evaluated)
+    """
+    winners = []
+    evaluated = 0
+
+    for combination in product(*options):
+        evaluated += 1
+        number = ''.join(digit for digit, _ in combination)
+        match = lookup_number(index, number).get(province)
+        if not match:
+            continue
+
+        confidence = 1.0
+        for _, digit_confidence in combination:
+            confidence *= digit_confidence
+
+        winners.append({
+            'ticketNumber': number,
+            'confidence': round(confidence, 6),
+            'prizeCategory': match['category'],
+            'winAmount': match['amount']
+        })
+
+    winners.sort(key=lambda winner: (-winner['confidence'], -winner['winAmount']))
+    return winners, evaluated
+
+
+@instrument_handler('checkOcrCandidates')
+def handler(event, context):
+    """
+    Check all OCR readings of a ticket number against one draw in a single request.
+    Lets the app flag a possible misread (1/7, 0/8, 5/6, ...) without one call per reading.
+    """
+    try:
+        # Parse the request body
+        if isinstance(event.get('body'), str):
+            body = json.loads(event['body'])
+        else:
+            body = event
+
+        ticket_number = str(body.get('ticketNumber') or '').replace(' ', '')
+        province = get_province_key(body.get('province') or '')
+        draw_date = body.get('drawDate')
+        region = body.get('region')
+        if not region or region == 'unknown':
+            region = get_region_from_province(province) if province else None
+
+        if not ticket_number.isdigit() or not province or not draw_date:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Methods': 'OPTIONS,POST'
+                },
+                'body': json.dumps({
+                    'success': False,
+                    'error': 'ticketNumber (digits), province and drawDate are required'
+                })
+            }
+
+        try:
+            options = build_digit_options(ticket_number, body.get('alternatives') or {}, body.get('digitConfidences'))
+        except (TypeError, ValueError, IndexError, AttributeError) as e:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Methods': 'OPTIONS,POST'
+                },
+                'body': json.dumps({
+                    'success': False,
+                    'error': f'Invalid alternatives or digitConfidences: {e}'
+                })
+            }
+
+        # Numbers are matched zero-padded to the region's length; padding digits are certain
+        padding = (5 if region == 'north' else 6) - len(ticket_number)
+        if padding > 0:
+            options = [[('0', 1.0)]] * padding + options
+            ticket_number = ticket_number.zfill(len(options))
+
+        candidate_count = 1
+        for position_options in options:
+            candidate_count *= len(position_options)
+
+        if candidate_count > MAX_CANDIDATES:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Methods': 'OPTIONS,POST'
+                },
+                'body': json.dumps({
+                    'success': False,
+                    'error': f'Too many candidate numbers ({candidate_count}); at most {MAX_CANDIDATES} are allowed'
+                })
+            }
+
+        draws, index = get_draws_index([(province, draw_date)], lambda _: region)
+
+        if (province, draw_date) not in draws:
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Methods': 'OPTIONS,POST'
+                },
+                'body': json.dumps({
+                    'success': True,
+                    'isPending': True,
+                    'candidatesEvaluated': 0,
+                    'winningCandidates': [],
+                    'message': f'Results not yet available for {province} on {draw_date}.'
+                })
+            }
+
+        winners, evaluated = evaluate_candidates(index, province, options)
+        read_number_wins = any(winner['ticketNumber'] == ticket_number for winner in winners)
+
+        print(f"OCR candidates for {ticket_number} ({province}, {draw_date}): {evaluated} evaluated, {len(winners)} winning")
+
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Methods': 'OPTIONS,POST'
+            },
+            'body': json.dumps({
+                'success': True,
+                'isPending': False,
+                'ticketNumber': ticket_number,
+                'isWinner': read_number_wins,
+                'possibleMisread': bool(winners) and not read_number_wins,
+                'candidatesEvaluated': evaluated,
+                'winningCandidates': winners
+            })
+        }
+
+    except Exception as e:
+        print(f"Error checking OCR candidates: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Methods': 'OPTIONS,POST'
+            },
+            'body': json.dumps({
+                'success': False,
+                'error': 'Internal server error'
+            })
+        }
@@ -0,0 +1,325 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from functions.instrumentation import instrument_handler
+from functions.notification_digest import build_digest_custom_data, format_digest_message, get_digest_id, merge_digests
+from functions.notification_queue import MAX_DELAY_SECONDS, build_flush_job, get_notification_queue
+from functions.push_endpoints import publish_to_device
+from functions.storage import get_storage
+
+# Bounded fan-out per invocation; reservedConcurrency on the function caps the container count
+MAX_SEND_WORKERS = 8
+
+# Per-container SNS publish budget (token bucket)
+PUBLISH_RATE_PER_SECOND = float(os.environ.get('PUSH_PUBLISH_RATE', '20'))
+PUBLISH_BURST = int(os.environ.get('PUSH_PUBLISH_BURST', '40'))
+
+# A user's draws for one date settle in separate runs (south, central, north draw an hour
+# apart). Their digests are merged in a per-(userId, drawDate) ledger and sent as one push once
+# a run reports nothing of the user's left pending, or at the latest this long after the first
+# digest arrived. Tickets already pushed are never pushed again.
+DIGEST_MERGE_WINDOW_SECONDS = int(os.environ.get('DIGEST_MERGE_WINDOW', '10800'))
+DIGEST_LEDGER_TTL_SECONDS = 3 * 24 * 3600
+MAX_LEDGER_ATTEMPTS = 5
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+rate_limiter = TokenBucket(PUBLISH_RATE_PER_SECOND, PUBLISH_BURST)
+
+
+def send_digest_notification(digest):
+    """
+    Send push notification to every device of a user about their results for one draw date
+    using AWS SNS.
+    Raises if no device could be reached, so the digest is retried.
+    """
+    user_id = digest['userId']
+    device_tokens = digest['deviceTokens']
+
+    # Skip if no device token
+    if not device_tokens:
+        print(f"⚠️ No device token for user {user_id}, skipping push notification")
+        return None
+
+    title, message = format_digest_message(digest)
+
+    stage = os.environ.get('STAGE', 'dev')
+
+    # Create APNS payload
+    apns_payload = {
+        'aps': {
+            'alert': {
+                'title': title,
+                'body': message
+            },
+            'badge': 1,
+            'sound': 'default'
+        },
+        'custom_data': build_digest_custom_data(digest)
+    }
+
+    # Create message payload for the appropriate platform
+    message_payload = {'default': message}
+
+    if stage == 'prod':
+        message_payload['APNS'] = json.dumps(apns_payload)
+    else:
+        message_payload['APNS_SANDBOX'] = json.dumps(apns_payload)
+
+    responses = []
+    errors = []
+    for device_token in device_tokens:
+        rate_limiter.acquire()
+        try:
+            # Send notification directly to the device's cached endpoint
+            responses.append(publish_to_device(device_token, user_id, json.dumps(message_payload), title))
+        except Exception as e:
+            print(f"❌ Push to a device of user {user_id} failed: {e}")
+            errors.append(e)
+
+    # Retrying after a partial success would push the reached devices twice
+    if not responses:
+        raise errors[0]
+
+    print(f"📲 Push notification sent to user {user_id} ({stage}, {len(responses)} devices): {title}")
+    return responses
+
+
+def _new_ledger(digest_id, now):
+    return {
+        'digestId': digest_id,
+        'version': 0,
+        'digest': None,
+        'sentTicketIds': [],
+        'flushAt': now + DIGEST_MERGE_WINDOW_SECONDS,
+        'flushScheduled': False,
+        'expiresAt': now + DIGEST_LEDGER_TTL_SECONDS
+    }
+
+
+def record_digest(store, digest_id, digest, schedule_flush):
+    """
+    Merge a digest into its ledger, dropping tickets that were already pushed.
+    schedule_flush: function(delay_seconds) queueing a flush job; called once per merge window,
+                    before the ledger records it, so a failed write can only duplicate the job
+    Returns: the updated ledger, or None when every ticket was already pushed
+    """
+    for _ in range(MAX_LEDGER_ATTEMPTS):
+        now = int(time.time())
+        ledger = store.get_digest_ledger(digest_id)
+        expected_version = ledger['version'] if ledger else None
+        ledger = ledger or _new_ledger(digest_id, now)
+
+        pending = merge_digests(ledger['digest'], digest, skip_ticket_ids=ledger['sentTicketIds'])
+        if not pending['tickets']:
+            return None
+
+        updated = dict(ledger, version=ledger['version'] + 1, digest=pending)
+        if ledger['digest'] is None:
+            # First unsent digest since the last push opens a new merge window
+            updated.update(flushAt=now + DIGEST_MERGE_WINDOW_SECONDS, flushScheduled=False)
+        if not updated['flushScheduled']:
+            schedule_flush(updated['flushAt'] - now)
+            updated['flushScheduled'] = True
+
+        if store.put_digest_ledger(updated, expected_version):
+            return updated
+
+    raise RuntimeError(f"Could not record digest {digest_id}: the ledger kept changing")
+
+
+def flush_digest(store, digest_id, force=False):
+    """
+    Push the ledger's pending digest once its merge window has closed (or when forced).
+    The tickets are marked pushed before sending; if the push fails they are put back.
+    Returns: seconds until the window closes if it is still open, else 0
+    """
+    for _ in range(MAX_LEDGER_ATTEMPTS):
+        now = int(time.time())
+        ledger = store.get_digest_ledger(digest_id)
+        if not ledger or not ledger['digest']:
+            return 0
+        if not force and now < ledger['flushAt']:
+            return ledger['flushAt'] - now
+
+        digest = ledger['digest']
+        ticket_ids = [entry['ticketId'] for entry in digest['tickets']]
+        claimed = dict(
+            ledger, version=ledger['version'] + 1, digest=None, flushScheduled=False,
+            sentTicketIds=ledger['sentTicketIds'] + ticket_ids
+        )
+        if not store.put_digest_ledger(claimed, ledger['version']):
+            continue
+
+        try:
+            send_digest_notification(digest)
+        except Exception:
+            release_digest(store, digest_id, digest)
+            raise
+        return 0
+
+    raise RuntimeError(f"Could not flush digest {digest_id}: the ledger kept changing")
+
+
+def release_digest(store, digest_id, digest):
+    """Best effort: put an unsent digest back as pending so the retried job sends it"""
+    ticket_ids = {entry['ticketId'] for entry in digest['tickets']}
+    ledger = store.get_digest_ledger(digest_id)
+    if ledger is None:
+        return
+    restored = dict(
+        ledger, version=ledger['version'] + 1,
+        digest=merge_digests(ledger['digest'], digest),
+        sentTicketIds=[ticket_id for ticket_id in ledger['sentTicketIds'] if ticket_id not in ticket_ids]
+    )
+    if not store.put_digest_ledger(restored, ledger['version']):
+        print(f"⚠️ Could not put digest {digest_id} back; {len(ticket_ids)} tickets will not be pushed")
+
+
+def process_job(job, flush_due=False):
+    """
+    Handle one queued job: merge a digest into its ledger (sending it right away when the
+    producer reported it final), or send a digest whose merge window has closed.
+    flush_due: close every merge window now (local drains have no delayed jobs)
+    Raises on failure so the job is retried.
+    """
+    store = get_storage()
+    queue = get_notification_queue()
+    digest_id = job['digestId']
+
+    if job['type'] == 'digest':
+        force = flush_due or job['final']
+    else:
+        force = flush_due
+
+    def schedule_flush(delay_seconds):
+        # Not needed when the digest is sent right away
+        if not force:
+            queue.send([build_flush_job(digest_id)], delay_seconds=max(1, min(delay_seconds, MAX_DELAY_SECONDS)))
+
+    if job['type'] == 'digest' and record_digest(store, digest_id, job['digest'], schedule_flush) is None:
+        print(f"⏭️ Digest {digest_id}: every ticket was already pushed")
+        return
+
+    # Windows longer than the SQS delay cap are waited out one delayed flush job at a time
+    remaining = flush_digest(store, digest_id, force=force)
+    if remaining and job['type'] == 'flush':
+        schedule_flush(remaining)
+
+
+def normalize_job(job):
+    """Jobs queued before digests were keyed per (userId, drawDate) carry one deviceToken"""
+    if 'type' not in job:
+        digest = job['digest']
+        if 'deviceTokens' not in digest:
+            digest['deviceTokens'] = [digest['deviceToken']] if digest.get('deviceToken') else []
+        job = dict(job, type='digest', final=True, digestId=get_digest_id(digest['userId'], digest['drawDate']))
+    return job
+
+
+def deliver_jobs(jobs, flush_due=False):
+    """
+    Process (key, job) pairs with bounded concurrency.
+    Returns: (set of failed keys, list of delivery latencies in seconds)
+    """
+    failed = set()
+    latencies = []
+    if not jobs:
+        return failed, latencies
+
+    def deliver(job):
+        process_job(normalize_job(job), flush_due=flush_due)
+        return time.time() - job.get('enqueuedAt', time.time())
+
+    with ThreadPoolExecutor(max_workers=min(MAX_SEND_WORKERS, len(jobs))) as executor:
+        futures = {executor.submit(deliver, job): key for key, job in jobs}
+        for future, key in futures.items():
+            try:
+                latencies.append(future.result())
+            except Exception as e:
+                print(f"❌ Notification job {key} failed: {e}")
+                failed.add(key)
+
+    return failed, latencies
+
+
+def report_metrics(delivered, failed, latencies, elapsed):
+    """Log throughput and enqueue-to-delivery latency for the batch"""
+    latencies = sorted(latencies)
+    metrics = {
+        'delivered': delivered,
+        'failed': failed,
+        'throughputPerSecond': round(delivered / elapsed, 2) if elapsed > 0 else delivered,
+        'latencyP50Seconds': round(latencies[len(latencies) // 2], 3) if latencies else None,
+        'latencyMaxSeconds': round(latencies[-1], 3) if latencies else None
+    }
+    print(f"📊 Notification dispatch metrics: {json.dumps(metrics)}")
+    return metrics
+
+
+def drain_queue(queue):
+    """
+    Deliver everything in a local (in-memory) queue; used when no SQS queue is configured.
+    Failed jobs are dropped after logging, there is no dead-letter queue locally.
+    """
+    started = time.time()
+    delivered = failed_count = 0
+    all_latencies = []
+    while len(queue):
+        batch = queue.receive()
+        failed, latencies = deliver_jobs([(job['jobId'], job) for job in batch], flush_due=True)
+        delivered += len(batch) - len(failed)
+        failed_count += len(failed)
+        all_latencies.extend(latencies)
+    return report_metrics(delivered, failed_count, all_latencies, time.time() - started)
+
+
+@instrument_handler('dispatchNotifications')
+def handler(event, context):
+    """
+    Drain notification jobs from SQS.
+    Failed messages are reported back (ReportBatchItemFailures) so only they are retried;
+    after maxReceiveCount attempts SQS moves them to the dead-letter queue.
+    """
+    started = time.time()
+    jobs = []
+    failures = []
+
+    for record in event.get('Records', []):
+        try:
+            jobs.append((record['messageId'], json.loads(record['body'])))
+        except (KeyError, ValueError) as e:
+            # Malformed bodies never succeed; let them go to the dead-letter queue
+            print(f"❌ Malformed notification job {record.get('messageId')}: {e}")
+            failures.append({'itemIdentifier': record.get('messageId')})
+
+    failed, latencies = deliver_jobs(jobs)
+    failures.extend({'itemIdentifier': message_id} for message_id in failed)
+
+    report_metrics(len(jobs) - len(failed), len(failures), latencies, time.time() - started)
+    return {'batchItemFailures': failures}
@@ -0,0 +1,149 @@
+import json
+import os
+from datetime import date, datetime, timedelta, timezone
+
+from functions.provinces import PROVINCE_SCHEDULE, WEEKDAY_NAMES, get_province_key, get_region_from_province
+
+# Vietnam has no daylight saving time, so a fixed UTC+7 offset is exact
+VIETNAM_TZ = timezone(timedelta(hours=7))
+
+# Scheduled draw start (hour, minute) per region, Vietnam time
+REGION_DRAW_TIMES = {
+    'south': (16, 15),
+    'central': (17, 15),
+    'north': (18, 15)
+}
+
+# Holidays and other suspended draws (Tết), see the file for the format
+EXCEPTIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'draw_calendar_exceptions.json')
+
+
+def _load_suspensions(path=EXCEPTIONS_PATH):
+    """
+    Returns: dict of date ordinal -> list of (reason, provinces or None for every province)
+    """
+    suspensions = {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            entries = json.load(f).get('suspensions', [])
+    except FileNotFoundError:
+        print(f"⚠️ Draw calendar exceptions file not found: {path}")
+        return suspensions
+
+    for entry in entries:
+        start = date.fromisoformat(entry['from']).toordinal()
+        end = date.fromisoformat(entry.get('to', entry['from'])).toordinal()
+        provinces = frozenset(get_province_key(p) for p in entry['provinces']) if entry.get('provinces') else None
+        for ordinal in range(start, end + 1):
+            suspensions.setdefault(ordinal, []).append((entry.get('reason', 'suspended'), provinces))
+    return suspensions
+
+
+_suspensions = _load_suspensions()
+
+# date ordinal -> {'draws': {province: draw}, 'suspended': {province: reason}}
+# Filled a whole year at a time on first access, then every lookup is a dict hit
+_calendar = {}
+_built_years = set()
+
+
+def _suspension_reason(ordinal, province):
+    for reason, provinces in _suspensions.get(ordinal, ()):
+        if provinces is None or province in provinces:
+            return reason
+    return None
+
+
+def _build_year(year):
+    day = date(year, 1, 1)
+    while day.year == year:
+        ordinal = day.toordinal()
+        draws = {}
+        suspended = {}
+        for province in PROVINCE_SCHEDULE.get(WEEKDAY_NAMES[day.weekday()], []):
+            reason = _suspension_reason(ordinal, province)
+            if reason:
+                suspended[province] = reason
+                continue
+            region = get_region_from_province(province)
+            hour, minute = REGION_DRAW_TIMES[region]
+            draws[province] = {
+                'province': province,
+                'region': region,
+                'drawTime': datetime(day.year, day.month, day.day, hour, minute, tzinfo=VIETNAM_TZ)
+            }
+        _calendar[ordinal] = {'draws': draws, 'suspended': suspended}
+        day += timedelta(days=1)
+    _built_years.add(year)
+
+
+def _to_date(draw_date):
+    if isinstance(draw_date, str):
+        return date.fromisoformat(draw_date)
+    if isinstance(draw_date, datetime):
+        return draw_date.date()
+    return draw_date
+
+
+def _get_day(draw_date):
+    day = _to_date(draw_date)
+    if day.year not in _built_years:
+        _build_year(day.year)
+    return _calendar[day.toordinal()]
+
+
+def get_draws(draw_date):
+    """Every draw held on the date: list of {'province', 'region', 'drawTime'}"""
+    return list(_get_day(draw_date)['draws'].values())
+
+
+def get_provinces_for_date(draw_date):
+    """Provinces drawing on the date (holiday suspensions excluded)"""
+    return list(_get_day(draw_date)['draws'])
+
+
+def find_draw(province, draw_date):
+    """The province's draw on the date, or None if it doesn't draw (or the draw is suspended)"""
+    return _get_day(draw_date)['draws'].get(get_province_key(province))
+
+
+def get_suspension_reason(province, draw_date):
+    """Why the province's regular draw on the date is not held (e.g. Tết), or None"""
+    return _get_day(draw_date)['suspended'].get(get_province_key(province))
+
+
+def get_region_draw_time(region, draw_date):
+    """Scheduled draw start for the region on the date (Vietnam time)"""
+    hour, minute = REGION_DRAW_TIMES.get(region, REGION_DRAW_TIMES['south'])
+    day = _to_date(draw_date)
+    return datetime(day.year, day.month, day.day, hour, minute, tzinfo=VIETNAM_TZ)
+
+
+def get_first_draw_time(draw_date):
+    """Earliest draw start on the date, or None when nothing is drawn"""
+    draws = get_draws(draw_date)
+    if not draws:
+        return None
+    return min(draw['drawTime'] for draw in draws)
+
+
+def should_province_have_drawing(province, date_str):
+    """
+    Check if a specific province should have had a lottery drawing on the given date.
+    Uses the draw calendar, so suspended draws (Tết) count as no drawing.
+    """
+    try:
+        if find_draw(province, date_str):
+            print(f"✅ Province {province} has drawing on {date_str}")
+            return True
+
+        reason = get_suspension_reason(province, date_str)
+        if reason:
+            print(f"❌ Province {province} drawing on {date_str} suspended ({reason})")
+        else:
+            print(f"❌ Province {province} does not have drawing on {date_str} (provinces drawing: {get_provinces_for_date(date_str)})")
+        return False
+
+    except Exception as e:
+        print(f"Error checking province schedule for {province} on {date_str}: {e}")
+        return False
@@ -0,0 +1,297 @@
+from collections import OrderedDict
+
+from functions.storage import get_storage
+
+# Prize rules per region: number length, payouts, suffix tiers and whether the 6-digit bonuses
+# (PHU_DB, KK) apply. The single source of the payout rules: check_vietnamese_lottery_winner
+# (checkTicket, settleUserTickets, fetchDailyResults) and the compiled indexes (quickCheck,
+# checkOcrCandidates) both derive from them.
+NORTH_RULES = {
+    'digits': 5,
+    'payouts': {
+        'DB': 1000000000,
+        'G1': 10000000, 'G2': 5000000, 'G3': 2000000,
+        'G4': 600000, 'G5': 200000, 'G6': 100000, 'G7': 40000
+    },
+    'tiers': [
+        ('G1', 5), ('G2', 5), ('G3', 5),
+        ('G4', 4), ('G5', 4),
+        ('G6', 3), ('G7', 2)
+    ],
+    'bonuses': False
+}
+
+SOUTH_RULES = {
+    'digits': 6,
+    'payouts': {
+        'DB': 2000000000,
+        'G1': 30000000, 'G2': 15000000, 'G3': 10000000, 'G4': 3000000,
+        'G5': 1000000, 'G6': 400000, 'G7': 200000, 'G8': 100000,
+        'PHU_DB': 50000000, 'KK': 600000
+    },
+    'tiers': [
+        ('G1', 5), ('G2', 5), ('G3', 5), ('G4', 5),
+        ('G5', 4), ('G6', 4),
+        ('G7', 3), ('G8', 2)
+    ],
+    'bonuses': True
+}
+
+PRIZE_RANKS = {
+    'DB': 1, 'PHU_DB': 2,
+    'G1': 3, 'G2': 4, 'G3': 5, 'G4': 6, 'G5': 7, 'G6': 8, 'G7': 9, 'G8': 10,
+    'KK': 11
+}
+
+DB_KEYS = ['DB', 'ĐB', 'dacbiet', 'jackpot']
+
+# Compiled draws kept per container; results never change once stored
+DRAW_CACHE_SIZE = 512
+_draw_cache = OrderedDict()
+# Compiled (merged) indexes keyed by the tuple of draw keys they cover
+INDEX_CACHE_SIZE = 64
+_index_cache = OrderedDict()
+
+
+def get_prize_rules(region):
+    return NORTH_RULES if region == 'north' else SOUTH_RULES
+
+
+def get_prize_data(results):
+    """Extract the prize map from a results item (nested 'prizes' map or flat item)"""
+    if isinstance(results, dict) and 'prizes' in results and isinstance(results['prizes'], dict):
+        return results['prizes']
+    return results
+
+
+def _collect_numbers(prize_data, keys):
+    numbers = []
+    for key in keys:
+        if key in prize_data:
+            value = prize_data[key]
+            if isinstance(value, list):
+                numbers.extend(str(n).replace(' ', '') for n in value)
+            elif isinstance(value, str):
+                numbers.append(value.replace(' ', ''))
+    return numbers
+
+
+def _tier_keys(tier):
+    # Prize maps use 'G1' or 'g1'
+    return [tier, tier.lower()]
+
+
+def check_vietnamese_lottery_winner(ticket_number, prize_data, region, verbose=True):
+    """
+    Check one ticket number against one draw's prize data using Vietnamese lottery rules.
+    verbose: log every match (bulk settlement turns it off)
+    Returns: {'is_winner': bool, 'amount': int, 'category': str}
+    """
+    if not isinstance(prize_data, dict):
+        return {'is_winner': False, 'amount': 0, 'category': ''}
+
+    rules = get_prize_rules(region)
+    digits = rules['digits']
+    payouts = rules['payouts']
+
+    # Normalize ticket number
+    ticket = str(ticket_number).replace(' ', '').zfill(digits)
+    if verbose:
+        print(f"Checking {digits}-digit ticket: {ticket} in {region} region")
+
+    matches = []
+
+    # 1. Exact DB matches
+    db_numbers = [n.zfill(digits) for n in _collect_numbers(prize_data, DB_KEYS)]
+    for db_number in db_numbers:
+        if ticket == db_number:
+            matches.append('DB')
+            if verbose:
+                print(f"✅ DB exact match: {ticket} == {db_number}")
+
+    # 2. Regular tier suffix matches
+    for tier, suffix_length in rules['tiers']:
+        for number in _collect_numbers(prize_data, _tier_keys(tier)):
+            number = number.zfill(digits)
+            if ticket[-suffix_length:] == number[-suffix_length:]:
+                matches.append(tier)
+                if verbose:
+                    print(f"✅ {tier} suffix match: {ticket} ends like {number} (last {suffix_length} digits)")
+
+    # 3. Bonuses (6-digit regions only)
+    if rules['bonuses']:
+        for db_number in db_numbers:
+            # PHU_DB: last 5 digits match DB, first digit differs
+            if len(ticket) == 6 and len(db_number) == 6 and ticket[1:] == db_number[1:] and ticket[0] != db_number[0]:
+                matches.append('PHU_DB')
+                if verbose:
+                    print(f"✅ PHU_DB match: {ticket} vs {db_number} (last 5 same, first diff)")
+
+            # KK: exactly one digit differs from DB
+            if len(ticket) == len(db_number) and sum(a != b for a, b in zip(ticket, db_number)) == 1:
+                matches.append('KK')
+                if verbose:
+                    print(f"✅ KK match: {ticket} vs {db_number} (Hamming distance 1)")
+
+    if not matches:
+        if verbose:
+            print(f"❌ No matches found for ticket {ticket}")
+        return {'is_winner': False, 'amount': 0, 'category': ''}
+
+    # Highest prize (lowest rank) wins
+    best_tier = min(matches, key=PRIZE_RANKS.get)
+    amount = payouts.get(best_tier, 0)
+    if verbose:
+        print(f"🎉 Winner! Best match: {best_tier} for {amount:,} VND")
+
+    return {'is_winner': True, 'amount': amount, 'category': best_tier}
+
+
+def _add_match(table, key, province, tier, payouts):
+    matches = table.setdefault(key, {})
+    rank = PRIZE_RANKS[tier]
+    if province not in matches or rank < matches[province][0]:
+        matches[province] = (rank, tier, payouts.get(tier, 0))
+
+
+def compile_draw_index(draws):
+    """
+    Compile one or more draws into a merged lookup index.
+    draws: iterable of (province, region, prize_data)
+    Every table maps a key derived from the ticket number to {province: (rank, tier, amount)},
+    keeping only the best match per province, so checking a number is a handful of dict lookups
+    regardless of how many draws were merged.
+    """
+    index = {}
+
+    for province, region, prize_data in draws:
+        if not isinstance(prize_data, dict):
+            continue
+
+        rules = get_prize_rules(region)
+        digits = rules['digits']
+        payouts = rules['payouts']
+        part = index.setdefault(digits, {'exact': {}, 'suffix': {}, 'phu_db': {}, 'kk': {}})
+
+        db_numbers = [n.zfill(digits) for n in _collect_numbers(prize_data, DB_KEYS)]
+        for db_number in db_numbers:
+            _add_match(part['exact'], db_number, province, 'DB', payouts)
+
+        for tier, suffix_length in rules['tiers']:
+            suffix_table = part['suffix'].setdefault(suffix_length, {})
+            for number in _collect_numbers(prize_data, _tier_keys(tier)):
+                _add_match(suffix_table, number.zfill(digits)[-suffix_length:], province, tier, payouts)
+
+        if rules['bonuses']:
+            for db_number in db_numbers:
+                # PHU_DB: last 5 digits match DB, first digit differs (keyed by the full ticket)
+                if len(db_number) == 6:
+                    for first_digit in '0123456789':
+                        if first_digit != db_number[0]:
+                            _add_match(part['phu_db'], first_digit + db_number[1:], province, 'PHU_DB', payouts)
+
+                # KK: exactly one digit differs from DB
+                for position, original_digit in enumerate(db_number):
+                    for digit in '0123456789':
+                        if digit != original_digit:
+                            neighbor = db_number[:position] + digit + db_number[position + 1:]
+                            _add_match(part['kk'], neighbor, province, 'KK', payouts)
+
+    return index
+
+
+def lookup_number(index, ticket_number):
+    """
+    Check a ticket number against a compiled index.
+    Returns: dict of province -> {'is_winner': True, 'amount': int, 'category': str}
+             (only provinces where the number wins)
+    """
+    best = {}
+
+    for digits, part in index.items():
+        ticket = str(ticket_number).replace(' ', '').zfill(digits)
+
+        candidates = [part['exact'].get(ticket), part['phu_db'].get(ticket), part['kk'].get(ticket)]
+        for suffix_length, suffix_table in part['suffix'].items():
+            candidates.append(suffix_table.get(ticket[-suffix_length:]))
+
+        for matches in candidates:
+            if not matches:
+                continue
+            for province, match in matches.items():
+                if province not in best or match[0] < best[province][0]:
+                    best[province] = match
+
+    return {
+        province: {'is_winner': True, 'amount': amount, 'category': tier}
+        for province, (rank, tier, amount) in best.items()
+    }
+
+
+def batch_get_draws(draw_keys, keys_only=False):
+    """
+    Load the results item for every (province, date) key from the storage backend.
+    keys_only: project just the key attributes (existence checks)
+    Returns: dict of (province, date) -> results item; missing draws are absent.
+    """
+    return get_storage().batch_get_draws(list(draw_keys), keys_only=keys_only)
+
+
+def put_draw_if_absent(item):
+    """
+    Store a results item unless the draw is already stored.
+    Returns: False if it was already present (a concurrent run stored it first)
+    """
+    return get_storage().put_draw_if_absent(item)
+
+
+def get_cached_draws(draw_keys, region_lookup):
+    """
+    Return (province, region, prize_data) for every stored draw among draw_keys,
+    serving from the container cache and batch-loading only the misses.
+    Draws that are not stored yet are not cached, so they are retried on the next call.
+    region_lookup: function(province) used when the item carries no usable region.
+    """
+    found = {}
+    missing = []
+
+    for draw_key in draw_keys:
+        if draw_key in _draw_cache:
+            _draw_cache.move_to_end(draw_key)
+            found[draw_key] = _draw_cache[draw_key]
+        else:
+            missing.append(draw_key)
+
+    if missing:
+        for draw_key, item in batch_get_draws(missing).items():
+            region = item.get('region')
+            if region not in ('north', 'central', 'south'):
+                region = region_lookup(draw_key[0])
+            entry = (draw_key[0], region, get_prize_data(item))
+            _draw_cache[draw_key] = entry
+            found[draw_key] = entry
+
+        while len(_draw_cache) > DRAW_CACHE_SIZE:
+            _draw_cache.popitem(last=False)
+
+    return found
+
+
+def get_draws_index(draw_keys, region_lookup):
+    """
+    Compiled index over every stored draw among draw_keys, built once per container.
+    Returns: (draws, index) where draws is the dict returned by get_cached_draws
+    """
+    draws = get_cached_draws(draw_keys, region_lookup)
+    cache_key = tuple(sorted(draws))
+
+    index = _index_cache.get(cache_key)
+    if index is None:
+        index = compile_draw_index(draws.values())
+        _index_cache[cache_key] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    else:
+        _index_cache.move_to_end(cache_key)
+
+    return draws, index
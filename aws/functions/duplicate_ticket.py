@@ -1,13 +1,42 @@
 import json
-import uuid
-import boto3
 from datetime import datetime
-from decimal import Decimal
-import os
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(os.environ['DYNAMODB_TICKETS_TABLE'])
+from functions.instrumentation import instrument_handler
+from functions.storage import get_storage
 
+# Attempts when settlement races the quantity update
+MAX_QUANTITY_UPDATE_ATTEMPTS = 3
+
+
+class TicketNotFound(Exception):
+    pass
+
+
+def set_ticket_quantity(ticket_id, quantity):
+    """
+    Set the ticket's quantity, and its totalWinAmount if it is already settled, in one update.
+    The update is conditioned on the settlement state that was read: a pending ticket must still
+    be pending (settlement then computes the total from the new quantity), a settled one keeps its
+    verdict. If settlement lands in between, the ticket is read again.
+    Raises TicketNotFound if the ticket does not exist.
+    """
+    store = get_storage()
+    for attempt in range(MAX_QUANTITY_UPDATE_ATTEMPTS):
+        ticket = store.get_ticket(ticket_id, consistent=True)
+        if ticket is None:
+            raise TicketNotFound(ticket_id)
+
+        # The verdict never changes once written, so a settled ticket's total follows from its winAmount
+        total_win_amount = ticket.get('winAmount', 0) * quantity if 'isWinner' in ticket else None
+        if store.update_ticket_quantity(ticket_id, quantity, datetime.now().isoformat(), total_win_amount):
+            return
+
+        print(f"Ticket {ticket_id} changed while updating its quantity (attempt {attempt + 1})")
+
+    raise RuntimeError(f"Could not update quantity of ticket {ticket_id}: it kept changing")
+
+
+@instrument_handler('duplicateTicket')
 def handler(event, context):
     try:
         # Parse the request body
@@ -49,13 +78,13 @@ def handler(event, context):
                 })
             }
         
-        duplicates_needed = quantity - 1  # Total quantity minus the original
-        print(f"Duplicating ticket {ticket_id}: creating {duplicates_needed} duplicates for total of {quantity}")
+        print(f"Setting quantity of ticket {ticket_id} to {quantity}")
         
-        # Get the original ticket
-        response = table.get_item(Key={'ticketId': ticket_id})
-        
-        if 'Item' not in response:
+        # Record the quantity on the original ticket instead of writing physical copies;
+        # adjudication runs once and multiplies the payout, get_user_tickets reports it per row
+        try:
+            set_ticket_quantity(ticket_id, quantity)
+        except TicketNotFound:
             return {
                 'statusCode': 404,
                 'headers': {
@@ -70,27 +99,6 @@ def handler(event, context):
                 })
             }
         
-        original_ticket = response['Item']
-        duplicates_created = 0
-        
-        # Create duplicates (quantity - 1)
-        for i in range(duplicates_needed):
-            try:
-                # Create new ticket with same data but new ID
-                new_ticket = original_ticket.copy()
-                new_ticket['ticketId'] = str(uuid.uuid4())
-                new_ticket['scannedAt'] = datetime.now().isoformat()
-                new_ticket['isDuplicate'] = True
-                new_ticket['originalTicketId'] = ticket_id
-                
-                # Store the duplicate ticket
-                table.put_item(Item=new_ticket)
-                duplicates_created += 1
-                
-            except Exception as e:
-                print(f"Error creating duplicate {i+1}: {str(e)}")
-                continue
-        
         return {
             'statusCode': 200,
             'headers': {
@@ -101,9 +109,10 @@ def handler(event, context):
             },
             'body': json.dumps({
                 'success': True,
-                'duplicatesCreated': duplicates_created,
+                'duplicatesCreated': 0,  # Copies are no longer stored; see quantity
+                'quantity': quantity,
                 'requestedQuantity': quantity,
-                'totalTickets': duplicates_created + 1  # Include original
+                'totalTickets': quantity
             })
         }
         
@@ -0,0 +1,228 @@
+import random
+import time
+
+from functions.bootstrap import get_client
+
+# Thin data access on the low-level DynamoDB client. Items are decoded straight into plain
+# Python types (numbers become int/float, never Decimal), skipping the resource layer's generic
+# TypeDeserializer and the convert-Decimals pass every handler ran afterwards.
+
+# BatchGetItem accepts at most 100 keys per request
+BATCH_GET_LIMIT = 100
+# Unprocessed keys (throttling) are retried with exponential backoff and jitter
+MAX_BATCH_GET_ATTEMPTS = 6
+BATCH_RETRY_BASE_SECONDS = 0.05
+
+
+class UnprocessedKeysError(Exception):
+    """BatchGetItem still returned unprocessed keys after MAX_BATCH_GET_ATTEMPTS"""
+
+
+def decode_number(text):
+    """DynamoDB number string -> int when integral, else float (same as the old convert_decimals)"""
+    try:
+        return int(text)
+    except ValueError:
+        value = float(text)
+        return int(value) if value.is_integer() else value
+
+
+def decode_value(value):
+    """Decode one AttributeValue ({'S': ...}, {'M': {...}}, ...)"""
+    (tag, data), = value.items()
+    if tag == 'S':
+        return data
+    if tag == 'N':
+        return decode_number(data)
+    if tag == 'M':
+        return {k: decode_value(v) for k, v in data.items()}
+    if tag == 'L':
+        return [decode_value(v) for v in data]
+    if tag == 'BOOL':
+        return data
+    if tag == 'NULL':
+        return None
+    if tag == 'SS':
+        return set(data)
+    if tag == 'NS':
+        return {decode_number(n) for n in data}
+    if tag == 'B':
+        return data
+    if tag == 'BS':
+        return set(data)
+    raise ValueError(f"Unknown DynamoDB type: {tag}")
+
+
+def decode_item(item):
+    """Generic item decoder (tickets, leases, devices)"""
+    return {k: decode_value(v) for k, v in item.items()}
+
+
+def _decode_prizes(prizes):
+    # Prize maps are tier -> list of number strings (or a single string); decode those inline
+    decoded = {}
+    for tier, value in prizes.items():
+        numbers = value.get('L')
+        if numbers is not None and all('S' in n for n in numbers):
+            decoded[tier] = [n['S'] for n in numbers]
+        else:
+            decoded[tier] = decode_value(value)
+    return decoded
+
+
+def decode_results_item(item):
+    """Results item decoder with a fast path for the nested 'prizes' map"""
+    decoded = {}
+    for key, value in item.items():
+        if key == 'prizes' and 'M' in value:
+            decoded[key] = _decode_prizes(value['M'])
+        else:
+            decoded[key] = decode_value(value)
+    return decoded
+
+
+def encode_value(value):
+    """Python value -> AttributeValue"""
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, (int, float)):
+        return {'N': str(value)}
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, dict):
+        return {'M': {k: encode_value(v) for k, v in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {'L': [encode_value(v) for v in value]}
+    if isinstance(value, (bytes, bytearray)):
+        return {'B': bytes(value)}
+    # Decimal from resource-layer code paths
+    return {'N': str(value)}
+
+
+def encode_item(item):
+    """Python dict -> DynamoDB item (also used for keys)"""
+    return {k: encode_value(v) for k, v in item.items()}
+
+
+def encode_key(key):
+    return encode_item(key)
+
+
+def build_projection(attributes):
+    """
+    ProjectionExpression for the attribute names; every name goes through a placeholder
+    so reserved words ('date', 'status', ...) need no special casing.
+    Returns: dict of request parameters, empty when attributes is None
+    """
+    if not attributes:
+        return {}
+    names = {f"#p{i}": name for i, name in enumerate(attributes)}
+    return {
+        'ProjectionExpression': ', '.join(names),
+        'ExpressionAttributeNames': names
+    }
+
+
+def get_item(table_name, key, attributes=None, decoder=decode_item, consistent=False):
+    """Single item (decoded) or None"""
+    response = get_client('dynamodb').get_item(
+        TableName=table_name,
+        Key=encode_key(key),
+        ConsistentRead=consistent,
+        **build_projection(attributes)
+    )
+    item = response.get('Item')
+    return decoder(item) if item is not None else None
+
+
+def batch_get_items(table_name, keys, attributes=None, decoder=decode_item):
+    """
+    BatchGetItem in chunks of 100, retrying unprocessed keys with exponential backoff and jitter.
+    Returns: list of decoded items (order is not preserved; missing keys are absent)
+    Raises: UnprocessedKeysError if keys are still unprocessed after MAX_BATCH_GET_ATTEMPTS, so
+            callers never mistake a throttled key for a missing item
+    """
+    dynamodb = get_client('dynamodb')
+    keys = list(keys)
+    items = []
+
+    for start in range(0, len(keys), BATCH_GET_LIMIT):
+        request_items = {
+            table_name: dict(
+                Keys=[encode_key(key) for key in keys[start:start + BATCH_GET_LIMIT]],
+                **build_projection(attributes)
+            )
+        }
+        # Unprocessed keys are returned when the request is throttled
+        for attempt in range(MAX_BATCH_GET_ATTEMPTS):
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            items.extend(decoder(item) for item in response.get('Responses', {}).get(table_name, []))
+            request_items = response.get('UnprocessedKeys') or {}
+            if not request_items or attempt == MAX_BATCH_GET_ATTEMPTS - 1:
+                break
+            delay = BATCH_RETRY_BASE_SECONDS * (2 ** attempt)
+            print(f"⚠️ {len(request_items[table_name]['Keys'])} unprocessed keys, retrying in {delay:.2f}s")
+            time.sleep(delay + random.uniform(0, delay))
+
+        if request_items:
+            raise UnprocessedKeysError(
+                f"{len(request_items[table_name]['Keys'])} keys of {table_name} still unprocessed "
+                f"after {MAX_BATCH_GET_ATTEMPTS} attempts"
+            )
+
+    return items
+
+
+def query_page(table_name, key_name, key_value, index_name=None, attributes=None, decoder=decode_item,
+               scan_forward=True, limit=None, start_key=None, filter_expression=None, filter_values=None):
+    """
+    One Query page for key_name = key_value (table or GSI).
+    Limit counts evaluated items, before filter_expression is applied, as DynamoDB does.
+    filter_values: {':placeholder': python value} used by filter_expression
+    Returns: (decoded items, decoded LastEvaluatedKey or None)
+    """
+    values = {':k': encode_value(key_value)}
+    values.update({name: encode_value(value) for name, value in (filter_values or {}).items()})
+    projection = build_projection(attributes)
+    params = {
+        'TableName': table_name,
+        'KeyConditionExpression': '#k = :k',
+        'ExpressionAttributeNames': dict(projection.get('ExpressionAttributeNames', {}), **{'#k': key_name}),
+        'ExpressionAttributeValues': values,
+        'ScanIndexForward': scan_forward
+    }
+    if projection:
+        params['ProjectionExpression'] = projection['ProjectionExpression']
+    if index_name:
+        params['IndexName'] = index_name
+    if limit:
+        params['Limit'] = limit
+    if start_key:
+        params['ExclusiveStartKey'] = encode_key(start_key)
+    if filter_expression:
+        params['FilterExpression'] = filter_expression
+
+    response = get_client('dynamodb').query(**params)
+    last_key = response.get('LastEvaluatedKey')
+    return [decoder(item) for item in response.get('Items', [])], decode_item(last_key) if last_key else None
+
+
+def query_items(table_name, key_name, key_value, index_name=None, attributes=None,
+                decoder=decode_item, scan_forward=True, filter_expression=None, filter_values=None):
+    """
+    Every item with key_name = key_value (table or GSI), following LastEvaluatedKey.
+    Returns: list of decoded items
+    """
+    items = []
+    start_key = None
+    while True:
+        page, start_key = query_page(
+            table_name, key_name, key_value, index_name=index_name, attributes=attributes,
+            decoder=decoder, scan_forward=scan_forward, start_key=start_key,
+            filter_expression=filter_expression, filter_values=filter_values
+        )
+        items.extend(page)
+        if not start_key:
+            return items
@@ -1,12 +1,54 @@
 import json
-import boto3
 import os
-from decimal import Decimal
-from boto3.dynamodb.conditions import Key
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(os.environ['DYNAMODB_TICKETS_TABLE'])
+from functions.bootstrap import get_client
+from functions.instrumentation import instrument_handler
+from functions.storage import get_storage
+from functions.ticket_archive import read_archived_tickets
 
+ARCHIVE_BUCKET = os.environ.get('TICKET_ARCHIVE_BUCKET')
+
+def expand_ticket_quantities(tickets):
+    """
+    Expand quantity-aware ticket records into one entry per physical ticket for display.
+    Every entry keeps the stored ticketId, so checkTicket/duplicateTicket work on any of them;
+    copies are told apart by copyNumber (1..quantity) and carry isDuplicate and originalTicketId
+    like the legacy duplicate rows.
+    """
+    expanded = []
+    for ticket in tickets:
+        quantity = int(ticket.get('quantity', 1))
+        if quantity <= 1:
+            expanded.append(ticket)
+            continue
+        expanded.append(dict(ticket, copyNumber=1))
+        for copy_number in range(2, quantity + 1):
+            copy = dict(ticket)
+            copy['copyNumber'] = copy_number
+            copy['isDuplicate'] = True
+            copy['originalTicketId'] = ticket['ticketId']
+            expanded.append(copy)
+    return expanded
+
+def merge_archived_tickets(tickets, user_id):
+    """
+    Append the user's archived (TTL-expired) tickets from S3, once per ticketId.
+    A ticket present in both tiers keeps its hot copy.
+    """
+    if not ARCHIVE_BUCKET:
+        return tickets
+
+    try:
+        archived = read_archived_tickets(get_client('s3'), ARCHIVE_BUCKET, user_id)
+    except Exception as e:
+        # History still works from the hot tier alone
+        print(f"⚠️ Could not read archived tickets for user {user_id}: {e}")
+        return tickets
+
+    hot_ids = {ticket.get('ticketId') for ticket in tickets}
+    return tickets + [ticket for ticket in archived if ticket.get('ticketId') not in hot_ids]
+
+@instrument_handler('getUserTickets')
 def handler(event, context):
     try:
         # Debug minimal request info
@@ -57,27 +99,24 @@ def handler(event, context):
         
         print(f"Fetching tickets for user: {user_id}")
         
-        # Query using the UserIndex GSI
-        response = table.query(
-            IndexName='UserIndex',
-            KeyConditionExpression=Key('userId').eq(user_id),
-            ScanIndexForward=False
-        )
-        
-        tickets = response.get('Items', [])
+        # Query the UserIndex GSI page by page; items come back with plain int/float numbers for JSON
+        tickets = []
+        start_key = None
+        while True:
+            items, start_key = get_storage().query_user_tickets(user_id, start_key=start_key)
+            tickets.extend(items)
+            if not start_key:
+                break
         
-        # Convert Decimal types to regular types for JSON serialization
-        def convert_decimals(obj):
-            if isinstance(obj, list):
-                return [convert_decimals(i) for i in obj]
-            elif isinstance(obj, dict):
-                return {k: convert_decimals(v) for k, v in obj.items()}
-            elif isinstance(obj, Decimal):
-                return int(obj) if obj % 1 == 0 else float(obj)
-            else:
-                return obj
+        # Settled tickets older than ARCHIVE_AFTER_DAYS live in the S3 archive; reading it costs
+        # one S3 request per archive object, so clients opt in with includeArchived=true
+        qs = event.get('queryStringParameters') or {}
+        if str(qs.get('includeArchived', 'false')).lower() == 'true':
+            tickets = merge_archived_tickets(tickets, user_id)
         
-        tickets = convert_decimals(tickets)
+        # Expand quantity records for display unless the client asks for the compact form
+        if str(qs.get('expand', 'true')).lower() != 'false':
+            tickets = expand_ticket_quantities(tickets)
         
         print(f"Found {len(tickets)} tickets for user {user_id}")
         
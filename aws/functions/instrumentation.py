@@ -0,0 +1,297 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-invocation timings of handlers and downstream calls.
+# - instrument_handler(name) wraps a Lambda handler: it opens an invocation, and on exit emits
+#   one record per operation and optionally adds a Server-Timing header to the response
+# - timed(operation) / instrumented(operation) time a block or a function
+# - instrument_client(client) times every AWS API call of a botocore client (bootstrap installs
+#   it on each client it creates), as '<service>.<Operation>'
+# - record_capacity() books DynamoDB consumed capacity (see capacity.py), emitted alongside
+# Sinks (METRICS_SINK): 'emf' writes CloudWatch Embedded Metric Format JSON lines to stdout,
+# which CloudWatch turns into metrics; 'console' prints a one-line summary; 'off' disables.
+# Default is emf inside Lambda and console elsewhere.
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'XoSo')
+METRICS_SINK = os.environ.get(
+    'METRICS_SINK', 'emf' if os.environ.get('AWS_LAMBDA_FUNCTION_NAME') else 'console'
+)
+SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', 'false').lower() == 'true'
+
+# EMF accepts at most 100 values per metric in one document
+EMF_MAX_VALUES = 100
+
+
+class Invocation:
+    """
+    Durations, counts and error classes per operation for one handler invocation,
+    plus DynamoDB capacity units per (operation, table, index)
+    """
+
+    def __init__(self, handler_name):
+        self.handler_name = handler_name
+        self.lock = threading.Lock()
+        self.operations = {}
+        self.capacity = {}
+
+    def record(self, operation, duration_ms, error=None):
+        with self.lock:
+            stats = self.operations.get(operation)
+            if stats is None:
+                stats = self.operations[operation] = {'durations': [], 'errors': {}}
+            stats['durations'].append(duration_ms)
+            if error:
+                stats['errors'][error] = stats['errors'].get(error, 0) + 1
+
+    def record_capacity(self, operation, table_name, index_name, read_units, write_units):
+        with self.lock:
+            units = self.capacity.get((operation, table_name, index_name))
+            if units is None:
+                units = self.capacity[(operation, table_name, index_name)] = {'read': 0.0, 'write': 0.0, 'requests': 0}
+            units['read'] += read_units
+            units['write'] += write_units
+            units['requests'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: {'durations': list(stats['durations']), 'errors': dict(stats['errors'])}
+                for name, stats in self.operations.items()
+            }
+
+    def snapshot_capacity(self):
+        with self.lock:
+            return {key: dict(units) for key, units in self.capacity.items()}
+
+
+# Lambda runs one invocation per container at a time, so worker threads a handler starts
+# (parallel writers, notification senders) record into the most recently started invocation;
+# the thread-local keeps concurrent in-process harness runs apart on their own threads.
+_local = threading.local()
+_active = None
+
+
+def current_invocation():
+    return getattr(_local, 'invocation', None) or _active
+
+
+def record(operation, duration_ms, error=None):
+    """Record one timed operation in the current invocation (no-op outside a handler)"""
+    invocation = current_invocation()
+    if invocation is not None:
+        invocation.record(operation, duration_ms, error)
+
+
+def record_capacity(operation, table_name, index_name, read_units, write_units):
+    """Book DynamoDB capacity units in the current invocation (no-op outside a handler)"""
+    invocation = current_invocation()
+    if invocation is not None:
+        invocation.record_capacity(operation, table_name, index_name, read_units, write_units)
+
+
+@contextmanager
+def timed(operation):
+    """Time the block as operation; an exception is recorded by class name and re-raised"""
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        record(operation, (time.perf_counter() - start) * 1000, error)
+
+
+def instrumented(operation):
+    """Decorator form of timed()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(operation):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# botocore hooks: the request context dict travels from before-call to after-call
+
+def _before_call(context, **kwargs):
+    context['instrumentationStart'] = time.perf_counter()
+
+
+def _after_call(http_response, parsed, model, context, **kwargs):
+    start = context.pop('instrumentationStart', None)
+    if start is None:
+        return
+    error = (parsed or {}).get('Error', {}).get('Code') if http_response.status_code >= 400 else None
+    record(f"{model.service_model.service_name}.{model.name}", (time.perf_counter() - start) * 1000, error)
+
+
+def _after_call_error(exception, model, context, **kwargs):
+    start = context.pop('instrumentationStart', None)
+    if start is not None:
+        record(f"{model.service_model.service_name}.{model.name}", (time.perf_counter() - start) * 1000,
+               type(exception).__name__)
+
+
+def instrument_client(client):
+    """Time every API call of a botocore client; returns the client"""
+    events = client.meta.events
+    events.register('before-call', _before_call, unique_id='instrumentation-before-call')
+    events.register('after-call', _after_call, unique_id='instrumentation-after-call')
+    events.register('after-call-error', _after_call_error, unique_id='instrumentation-after-call-error')
+    return client
+
+
+def _status_error(response):
+    status = response.get('statusCode') if isinstance(response, dict) else None
+    if isinstance(status, int) and status >= 500:
+        return f"Status{status}"
+    return None
+
+
+def build_emf_records(handler_name, operations, timestamp_ms=None):
+    """EMF documents, one per operation (more when an operation has over 100 samples)"""
+    timestamp_ms = timestamp_ms or int(time.time() * 1000)
+    records = []
+    for operation, stats in operations.items():
+        durations = stats['durations']
+        for start in range(0, len(durations), EMF_MAX_VALUES):
+            first = start == 0
+            metrics = [{'Name': 'Duration', 'Unit': 'Milliseconds'}]
+            document = {
+                '_aws': {
+                    'Timestamp': timestamp_ms,
+                    'CloudWatchMetrics': [{
+                        'Namespace': METRICS_NAMESPACE,
+                        'Dimensions': [['Handler', 'Operation']],
+                        'Metrics': metrics
+                    }]
+                },
+                'Handler': handler_name,
+                'Operation': operation,
+                'Duration': [round(d, 3) for d in durations[start:start + EMF_MAX_VALUES]]
+            }
+            # Counts go on the first document only so chunked operations aren't double counted
+            if first:
+                metrics.extend([{'Name': 'Count', 'Unit': 'Count'}, {'Name': 'Errors', 'Unit': 'Count'}])
+                document['Count'] = len(durations)
+                document['Errors'] = sum(stats['errors'].values())
+                if stats['errors']:
+                    document['ErrorClasses'] = stats['errors']
+            records.append(document)
+    return records
+
+
+def build_capacity_emf_records(handler_name, capacity, timestamp_ms=None):
+    """EMF documents, one per (operation, table, index) with the units consumed"""
+    timestamp_ms = timestamp_ms or int(time.time() * 1000)
+    return [
+        {
+            '_aws': {
+                'Timestamp': timestamp_ms,
+                'CloudWatchMetrics': [{
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [['Handler', 'Operation', 'TableName', 'Index'], ['TableName', 'Index']],
+                    'Metrics': [
+                        {'Name': 'ReadCapacityUnits', 'Unit': 'Count'},
+                        {'Name': 'WriteCapacityUnits', 'Unit': 'Count'},
+                        {'Name': 'CapacityRequests', 'Unit': 'Count'}
+                    ]
+                }]
+            },
+            'Handler': handler_name,
+            'Operation': f"dynamodb.{operation}",
+            'TableName': table_name,
+            'Index': index_name,
+            'ReadCapacityUnits': round(units['read'], 3),
+            'WriteCapacityUnits': round(units['write'], 3),
+            'CapacityRequests': units['requests']
+        }
+        for (operation, table_name, index_name), units in capacity.items()
+    ]
+
+
+def format_capacity_summary(capacity):
+    parts = []
+    for (operation, table_name, index_name), units in sorted(capacity.items(), key=lambda item: -(item[1]['read'] + item[1]['write'])):
+        parts.append(f"{operation} {table_name}/{index_name} R{units['read']:g} W{units['write']:g}")
+    return ' | '.join(parts)
+
+
+def format_console_summary(handler_name, operations):
+    parts = []
+    for operation, stats in sorted(operations.items(), key=lambda item: -sum(item[1]['durations'])):
+        durations = stats['durations']
+        part = f"{operation} {len(durations)}× {sum(durations):.1f} ms"
+        if stats['errors']:
+            part += f" (errors: {', '.join(f'{k}={v}' for k, v in stats['errors'].items())})"
+        parts.append(part)
+    return f"⏱️ {handler_name}: " + ' | '.join(parts)
+
+
+def format_server_timing(operations):
+    """
+    Server-Timing header value: the handler total, then the summed duration per operation,
+    slowest first (calls made from worker threads overlap, so operations can add up to more)
+    """
+    ordered = sorted(operations.items(), key=lambda item: (item[0] != 'handler', -sum(item[1]['durations'])))
+    entries = []
+    for operation, stats in ordered:
+        name = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in operation)
+        calls = len(stats['durations'])
+        entries.append(f'{name};dur={sum(stats["durations"]):.1f};desc="{calls} call{"s" if calls != 1 else ""}"')
+    return ', '.join(entries)
+
+
+def emit(handler_name, operations, capacity=None):
+    if METRICS_SINK == 'emf':
+        for document in build_emf_records(handler_name, operations) + build_capacity_emf_records(handler_name, capacity or {}):
+            print(json.dumps(document))
+    elif METRICS_SINK == 'console':
+        print(format_console_summary(handler_name, operations))
+        if capacity:
+            print(f"📦 {handler_name} capacity: {format_capacity_summary(capacity)}")
+
+
+def instrument_handler(handler_name):
+    """
+    Wrap a Lambda handler: time it and its downstream calls and emit the invocation's
+    metrics when it returns. Instrumentation failures never fail the handler.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            global _active
+            invocation = Invocation(handler_name)
+            _local.invocation = invocation
+            _active = invocation
+            start = time.perf_counter()
+            response = None
+            error = None
+            try:
+                response = handler(event, context)
+                error = _status_error(response)
+                return response
+            except Exception as e:
+                error = type(e).__name__
+                raise
+            finally:
+                invocation.record('handler', (time.perf_counter() - start) * 1000, error)
+                _local.invocation = None
+                if _active is invocation:
+                    _active = None
+                try:
+                    operations = invocation.snapshot()
+                    if METRICS_SINK != 'off':
+                        emit(handler_name, operations, invocation.snapshot_capacity())
+                    if SERVER_TIMING and isinstance(response, dict) and isinstance(response.get('headers'), dict):
+                        response['headers']['Server-Timing'] = format_server_timing(operations)
+                except Exception as e:
+                    print(f"⚠️ Could not emit metrics for {handler_name}: {e}")
+        return wrapper
+    return decorator
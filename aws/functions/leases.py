@@ -0,0 +1,97 @@
+import threading
+import uuid
+
+from functions.provinces import get_province_key
+from functions.storage import get_storage
+
+# Per-(draw date, province) adjudication leases, so the processWinners cron and concurrent
+# fetchDailyResults runs split the draws between them instead of settling the same tickets
+LEASE_DURATION_SECONDS = 60
+LEASE_HEARTBEAT_SECONDS = 15
+
+
+def new_lease_owner():
+    return str(uuid.uuid4())
+
+
+def get_draw_lease_id(draw_date, province):
+    return f"adjudicate#{draw_date}#{get_province_key(province)}"
+
+
+def acquire_lease(lease_id, owner, duration=LEASE_DURATION_SECONDS):
+    """
+    Take the lease if it is free or expired.
+    Returns: True if this owner now holds it
+    """
+    return get_storage().acquire_lease(lease_id, owner, duration)
+
+
+def renew_lease(lease_id, owner, duration=LEASE_DURATION_SECONDS):
+    """Extend a lease this owner still holds. Returns False if it was lost."""
+    return get_storage().renew_lease(lease_id, owner, duration)
+
+
+def get_lease(lease_id):
+    """Returns: the lease item (owner, expiresAt, heartbeatAt) or None; it may already have expired"""
+    return get_storage().get_lease(lease_id)
+
+
+def release_lease(lease_id, owner):
+    """Delete the lease if this owner still holds it"""
+    get_storage().release_lease(lease_id, owner)
+
+
+class LeaseHeartbeat:
+    """
+    Keep a set of held leases alive from a background thread while the with-block runs,
+    and release them on exit.
+    """
+
+    def __init__(self, lease_ids, owner, interval=LEASE_HEARTBEAT_SECONDS):
+        self.lease_ids = set(lease_ids)
+        self.owner = owner
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            for lease_id in list(self.lease_ids):
+                try:
+                    if not renew_lease(lease_id, self.owner):
+                        print(f"⚠️ Lost lease {lease_id}")
+                        self.lease_ids.discard(lease_id)
+                except Exception as e:
+                    print(f"⚠️ Lease heartbeat failed for {lease_id}: {e}")
+
+    def __enter__(self):
+        if self.lease_ids:
+            self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        for lease_id in self.lease_ids:
+            try:
+                release_lease(lease_id, self.owner)
+            except Exception as e:
+                # It expires on its own
+                print(f"⚠️ Could not release lease {lease_id}: {e}")
+        return False
+
+
+def acquire_draw_leases(draw_keys, owner):
+    """
+    Try to take the lease of every (province, draw_date) key.
+    Returns: {key: lease_id} for the leases now held
+    """
+    held = {}
+    for province, draw_date in draw_keys:
+        lease_id = get_draw_lease_id(draw_date, province)
+        if acquire_lease(lease_id, owner):
+            held[(province, draw_date)] = lease_id
+        else:
+            print(f"⏭️ {province} on {draw_date} is being processed by another run")
+    return held
@@ -0,0 +1,123 @@
+def format_vnd(amount):
+    return f"{amount:,.0f}".replace(',', '.')
+
+
+def get_digest_id(user_id, draw_date):
+    """One digest (and one push) per user per draw date, whichever runs settle its tickets"""
+    return f"digest#{user_id}#{draw_date}"
+
+
+def _new_digest(user_id, draw_date):
+    return {
+        'userId': user_id,
+        'drawDate': draw_date,
+        'deviceTokens': [],
+        'tickets': [],
+        'ticketCount': 0,
+        'winningTicketCount': 0,
+        'totalWinAmount': 0
+    }
+
+
+def _add_ticket(digest, entry):
+    digest['tickets'].append(entry)
+    digest['ticketCount'] += entry['quantity']
+    if entry['isWinner']:
+        digest['winningTicketCount'] += entry['quantity']
+        digest['totalWinAmount'] += entry['winAmount']
+
+
+def _add_device_token(digest, device_token):
+    if device_token and device_token not in digest['deviceTokens']:
+        digest['deviceTokens'].append(device_token)
+
+
+def collect_user_digests(verdicts):
+    """
+    Fold per-ticket verdicts into one digest per (userId, drawDate); the push goes to every
+    device the user stored those tickets from.
+    verdicts: iterable of (ticket, is_winner, total_win_amount, prize_category)
+    Returns: list of digest dicts, in first-seen order
+    """
+    digests = {}
+    for ticket, is_winner, total_win_amount, prize_category in verdicts:
+        key = (ticket['userId'], ticket.get('drawDate', 'Unknown'))
+        digest = digests.get(key)
+        if digest is None:
+            digest = digests[key] = _new_digest(*key)
+
+        _add_device_token(digest, ticket.get('deviceToken', ''))
+        _add_ticket(digest, {
+            'ticketId': ticket['ticketId'],
+            'ticketNumber': ticket.get('ticketNumber', 'Unknown'),
+            'province': ticket.get('province', 'Unknown'),
+            'quantity': int(ticket.get('quantity', 1)),
+            'isWinner': is_winner,
+            'winAmount': total_win_amount if is_winner else 0,
+            'prizeCategory': prize_category
+        })
+
+    return list(digests.values())
+
+
+def merge_digests(digest, other, skip_ticket_ids=()):
+    """
+    Merge two digests of the same (userId, drawDate), once per ticketId.
+    digest may be None; tickets in skip_ticket_ids (already notified) are left out.
+    Returns: the merged digest (a new dict)
+    """
+    merged = _new_digest(other['userId'], other['drawDate'])
+    seen = set(skip_ticket_ids)
+    for source in (digest, other):
+        if source is None:
+            continue
+        for device_token in source['deviceTokens']:
+            _add_device_token(merged, device_token)
+        for entry in source['tickets']:
+            if entry['ticketId'] not in seen:
+                seen.add(entry['ticketId'])
+                _add_ticket(merged, entry)
+    return merged
+
+
+def format_digest_message(digest):
+    """
+    Title and body for one user's draw-night push.
+    A single ticket keeps the per-ticket wording; several tickets get a summary.
+    """
+    is_winner = digest['winningTicketCount'] > 0
+    title = "🎉 Congratulations! You Won!" if is_winner else "Lottery Results Available"
+
+    if len(digest['tickets']) == 1:
+        ticket = digest['tickets'][0]
+        if is_winner:
+            formatted_amount = format_vnd(ticket['winAmount'])
+            if ticket['quantity'] > 1:
+                message = f"Your {ticket['quantity']} tickets {ticket['ticketNumber']} won {formatted_amount} VND ({ticket['prizeCategory']})!"
+            else:
+                message = f"Your ticket {ticket['ticketNumber']} won {formatted_amount} VND ({ticket['prizeCategory']})!"
+        else:
+            message = f"Your ticket {ticket['ticketNumber']} for {ticket['province']} on {digest['drawDate']} was not a winner this time. Better luck next time!"
+    elif is_winner:
+        message = f"{digest['winningTicketCount']} of your {digest['ticketCount']} tickets for {digest['drawDate']} won {format_vnd(digest['totalWinAmount'])} VND!"
+    else:
+        message = f"None of your {digest['ticketCount']} tickets for {digest['drawDate']} won this time. Better luck next time!"
+
+    return title, message
+
+
+def build_digest_custom_data(digest):
+    """App payload for a digest push; ticketId is only set when the push is about one ticket"""
+    is_winner = digest['winningTicketCount'] > 0
+    single = digest['tickets'][0] if len(digest['tickets']) == 1 else None
+    return {
+        'ticketId': single['ticketId'] if single else '',
+        'userId': digest['userId'],
+        'drawDate': digest['drawDate'],
+        'isWinner': is_winner,
+        'winAmount': str(digest['totalWinAmount']) if is_winner else '0',
+        'prizeCategory': (single['prizeCategory'] or '') if single else '',
+        'ticketCount': digest['ticketCount'],
+        'winningTicketCount': digest['winningTicketCount'],
+        'type': 'daily_results'
+    }
@@ -0,0 +1,137 @@
+import json
+import os
+import time
+import uuid
+from collections import deque
+from decimal import Decimal
+
+from functions.bootstrap import get_client
+from functions.notification_digest import get_digest_id
+
+# SQS queue drained by dispatchNotifications; unset locally, where an in-memory queue stands in
+NOTIFICATION_QUEUE_URL = os.environ.get('NOTIFICATION_QUEUE_URL')
+
+SQS_BATCH_LIMIT = 10
+# SQS caps DelaySeconds at 15 minutes
+MAX_DELAY_SECONDS = 900
+
+
+def _json_default(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def build_job(digest, final=True):
+    """
+    Notification job for one user digest; enqueuedAt feeds the delivery latency metric.
+    final: the producing run left none of the user's tickets for the date pending, so the
+           dispatcher may send without waiting for other draws' digests to merge in
+    """
+    return {
+        'jobId': str(uuid.uuid4()),
+        'type': 'digest',
+        'digestId': get_digest_id(digest['userId'], digest['drawDate']),
+        'digest': digest,
+        'final': final,
+        'enqueuedAt': time.time()
+    }
+
+
+def build_flush_job(digest_id):
+    """Job that sends a digest whose merge window has closed (see dispatch_notifications)"""
+    return {
+        'jobId': str(uuid.uuid4()),
+        'type': 'flush',
+        'digestId': digest_id,
+        'enqueuedAt': time.time()
+    }
+
+
+class SqsNotificationQueue:
+    def __init__(self, queue_url):
+        self.queue_url = queue_url
+        self.sqs = get_client('sqs')
+
+    def send(self, jobs, delay_seconds=0):
+        """
+        Send jobs with SendMessageBatch, invisible for delay_seconds (at most MAX_DELAY_SECONDS).
+        Returns: number of jobs accepted by SQS
+        """
+        delay = {'DelaySeconds': min(int(delay_seconds), MAX_DELAY_SECONDS)} if delay_seconds > 0 else {}
+        sent = 0
+        for i in range(0, len(jobs), SQS_BATCH_LIMIT):
+            chunk = jobs[i:i + SQS_BATCH_LIMIT]
+            response = self.sqs.send_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=[
+                    dict({'Id': str(n), 'MessageBody': json.dumps(job, default=_json_default)}, **delay)
+                    for n, job in enumerate(chunk)
+                ]
+            )
+            for failure in response.get('Failed', []):
+                print(f"❌ Could not enqueue notification job: {failure.get('Code')} {failure.get('Message')}")
+            sent += len(response.get('Successful', []))
+        return sent
+
+
+class MemoryNotificationQueue:
+    """
+    Local stand-in for SQS; jobs are JSON round-tripped so they look like SQS message bodies.
+    Delays are ignored: the queue is drained inline, which closes every merge window.
+    """
+
+    def __init__(self):
+        self.jobs = deque()
+
+    def send(self, jobs, delay_seconds=0):
+        for job in jobs:
+            self.jobs.append(json.loads(json.dumps(job, default=_json_default)))
+        return len(jobs)
+
+    def receive(self, max_jobs=SQS_BATCH_LIMIT):
+        batch = []
+        while self.jobs and len(batch) < max_jobs:
+            batch.append(self.jobs.popleft())
+        return batch
+
+    def __len__(self):
+        return len(self.jobs)
+
+
+_queue = None
+
+
+def get_notification_queue():
+    """Container-scoped queue: SQS when NOTIFICATION_QUEUE_URL is set, otherwise in-memory"""
+    global _queue
+    if _queue is None:
+        _queue = SqsNotificationQueue(NOTIFICATION_QUEUE_URL) if NOTIFICATION_QUEUE_URL else MemoryNotificationQueue()
+    return _queue
+
+
+def enqueue_user_digests(digests, pending_user_ids=()):
+    """
+    Queue one notification job per (user, draw date).
+    pending_user_ids: users the producing run left tickets pending for on the date; their
+                      digests wait in dispatchNotifications for the other draws to merge in
+    Returns number of jobs queued
+    """
+    pending_user_ids = set(pending_user_ids)
+    jobs = [
+        build_job(digest, final=digest['userId'] not in pending_user_ids)
+        for digest in digests if digest['deviceTokens']
+    ]
+    if not jobs:
+        return 0
+
+    queue = get_notification_queue()
+    queued = queue.send(jobs)
+    print(f"📨 Queued {queued} summary pushes for {sum(len(d['tickets']) for d in digests)} tickets")
+
+    # Nothing drains the in-memory stand-in, so deliver inline (local runs without SQS)
+    if isinstance(queue, MemoryNotificationQueue):
+        from functions.dispatch_notifications import drain_queue
+        drain_queue(queue)
+
+    return queued
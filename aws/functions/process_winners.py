@@ -1,9 +1,41 @@
 import json
-import boto3
 import os
 import datetime
-from decimal import Decimal
 
+from functions.draw_calendar import get_provinces_for_date
+from functions.draw_index import batch_get_draws, check_vietnamese_lottery_winner, get_prize_data, put_draw_if_absent
+from functions.instrumentation import instrument_handler
+from functions.leases import LeaseHeartbeat, acquire_draw_leases, new_lease_owner
+from functions.notification_digest import collect_user_digests
+from functions.notification_queue import enqueue_user_digests
+from functions.provinces import get_province_key, get_region_from_province
+from functions.storage import get_storage
+from functions.ticket_archive import get_archive_expiry
+from functions.verdict_writer import AlreadySettled
+
+# Dev-only: fill missing draws with synthetic results (functions.synthetic_data) so the
+# pipeline can run end to end without the results API. Never set in a deployed stage; real
+# results are stored by fetchDailyResults and checkTicket.
+SYNTHETIC_RESULTS = os.environ.get('SYNTHETIC_RESULTS', '').lower() == 'true'
+
+def query_pending_tickets(store, draw_date):
+    """Every pending ticket of the draw date (DrawDatePendingIndex), following LastEvaluatedKey"""
+    tickets = []
+    start_key = None
+    while True:
+        items, start_key = store.query_pending_tickets(draw_date, start_key=start_key)
+        tickets.extend(items)
+        if not start_key:
+            break
+    return tickets
+
+def get_ticket_region(ticket):
+    region = ticket.get('region')
+    if not region or region == 'unknown':
+        region = get_region_from_province(ticket['province'])
+    return region
+
+@instrument_handler('processWinners')
 def handler(event, context):
     """
     Daily lottery processing:
@@ -13,10 +45,7 @@ def handler(event, context):
     This function runs daily via cron regardless of ticket volume.
     """
     try:
-        # Initialize DynamoDB
-        dynamodb = boto3.resource('dynamodb', region_name=os.environ['REGION'])
-        tickets_table = dynamodb.Table(os.environ['DYNAMODB_TICKETS_TABLE'])
-        results_table = dynamodb.Table(os.environ['DYNAMODB_RESULTS_TABLE'])
+        store = get_storage()
         
         # Get yesterday's date (when drawing results should be available)
         yesterday = (datetime.datetime.now() - datetime.timedelta(days=1)).strftime('%Y-%m-%d')
@@ -24,21 +53,13 @@ def handler(event, context):
         print(f"Daily lottery processing for date: {yesterday}")
         
         # Step 1: Fetch and store latest lottery results
-        results_fetched = fetch_and_store_lottery_results(results_table, yesterday)
+        results_fetched = fetch_and_store_lottery_results(yesterday)
         print(f"Lottery results fetched and stored: {results_fetched}")
         
         # Step 2: Process any tickets against results
         
         # Get all tickets for yesterday that haven't been checked
-        response = tickets_table.scan(
-            FilterExpression='drawDate = :date AND (attribute_not_exists(hasBeenChecked) OR hasBeenChecked = :false)',
-            ExpressionAttributeValues={
-                ':date': yesterday,
-                ':false': False
-            }
-        )
-        
-        tickets = response['Items']
+        tickets = query_pending_tickets(store, yesterday)
         print(f"Found {len(tickets)} unchecked tickets for {yesterday}")
         
         if not tickets:
@@ -53,61 +74,76 @@ def handler(event, context):
         
         processed_count = 0
         winner_count = 0
-        
-        # Process each ticket
-        for ticket in tickets:
-            try:
-                # Get lottery results for this ticket's province and date
-                results_response = results_table.get_item(
-                    Key={
-                        'province': ticket['province'],
-                        'date': ticket['drawDate']
+        settled = []
+        
+        # Split the draws with concurrent runs: only settle tickets of draws whose lease we hold
+        owner = new_lease_owner()
+        leases = acquire_draw_leases({(get_province_key(ticket['province']), ticket['drawDate']) for ticket in tickets}, owner)
+        all_tickets = tickets
+        tickets = [ticket for ticket in tickets if (get_province_key(ticket['province']), ticket['drawDate']) in leases]
+        
+        with LeaseHeartbeat(leases.values(), owner):
+            # Lottery results of every leased draw in one batch read
+            draws = batch_get_draws(leases.keys())
+            checked_at = datetime.datetime.now().isoformat()
+            
+            # Process each ticket
+            for ticket in tickets:
+                try:
+                    draw_key = (get_province_key(ticket['province']), ticket['drawDate'])
+                    if draw_key not in draws:
+                        print(f"No results found for {ticket['province']} on {ticket['drawDate']}")
+                        continue
+                    
+                    # Check if ticket is a winner
+                    match_result = check_vietnamese_lottery_winner(
+                        ticket['ticketNumber'],
+                        get_prize_data(draws[draw_key]),
+                        get_ticket_region(ticket),
+                        verbose=False
+                    )
+                    is_winner = match_result['is_winner']
+                    quantity = int(ticket.get('quantity', 1))
+                    
+                    # Update ticket with winner status
+                    updates = {
+                        'hasBeenChecked': True,
+                        'isWinner': is_winner,
+                        'checkedAt': checked_at,
+                        'expiresAt': get_archive_expiry()
                     }
-                )
-                
-                if 'Item' not in results_response:
-                    print(f"No results found for {ticket['province']} on {ticket['drawDate']}")
-                    continue
-                
-                results = results_response['Item']
-                
-                # Check if ticket is a winner
-                is_winner, win_amount, prize_category = check_ticket_against_results(
-                    ticket['numbers'], 
-                    results['prizes']
-                )
-                
-                # Update ticket with winner status
-                update_expression = 'SET hasBeenChecked = :true, isWinner = :winner'
-                expression_values = {
-                    ':true': True,
-                    ':winner': is_winner
-                }
-                
-                if is_winner:
-                    update_expression += ', winAmount = :amount, prizeCategory = :category'
-                    expression_values[':amount'] = Decimal(str(win_amount))
-                    expression_values[':category'] = prize_category
-                    winner_count += 1
-                    print(f"🎉 Winner found: Ticket {ticket['ticketId']} won {win_amount} VND ({prize_category})")
                     
-                    # Send winner notification
-                    send_notification(ticket, True, win_amount, prize_category)
-                else:
-                    # Send loser notification  
-                    send_notification(ticket, False, 0, None)
-                
-                tickets_table.update_item(
-                    Key={'ticketId': ticket['ticketId']},
-                    UpdateExpression=update_expression,
-                    ExpressionAttributeValues=expression_values
-                )
-                
-                processed_count += 1
-                
-            except Exception as e:
-                print(f"Error processing ticket {ticket.get('ticketId', 'unknown')}: {e}")
-                continue
+                    if is_winner:
+                        # A ticket record can stand for several identical physical tickets
+                        total_win_amount = match_result['amount'] * quantity
+                        updates['winAmount'] = match_result['amount']
+                        updates['totalWinAmount'] = total_win_amount
+                        updates['prizeCategory'] = match_result['category']
+                    
+                    # Only settle tickets still pending; a concurrent run may have settled (and notified) them
+                    try:
+                        store.settle_ticket(ticket['ticketId'], updates, quantity)
+                    except AlreadySettled:
+                        print(f"⏭️ Ticket {ticket['ticketId']} was already settled by another run")
+                        continue
+                    
+                    processed_count += 1
+                    if is_winner:
+                        winner_count += 1
+                        print(f"🎉 Winner found: Ticket {ticket['ticketId']} won {total_win_amount} VND ({match_result['category']})")
+                        settled.append((ticket, True, total_win_amount, match_result['category']))
+                    else:
+                        settled.append((ticket, False, 0, None))
+                    
+                except Exception as e:
+                    print(f"Error processing ticket {ticket.get('ticketId', 'unknown')}: {e}")
+                    continue
+        
+        # Notify once per user per draw date, after every verdict is written; digests of users
+        # with tickets still pending for the date are merged with later runs' by dispatchNotifications
+        settled_ids = {ticket['ticketId'] for ticket, _, _, _ in settled}
+        pending_user_ids = {ticket['userId'] for ticket in all_tickets if ticket['ticketId'] not in settled_ids}
+        enqueue_user_digests(collect_user_digests(settled), pending_user_ids)
         
         print(f"Processing complete: {processed_count} tickets processed, {winner_count} winners found")
         
@@ -132,72 +168,40 @@ def handler(event, context):
             })
         }
 
-def check_ticket_against_results(ticket_numbers, lottery_results):
-    """
-    Check if a ticket matches any winning numbers.
-    Returns (is_winner, win_amount, prize_category)
-    """
-    # Prize amounts in VND
-    prize_amounts = {
-        'G1': 3000000000,  # 3 billion VND
-        'G2': 1000000000,  # 1 billion VND  
-        'G3': 300000000,   # 300 million VND
-        'G4': 50000000,    # 50 million VND
-        'G5': 10000000,    # 10 million VND
-        'G6': 3000000,     # 3 million VND
-        'G7': 1000000,     # 1 million VND
-        'DB': 500000000    # 500 million VND (Special Prize)
-    }
-    
-    # Parse ticket numbers (remove spaces and convert to list)
-    ticket_nums = [num.strip() for num in ticket_numbers.split(',') if num.strip()]
-    
-    # Check against each prize category
-    for category, winning_numbers in lottery_results.items():
-        if category not in prize_amounts:
-            continue
-            
-        # winning_numbers is a list from DynamoDB
-        for winning_num in winning_numbers:
-            for ticket_num in ticket_nums:
-                if ticket_num == winning_num:
-                    return True, prize_amounts[category], category
-    
-    return False, 0, None
-
-def fetch_and_store_lottery_results(results_table, date):
+def fetch_and_store_lottery_results(date):
     """
-    Fetch lottery results from external APIs and store in DynamoDB.
-    Returns the number of province results fetched and stored.
+    Store synthetic results for the date's missing draws when SYNTHETIC_RESULTS is set.
+    Otherwise only reports the missing draws: their tickets stay pending until fetchDailyResults
+    or checkTicket stores the real results.
+    Returns the number of province results stored.
     """
-    # Vietnamese provinces that have daily lottery drawings
-    provinces = [
-        'Hà Nội', 'TP.HCM', 'Đồng Tháp', 'Cà Mau', 'Bến Tre', 'Vũng Tàu',
-        'Bạc Liêu', 'Đà Nẵng', 'Quảng Nam', 'Daklak', 'Quảng Ninh', 'Hải Phòng',
-        'Thừa Thiên Huế', 'An Giang', 'Bình Thuận', 'Tây Ninh', 'Bình Dương',
-        'Trà Vinh', 'Vinh Long', 'Vĩnh Long', 'Kiên Giang', 'Tiền Giang',
-        'Sóc Trăng', 'Cần Thơ', 'Đồng Nai', 'Long An', 'Hậu Giang'
-    ]
+    # Only provinces the draw calendar has drawing on this date (none during Tết)
+    provinces = get_provinces_for_date(date)
     
     results_stored = 0
     
+    # One existence check for all provinces
+    existing = batch_get_draws(
+        [(province, date) for province in provinces], keys_only=True
+    )
+    
     for province in provinces:
         try:
-            # Check if we already have results for this province and date
-            existing = results_table.get_item(
-                Key={'province': province, 'date': date}
-            )
-            
-            if 'Item' in existing:
+            if (province, date) in existing:
                 print(f"Results already exist for {province} on {date}")
                 continue
             
-            # Generate sample lottery results (in production, this would call real API)
+            if not SYNTHETIC_RESULTS:
+                print(f"No results stored yet for {province} on {date}")
+                continue
+            
             results = generate_sample_lottery_results(province, date)
             
             if results:
-                # Store in DynamoDB
-                results_table.put_item(Item=results)
+                # Store unless a concurrent run stored it first
+                if not put_draw_if_absent(results):
+                    print(f"Results already exist for {province} on {date}")
+                    continue
                 results_stored += 1
                 print(f"Stored results for {province} on {date}")
             
@@ -209,110 +213,9 @@ def fetch_and_store_lottery_results(results_table, date):
 
 def generate_sample_lottery_results(province, date):
     """
-    Generate sample lottery results. In production, this would fetch from real APIs.
-    Returns a DynamoDB item with lottery results.
-    """
-    import random
-    
-    # Generate realistic lottery numbers
-    def random_number(digits):
-        return str(random.randint(10**(digits-1), 10**digits - 1)).zfill(digits)
-    
-    # Vietnamese lottery structure
-    results = {
-        'province': province,
-        'date': date,
-        'region': 'vietnam',
-        'prizes': {
-            'DB': [random_number(5)],  # Special Prize
-            'G1': [random_number(5)],  # First Prize  
-            'G2': [random_number(5) for _ in range(2)],  # Second Prize
-            'G3': [random_number(5) for _ in range(6)],  # Third Prize
-            'G4': [random_number(4) for _ in range(4)],  # Fourth Prize
-            'G5': [random_number(4) for _ in range(6)],  # Fifth Prize
-            'G6': [random_number(3) for _ in range(3)],  # Sixth Prize
-            'G7': [random_number(2) for _ in range(4)]   # Seventh Prize
-        }
-    }
-    
-    return results
-
-def send_notification(ticket, is_winner, win_amount=0, prize_category=None):
-    """
-    Send push notification to user about their ticket result using AWS SNS.
+    Synthetic results item (SYNTHETIC_RESULTS only), using the region's real prize tiers
+    (6-digit tickets in the south and central, 5-digit in the north).
     """
-    try:
-        sns = boto3.client('sns', region_name=os.environ['REGION'])
-        
-        # Get user info from ticket
-        user_id = ticket['userId']
-        ticket_number = ticket.get('ticketNumber', 'Unknown')
-        province = ticket.get('province', 'Unknown')
-        draw_date = ticket.get('drawDate', 'Unknown')
-        
-        # Create message based on result
-        if is_winner:
-            # Winner notification
-            formatted_amount = f"{win_amount:,.0f}".replace(',', '.')
-            title = "🎉 Congratulations! You Won!"
-            message = f"Your ticket {ticket_number} won {formatted_amount} VND ({prize_category})!"
-            
-            # Send to topic for winners
-            topic_arn = f"arn:aws:sns:{os.environ['REGION']}:911167902662:lottery-winners"
-        else:
-            # Non-winner notification  
-            title = "Lottery Results Available"
-            message = f"Your ticket {ticket_number} for {province} on {draw_date} was not a winner this time. Better luck next time!"
-            
-            # Send to topic for all users
-            topic_arn = f"arn:aws:sns:{os.environ['REGION']}:911167902662:lottery-results"
-        
-        # Create SNS message with structured data
-        sns_message = {
-            'default': message,
-            'GCM': json.dumps({
-                'data': {
-                    'title': title,
-                    'body': message,
-                    'ticketId': ticket['ticketId'],
-                    'userId': user_id,
-                    'isWinner': is_winner,
-                    'winAmount': str(win_amount) if is_winner else '0',
-                    'prizeCategory': prize_category if prize_category else '',
-                    'type': 'daily_results'
-                }
-            }),
-            'APNS': json.dumps({
-                'aps': {
-                    'alert': {
-                        'title': title,
-                        'body': message
-                    },
-                    'badge': 1,
-                    'sound': 'default'
-                },
-                'custom_data': {
-                    'ticketId': ticket['ticketId'],
-                    'userId': user_id,
-                    'isWinner': is_winner,
-                    'winAmount': str(win_amount) if is_winner else '0',
-                    'prizeCategory': prize_category if prize_category else '',
-                    'type': 'daily_results'
-                }
-            })
-        }
-        
-        # Publish to SNS topic
-        response = sns.publish(
-            TopicArn=topic_arn,
-            Message=json.dumps(sns_message),
-            MessageStructure='json',
-            Subject=title
-        )
-        
-        print(f"📲 Notification sent to user {user_id}: {title}")
-        return response
-        
-    except Exception as e:
-        print(f"❌ Error sending notification for ticket {ticket.get('ticketId', 'unknown')}: {e}")
-        return None
\ No newline at end of file
+    # Imported here so deployed handlers never load the generator
+    from functions.synthetic_data import generate_draw
+    return generate_draw(get_province_key(province), date)
@@ -0,0 +1,149 @@
+import os
+import re
+import unicodedata
+from functools import lru_cache
+
+# Province lookup tables, built once at import instead of on every call
+
+# Drawing provinces per weekday
+PROVINCE_SCHEDULE = {
+    'Monday': ['Phú Yên', 'Huế', 'Đồng Tháp', 'Cà Mau', 'Hà Nội', 'TP.HCM'],
+    'Tuesday': ['Đắk Lắk', 'Quảng Nam', 'Bến Tre', 'Vũng Tàu', 'Bạc Liêu', 'Quảng Ninh'],
+    'Wednesday': ['Đồng Nai', 'Đà Nẵng', 'Sóc Trăng', 'Cần Thơ', 'Bắc Ninh', 'Khánh Hòa'],
+    'Thursday': ['Bình Định', 'Bình Thuận', 'Quảng Bình', 'Quảng Trị', 'Hà Nội', 'Tây Ninh', 'An Giang'],
+    'Friday': ['Bình Dương', 'Ninh Thuận', 'Trà Vinh', 'Gia Lai', 'Vĩnh Long', 'Hải Phòng'],
+    'Saturday': ['Hậu Giang', 'Bình Phước', 'Long An', 'Đà Nẵng', 'Quảng Ngãi', 'Đắk Nông', 'Nam Định', 'TP.HCM'],
+    'Sunday': ['Tiền Giang', 'Kiên Giang', 'Đà Lạt', 'Kon Tum', 'Huế', 'Khánh Hòa', 'Thái Bình']
+}
+
+# date.weekday() -> schedule key, avoids locale-dependent strftime('%A')
+WEEKDAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+NORTH_PROVINCES = frozenset(['Hà Nội', 'Hải Phòng', 'Nam Định', 'Quảng Ninh', 'Bắc Ninh', 'Thái Bình'])
+CENTRAL_PROVINCES = frozenset(['Đà Nẵng', 'Khánh Hòa', 'Phú Yên', 'Bình Định', 'Quảng Nam', 'Quảng Ngãi', 'Thừa Thiên Huế', 'Đắk Lắk', 'Nghệ An', 'Hà Tĩnh', 'Quảng Trị', 'Quảng Bình', 'Huế', 'Gia Lai', 'Ninh Thuận', 'Kon Tum', 'Đắk Nông'])
+
+# xoso188.net results API; overridable so local harnesses can point the fetchers at a fake server
+RESULTS_API_BASE = os.environ.get('RESULTS_API_BASE', 'https://xoso188.net')
+
+# Province name to xoso188.net API code, based on cities.csv
+PROVINCE_API_CODES = {
+    'An Giang': 'angi',
+    'Bạc Liêu': 'bali', 'Bac Lieu': 'bali',
+    'Bắc Ninh': 'bani', 'Bac Ninh': 'bani',
+    'Bến Tre': 'betr', 'Ben Tre': 'betr',
+    'Bình Định': 'bidi', 'Binh Dinh': 'bidi',
+    'Bình Dương': 'bidu', 'Binh Duong': 'bidu',
+    'Bình Phước': 'biph', 'Binh Phuoc': 'biph',
+    'Bình Thuận': 'bith', 'Binh Thuan': 'bith',
+    'Cà Mau': 'cama', 'Ca Mau': 'cama',
+    'Cần Thơ': 'cath', 'Can Tho': 'cath',
+    'Đà Lạt': 'dalat', 'Da Lat': 'dalat',
+    'Đà Nẵng': 'dana', 'Da Nang': 'dana',
+    'Đắk Lắk': 'dalak', 'Dak Lak': 'dalak',
+    'Đắk Nông': 'dano', 'Dak Nong': 'dano',
+    'Đồng Nai': 'dona', 'Dong Nai': 'dona',
+    'Đồng Tháp': 'doth', 'Dong Thap': 'doth',
+    'Gia Lai': 'gila',
+    'Hải Phòng': 'haph', 'Hai Phong': 'haph',
+    'Hà Nội': 'hano', 'Hanoi': 'hano',
+    'Hậu Giang': 'haug', 'Hau Giang': 'haug',
+    'TP.HCM': 'hcm', 'Ho Chi Minh': 'hcm',
+    'Huế': 'hue', 'Hue': 'hue',
+    'Khánh Hòa': 'kaha', 'Khanh Hoa': 'kaha',
+    'Kiên Giang': 'kigi', 'Kien Giang': 'kigi',
+    'Kon Tum': 'kotu',
+    'Long An': 'loan',
+    'Nam Định': 'nadi', 'Nam Dinh': 'nadi',
+    'Ninh Thuận': 'nith', 'Ninh Thuan': 'nith',
+    'Phú Yên': 'phye', 'Phu Yen': 'phye',
+    'Quảng Bình': 'qubi', 'Quang Binh': 'qubi',
+    'Quảng Nam': 'quna', 'Quang Nam': 'quna',
+    'Quảng Ngãi': 'qung', 'Quang Ngai': 'qung',
+    'Quảng Ninh': 'quni', 'Quang Ninh': 'quni',
+    'Quảng Trị': 'qutr', 'Quang Tri': 'qutr',
+    'Sóc Trăng': 'sotr', 'Soc Trang': 'sotr',
+    'Tây Ninh': 'tani', 'Tay Ninh': 'tani',
+    'Thái Bình': 'thbi', 'Thai Binh': 'thbi',
+    'Tiền Giang': 'tigi', 'Tien Giang': 'tigi',
+    'Trà Vinh': 'trvi', 'Tra Vinh': 'trvi',
+    'Vĩnh Long': 'vilo', 'Vinh Long': 'vilo',
+    'Vũng Tàu': 'vuta', 'Vung Tau': 'vuta'
+}
+
+# Spellings seen from the app, OCR and older code that the API code table doesn't cover
+# (diacritic, case and spacing variants need no entry, folding already matches them)
+EXTRA_PROVINCE_ALIASES = {
+    'TP.HCM': ['TP. Hồ Chí Minh', 'Hồ Chí Minh', 'Thành phố Hồ Chí Minh', 'HCM', 'Sài Gòn'],
+    'Huế': ['Thừa Thiên Huế'],
+    'Đà Lạt': ['Lâm Đồng'],
+    'Đắk Lắk': ['Đắc Lắc'],
+    'Đắk Nông': ['Đắc Nông'],
+    'Vũng Tàu': ['Bà Rịa Vũng Tàu']
+}
+
+
+def fold_province_name(name):
+    """Fold diacritics, case, spaces and punctuation: 'TP. Hồ Chí Minh' -> 'tphochiminh'"""
+    decomposed = unicodedata.normalize('NFD', name.replace('đ', 'd').replace('Đ', 'D'))
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return re.sub(r'[^a-z0-9]', '', stripped.lower())
+
+
+def _build_alias_index():
+    # Canonical name is the PROVINCE_SCHEDULE spelling, which is also the results table key
+    canonical_by_code = {}
+    for provinces in PROVINCE_SCHEDULE.values():
+        for province in provinces:
+            canonical_by_code[PROVINCE_API_CODES[province]] = province
+
+    index = {}
+    for alias, code in PROVINCE_API_CODES.items():
+        index[fold_province_name(alias)] = canonical_by_code[code]
+    for canonical, aliases in EXTRA_PROVINCE_ALIASES.items():
+        for alias in [canonical] + aliases:
+            index[fold_province_name(alias)] = canonical
+    return index
+
+
+# Folded spelling -> canonical province name
+PROVINCE_ALIAS_INDEX = _build_alias_index()
+
+
+@lru_cache(maxsize=1024)
+def normalize_province(name):
+    """Canonical province name for any known spelling, or None (memoized, inputs repeat a lot)"""
+    if not name:
+        return None
+    return PROVINCE_ALIAS_INDEX.get(fold_province_name(name))
+
+
+def get_province_key(name):
+    """
+    Key for caches and tables: the canonical name, or the trimmed input when the spelling is unknown
+    so nothing is dropped
+    """
+    return normalize_province(name) or name.strip()
+
+
+def get_region_from_province(province):
+    """Map province to region (north/central/south)"""
+    province = get_province_key(province)
+    if province in NORTH_PROVINCES:
+        return 'north'
+    elif province in CENTRAL_PROVINCES:
+        return 'central'
+    else:
+        return 'south'
+
+
+def get_province_api_code(province_name):
+    """
+    Map province name to API code used by xoso188.net
+    """
+    canonical = normalize_province(province_name)
+    return PROVINCE_API_CODES.get(canonical) if canonical else None
+
+
+def get_results_api_url(api_code):
+    """Last draws of one province from the results API"""
+    return f"{RESULTS_API_BASE}/api/front/open/lottery/history/list/5/{api_code}"
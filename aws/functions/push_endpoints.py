@@ -0,0 +1,91 @@
+import os
+from datetime import datetime
+
+from functions.bootstrap import get_client
+from functions.storage import get_storage
+
+# Container-scoped: the SNS client (bootstrap) and the endpoint cache are reused across invocations
+# deviceToken -> SNS platform endpoint ARN
+_endpoint_cache = {}
+
+
+def get_platform_app_arn():
+    """Platform application for the stage (sandbox for dev, production for prod)"""
+    if os.environ.get('STAGE', 'dev') == 'prod':
+        return f"arn:aws:sns:{os.environ['REGION']}:911167902662:app/APNS/XoSo-iOS-Push-Production"
+    return f"arn:aws:sns:{os.environ['REGION']}:911167902662:app/APNS_SANDBOX/XoSo-iOS-Push"
+
+
+def create_endpoint(device_token, user_id):
+    """Create (or look up, the call is idempotent per token) the endpoint and persist its ARN"""
+    endpoint_arn = get_client('sns').create_platform_endpoint(
+        PlatformApplicationArn=get_platform_app_arn(),
+        Token=device_token,
+        CustomUserData=user_id
+    )['EndpointArn']
+    print(f"📱 Created/retrieved endpoint: {endpoint_arn}")
+
+    try:
+        get_storage().put_device({
+            'deviceToken': device_token,
+            'userId': user_id,
+            'endpointArn': endpoint_arn,
+            'updatedAt': datetime.now().isoformat()
+        })
+    except Exception as e:
+        # The in-process cache still saves the call for this container
+        print(f"⚠️ Could not persist endpoint for user {user_id}: {e}")
+
+    _endpoint_cache[device_token] = endpoint_arn
+    return endpoint_arn
+
+
+def get_endpoint_arn(device_token, user_id):
+    """Endpoint ARN from the container cache, then the devices table, creating it only when unknown"""
+    endpoint_arn = _endpoint_cache.get(device_token)
+    if endpoint_arn:
+        return endpoint_arn
+
+    item = get_storage().get_device(device_token)
+    if item and item.get('endpointArn'):
+        _endpoint_cache[device_token] = item['endpointArn']
+        return item['endpointArn']
+
+    return create_endpoint(device_token, user_id)
+
+
+def refresh_endpoint(device_token, user_id):
+    """Recreate the endpoint and re-enable it with the current token"""
+    _endpoint_cache.pop(device_token, None)
+    endpoint_arn = create_endpoint(device_token, user_id)
+    get_client('sns').set_endpoint_attributes(
+        EndpointArn=endpoint_arn,
+        Attributes={'Token': device_token, 'Enabled': 'true'}
+    )
+    return endpoint_arn
+
+
+def publish_to_device(device_token, user_id, message, subject):
+    """
+    Publish a MessageStructure=json message to the device's endpoint.
+    A disabled or deleted endpoint is refreshed once and the publish retried.
+    """
+    sns = get_client('sns')
+    endpoint_arn = get_endpoint_arn(device_token, user_id)
+    try:
+        return sns.publish(
+            TargetArn=endpoint_arn,
+            Message=message,
+            MessageStructure='json',
+            Subject=subject
+        )
+    except (sns.exceptions.EndpointDisabledException, sns.exceptions.NotFoundException) as e:
+        print(f"🔄 Endpoint {endpoint_arn} unusable ({e.response['Error']['Code']}), refreshing")
+
+    endpoint_arn = refresh_endpoint(device_token, user_id)
+    return sns.publish(
+        TargetArn=endpoint_arn,
+        Message=message,
+        MessageStructure='json',
+        Subject=subject
+    )
@@ -0,0 +1,112 @@
+import json
+from datetime import datetime
+
+from functions.draw_calendar import get_provinces_for_date
+from functions.draw_index import get_draws_index, lookup_number
+from functions.instrumentation import instrument_handler
+from functions.provinces import get_region_from_province
+from functions.results_availability import VIETNAM_TZ
+
+
+@instrument_handler('quickCheck')
+def handler(event, context):
+    """
+    Stateless check of a bare number against every province that drew on a date.
+    Nothing is stored: draws come from the container cache (batch-loaded on a miss)
+    and the number is matched against a merged index of the whole day.
+    """
+    try:
+        # Parse the request body
+        if isinstance(event.get('body'), str):
+            body = json.loads(event['body'])
+        else:
+            body = event
+
+        number = str(body.get('number') or '').replace(' ', '')
+        draw_date = body.get('date') or datetime.now(VIETNAM_TZ).strftime('%Y-%m-%d')
+
+        if not number.isdigit() or len(number) > 6:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Methods': 'OPTIONS,POST'
+                },
+                'body': json.dumps({
+                    'success': False,
+                    'error': 'number must be 1 to 6 digits'
+                })
+            }
+
+        try:
+            datetime.strptime(draw_date, '%Y-%m-%d')
+        except (TypeError, ValueError):
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Methods': 'OPTIONS,POST'
+                },
+                'body': json.dumps({
+                    'success': False,
+                    'error': 'date must be in YYYY-MM-DD format'
+                })
+            }
+
+        provinces = get_provinces_for_date(draw_date)
+        draw_keys = [(province, draw_date) for province in provinces]
+        draws, index = get_draws_index(draw_keys, get_region_from_province)
+
+        wins = []
+        for province, match in lookup_number(index, number).items():
+            wins.append({
+                'province': province,
+                'region': draws[(province, draw_date)][1],
+                'prizeCategory': match['category'],
+                'winAmount': match['amount']
+            })
+        wins.sort(key=lambda win: -win['winAmount'])
+
+        provinces_checked = [province for province in provinces if (province, draw_date) in draws]
+        provinces_pending = [province for province in provinces if (province, draw_date) not in draws]
+
+        print(f"Quick check {number} on {draw_date}: {len(wins)} wins across {len(provinces_checked)} draws ({len(provinces_pending)} pending)")
+
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Methods': 'OPTIONS,POST'
+            },
+            'body': json.dumps({
+                'success': True,
+                'number': number,
+                'date': draw_date,
+                'isWinner': bool(wins),
+                'wins': wins,
+                'provincesChecked': provinces_checked,
+                'provincesPending': provinces_pending
+            })
+        }
+
+    except Exception as e:
+        print(f"Error in quick check: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Methods': 'OPTIONS,POST'
+            },
+            'body': json.dumps({
+                'success': False,
+                'error': 'Internal server error'
+            })
+        }
@@ -0,0 +1,220 @@
+import json
+import math
+import os
+import time
+from datetime import datetime, timedelta
+
+from functions.bootstrap import get_client
+
+# Draw times live in the draw calendar; re-exported here for existing importers
+from functions.draw_calendar import REGION_DRAW_TIMES, VIETNAM_TZ, get_first_draw_time, get_region_draw_time
+from functions.leases import acquire_lease, get_lease, new_lease_owner, release_lease
+from functions.provinces import get_province_key
+
+# Minutes between draw start and results showing up on xoso188.net
+PUBLICATION_DELAY_MINUTES = 35
+
+# A triggered fetchDailyResults run is considered in flight for this long
+FETCH_IN_FLIGHT_SECONDS = 60
+# After an in-flight fetch expires without results, don't trigger again for this long
+NEGATIVE_CACHE_SECONDS = 300
+
+FETCH_IN_FLIGHT_RETRY_SECONDS = 15
+PUBLICATION_WINDOW_RETRY_SECONDS = 30
+OVERDUE_RETRY_SECONDS = 300
+MIN_RETRY_SECONDS = 5
+
+# Fetch triggers are deduplicated across containers through a marker in the leases table:
+# the first container to take fetch#<date>#<province> invokes fetchDailyResults, everyone
+# else sees the fetch as in flight, then negative-cached, until the marker expires (TTL).
+FETCH_MARKER_SECONDS = FETCH_IN_FLIGHT_SECONDS + NEGATIVE_CACHE_SECONDS
+
+# (province, date) -> time.time() of the last known trigger, so a warm container
+# does not re-read the marker on every polling request
+_fetch_triggered_at = {}
+
+
+def get_fetch_marker_id(province, draw_date):
+    return f"fetch#{draw_date}#{get_province_key(province)}"
+
+
+def claim_fetch_trigger(province, draw_date):
+    """
+    Take the shared trigger marker of the draw.
+    Returns: owner token when this caller should invoke the fetch, None when another
+             container triggered it within the marker's lifetime
+    """
+    draw_key = (get_province_key(province), draw_date)
+    owner = new_lease_owner()
+    try:
+        claimed = acquire_lease(get_fetch_marker_id(province, draw_date), owner, FETCH_MARKER_SECONDS)
+    except Exception as e:
+        # Without the marker, fall back to deduplicating within this container only
+        print(f"⚠️ Could not claim fetch marker for {province} on {draw_date}: {e}")
+        claimed = True
+
+    if claimed:
+        _fetch_triggered_at[draw_key] = time.time()
+        return owner
+    _load_fetch_trigger(province, draw_date)
+    return None
+
+
+def release_fetch_trigger(province, draw_date, owner):
+    """Give the marker back after a failed invoke, so the next request can trigger again"""
+    _fetch_triggered_at.pop((get_province_key(province), draw_date), None)
+    try:
+        release_lease(get_fetch_marker_id(province, draw_date), owner)
+    except Exception as e:
+        print(f"⚠️ Could not release fetch marker for {province} on {draw_date}: {e}")
+
+
+def _load_fetch_trigger(province, draw_date):
+    """Trigger time of the draw's shared marker (cached in the container), or None"""
+    draw_key = (get_province_key(province), draw_date)
+    triggered_at = _fetch_triggered_at.get(draw_key)
+    if triggered_at is not None and time.time() - triggered_at < FETCH_MARKER_SECONDS:
+        return triggered_at
+
+    try:
+        marker = get_lease(get_fetch_marker_id(province, draw_date))
+    except Exception as e:
+        print(f"⚠️ Could not read fetch marker for {province} on {draw_date}: {e}")
+        return triggered_at
+
+    # TTL deletion lags, so an expired marker can still be read
+    if marker is None or int(marker['expiresAt']) < time.time():
+        return None
+    _fetch_triggered_at[draw_key] = triggered_at = int(marker['heartbeatAt'])
+    return triggered_at
+
+
+def get_fetch_state(province, draw_date):
+    """
+    Returns: 'in_flight' while a recently triggered fetch may still be running,
+             'negative' when that fetch finished without storing results (negative-cached),
+             None when no fetch is known for the draw
+    """
+    return _fetch_state(_load_fetch_trigger(province, draw_date))
+
+
+def _fetch_state(last_triggered):
+    if last_triggered is None:
+        return None
+
+    age = time.time() - last_triggered
+    if age < FETCH_IN_FLIGHT_SECONDS:
+        return 'in_flight'
+    if age < FETCH_MARKER_SECONDS:
+        return 'negative'
+    return None
+
+
+def should_trigger_background_fetch(target_date):
+    """
+    Check if we should trigger background fetch for the given date.
+    For current day: must be after the day's first scheduled draw
+    For past days: always trigger
+    """
+    try:
+        # Parse target date
+        target_datetime = datetime.strptime(target_date, '%Y-%m-%d')
+
+        # Get current time in Vietnam timezone (UTC+7)
+        vietnam_now = datetime.now(VIETNAM_TZ)
+        vietnam_today = vietnam_now.date()
+
+        # If target date is in the past, we should trigger fetch
+        if target_datetime.date() < vietnam_today:
+            return True
+
+        # If target date is today, check if the first draw of the day has started
+        if target_datetime.date() == vietnam_today:
+            first_draw_time = get_first_draw_time(target_date)
+            return first_draw_time is not None and vietnam_now >= first_draw_time
+
+        # If target date is in the future, don't trigger fetch
+        return False
+
+    except Exception as e:
+        print(f"Error checking if should trigger background fetch: {e}")
+        # Default to allowing the fetch for past dates only; today's draws may not have started
+        target_datetime = datetime.strptime(target_date, '%Y-%m-%d')
+        return target_datetime.date() < datetime.now(VIETNAM_TZ).date()
+
+
+def trigger_background_fetch(province, draw_date, triggered_by):
+    """
+    Asynchronously invoke fetchDailyResults for the given draw.
+    Skipped while a fetch triggered by any container is in flight or negative-cached,
+    so polling clients do not start a new fetch on every request.
+    Returns: True if a fetch is in flight for this draw
+    """
+    fetch_state = get_fetch_state(province, draw_date)
+    if fetch_state is not None:
+        print(f"Background fetch for {province} on {draw_date} not re-triggered (state: {fetch_state})")
+        return fetch_state == 'in_flight'
+    
+    owner = claim_fetch_trigger(province, draw_date)
+    if owner is None:
+        print(f"Background fetch for {province} on {draw_date} was just triggered by another request")
+        return True
+    
+    print(f"Triggering background fetch for {province} on {draw_date}")
+    
+    # Trigger the background fetch Lambda function asynchronously
+    try:
+        lambda_client = get_client('lambda')
+        
+        # Invoke the fetch_daily_results function asynchronously
+        lambda_client.invoke(
+            FunctionName=f"{os.environ.get('SERVICE_NAME', 'xoso')}-{os.environ.get('STAGE', 'dev')}-fetchDailyResults",
+            InvocationType='Event',  # Asynchronous invocation
+            Payload=json.dumps({
+                'date': draw_date,
+                'triggered_by': triggered_by,
+                'trigger_province': province
+            })
+        )
+        print(f"✅ Background fetch triggered for {province} on {draw_date}")
+        return True
+        
+    except Exception as lambda_error:
+        print(f"❌ Failed to trigger background fetch: {lambda_error}")
+        release_fetch_trigger(province, draw_date, owner)
+        return False
+
+
+def get_expected_available_at(region, draw_date):
+    """Vietnam-time datetime at which results for the draw should be published"""
+    return get_region_draw_time(region, draw_date) + timedelta(minutes=PUBLICATION_DELAY_MINUTES)
+
+
+def compute_retry_hint(province, region, draw_date, now=None):
+    """
+    Machine-readable polling hint for a pending draw.
+    Returns: {'retryAfterSeconds': int, 'expectedAvailableAt': ISO-8601 string}
+    """
+    now = now or datetime.now(VIETNAM_TZ)
+    expected_at = get_expected_available_at(region, draw_date)
+    last_triggered = _load_fetch_trigger(province, draw_date)
+    fetch_state = _fetch_state(last_triggered)
+
+    if now < expected_at:
+        # Before publication: come back when results are due
+        retry_after = (expected_at - now).total_seconds()
+    elif fetch_state == 'in_flight':
+        retry_after = FETCH_IN_FLIGHT_RETRY_SECONDS
+    elif fetch_state == 'negative':
+        # Last fetch found nothing; wait out the negative cache before the next attempt
+        retry_after = last_triggered + FETCH_MARKER_SECONDS - time.time()
+    elif now - expected_at < timedelta(hours=1):
+        retry_after = PUBLICATION_WINDOW_RETRY_SECONDS
+    else:
+        # Long overdue (source outage or suspended draw): back off hard
+        retry_after = OVERDUE_RETRY_SECONDS
+
+    return {
+        'retryAfterSeconds': max(MIN_RETRY_SECONDS, int(math.ceil(retry_after))),
+        'expectedAvailableAt': expected_at.isoformat()
+    }
@@ -0,0 +1,258 @@
+import json
+from datetime import datetime
+
+from functions.draw_calendar import should_province_have_drawing
+from functions.draw_index import batch_get_draws, check_vietnamese_lottery_winner, get_prize_data
+from functions.instrumentation import instrument_handler
+from functions.provinces import get_province_key, get_region_from_province
+from functions.results_availability import compute_retry_hint, should_trigger_background_fetch, trigger_background_fetch
+from functions.storage import get_storage
+from functions.ticket_archive import get_archive_expiry
+from functions.verdict_writer import AlreadySettled, write_in_parallel
+
+
+def query_pending_tickets(store, user_id):
+    """
+    Page through UserIndex for every ticket of this user that has not been adjudicated yet.
+    Settled tickets are dropped here; a FilterExpression would read (and bill) them all the same.
+    """
+    tickets = []
+    start_key = None
+    while True:
+        items, start_key = store.query_user_tickets(user_id, start_key=start_key)
+        tickets.extend(ticket for ticket in items if 'isWinner' not in ticket)
+        if not start_key:
+            break
+
+    return tickets
+
+
+def group_tickets_by_draw(tickets):
+    """Group tickets by (province, drawDate) so each draw is loaded and matched once"""
+    groups = {}
+    for ticket in tickets:
+        draw_key = (get_province_key(ticket['province']), ticket['drawDate'])
+        groups.setdefault(draw_key, []).append(ticket)
+    return groups
+
+
+def adjudicate_group(tickets, results):
+    """
+    Adjudicate every ticket of one draw against the same prize data.
+    Identical numbers in the group are only matched once.
+    Returns: list of (ticket, match_result)
+    """
+    prize_data = get_prize_data(results)
+    verdicts = []
+    matched = {}
+
+    for ticket in tickets:
+        ticket_number = str(ticket['ticketNumber']).strip()
+        region = ticket.get('region', 'south')
+        if not region or region == 'unknown':
+            region = get_region_from_province(ticket['province'])
+
+        cache_key = (ticket_number, region)
+        if cache_key not in matched:
+            matched[cache_key] = check_vietnamese_lottery_winner(ticket_number, prize_data, region)
+
+        verdicts.append((ticket, matched[cache_key]))
+
+    return verdicts
+
+
+def get_ticket_region(ticket):
+    region = ticket.get('region')
+    if not region or region == 'unknown':
+        region = get_region_from_province(ticket['province'])
+    return region
+
+
+def handle_missing_draw(province, draw_date, tickets):
+    """
+    Same treatment as checkTicket gives a ticket without results: trigger a background
+    fetch when results are due, and work out the polling hint.
+    Returns: retry hint dict, or None when no drawing is expected for the draw
+    """
+    if not should_province_have_drawing(province, draw_date):
+        print(f"Province {province} does not have drawing on {draw_date} - {len(tickets)} tickets stay pending")
+        return None
+
+    if should_trigger_background_fetch(draw_date):
+        trigger_background_fetch(province, draw_date, triggered_by='settle_user_tickets')
+    else:
+        print(f"Results not yet available for {draw_date} (before the scheduled draw)")
+
+    return compute_retry_hint(province, get_ticket_region(tickets[0]), draw_date)
+
+
+def write_verdict(store, ticket, match_result, checked_at):
+    """
+    Persist one verdict (same attributes as check_ticket writes).
+    A ticket settled meanwhile by another run already holds the same verdict and is left alone;
+    one whose quantity changed meanwhile stays pending for the next run.
+    """
+    win_amount = match_result['amount']
+    quantity = int(ticket.get('quantity', 1))
+    updates = {
+        'isWinner': match_result['is_winner'],
+        'winAmount': win_amount,
+        'totalWinAmount': win_amount * quantity,
+        'prizeCategory': match_result['category'],
+        'checkedAt': checked_at,
+        'hasBeenChecked': True,
+        'expiresAt': get_archive_expiry()
+    }
+    try:
+        store.settle_ticket(ticket['ticketId'], updates, quantity)
+    except AlreadySettled:
+        print(f"⏭️ Ticket {ticket['ticketId']} was already settled or changed quantity")
+
+
+def write_verdicts(store, verdicts):
+    """
+    Write all verdicts in parallel.
+    Returns: set of ticketIds whose write failed
+    """
+    checked_at = datetime.now().isoformat()
+    return write_in_parallel(
+        lambda job: write_verdict(store, job[0], job[1], checked_at),
+        ((ticket['ticketId'], (ticket, match_result)) for ticket, match_result in verdicts)
+    )
+
+
+@instrument_handler('settleUserTickets')
+def handler(event, context):
+    """
+    Settle all pending tickets of a user in one call.
+    Replaces one checkTicket invocation per pending ticket when the app opens after results night.
+    """
+    try:
+        # Parse the request body
+        if isinstance(event.get('body'), str):
+            body = json.loads(event['body'])
+        else:
+            body = event
+
+        user_id = body.get('userId')
+
+        if not user_id:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Methods': 'OPTIONS,POST'
+                },
+                'body': json.dumps({
+                    'success': False,
+                    'error': 'userId is required'
+                })
+            }
+
+        print(f"Settling pending tickets for user: {user_id}")
+
+        store = get_storage()
+        tickets = query_pending_tickets(store, user_id)
+        groups = group_tickets_by_draw(tickets)
+        print(f"Found {len(tickets)} pending tickets across {len(groups)} draws")
+
+        draws = batch_get_draws(groups.keys())
+
+        verdicts = []
+        pending_tickets = []
+        retry_hints = {}
+        for draw_key, group in groups.items():
+            if draw_key in draws:
+                verdicts.extend(adjudicate_group(group, draws[draw_key]))
+            else:
+                print(f"No results found for {draw_key[0]} on {draw_key[1]} - {len(group)} tickets stay pending")
+                retry_hint = handle_missing_draw(draw_key[0], draw_key[1], group)
+                if retry_hint:
+                    retry_hints[draw_key] = retry_hint
+                pending_tickets.extend(group)
+
+        failed = write_verdicts(store, verdicts)
+
+        results = []
+        winners_found = 0
+        for ticket, match_result in verdicts:
+            if ticket['ticketId'] in failed:
+                pending_tickets.append(ticket)
+                continue
+
+            win_amount = match_result['amount']
+            quantity = int(ticket.get('quantity', 1))
+            if match_result['is_winner']:
+                winners_found += 1
+            results.append({
+                'ticketId': ticket['ticketId'],
+                'isPending': False,
+                'isWinner': match_result['is_winner'],
+                'winAmount': win_amount,
+                'prizeCategory': match_result['category'],
+                'quantity': quantity,
+                'totalWinAmount': win_amount * quantity
+            })
+
+        for ticket in pending_tickets:
+            pending_result = {
+                'ticketId': ticket['ticketId'],
+                'isPending': True,
+                'isWinner': None,  # Use None to indicate pending status
+                'winAmount': 0,
+                'prizeCategory': '',
+                'quantity': int(ticket.get('quantity', 1)),
+                'totalWinAmount': 0
+            }
+            # Polling hint of the ticket's draw (only when results are actually expected)
+            retry_hint = retry_hints.get((get_province_key(ticket['province']), ticket['drawDate']))
+            if retry_hint:
+                pending_result.update(retry_hint)
+            results.append(pending_result)
+
+        print(f"Settled {len(verdicts) - len(failed)} tickets ({winners_found} winners), {len(pending_tickets)} still pending")
+
+        headers = {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST'
+        }
+        response_body = {
+            'success': True,
+            'userId': user_id,
+            'results': results,
+            'ticketsSettled': len(verdicts) - len(failed),
+            'ticketsPending': len(pending_tickets),
+            'winnersFound': winners_found
+        }
+
+        # The soonest draw to come back for decides when the client should call again
+        if retry_hints:
+            next_hint = min(retry_hints.values(), key=lambda hint: hint['retryAfterSeconds'])
+            response_body.update(next_hint)
+            headers['Retry-After'] = str(next_hint['retryAfterSeconds'])
+
+        return {
+            'statusCode': 200,
+            'headers': headers,
+            'body': json.dumps(response_body)
+        }
+
+    except Exception as e:
+        print(f"Error settling user tickets: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Methods': 'OPTIONS,POST'
+            },
+            'body': json.dumps({
+                'success': False,
+                'error': 'Internal server error'
+            })
+        }
@@ -0,0 +1,753 @@
+import copy
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from decimal import Decimal
+
+from functions.bootstrap import get_client
+from functions.dynamo_codec import (
+    batch_get_items, decode_results_item, encode_item, encode_value, get_item, query_page
+)
+from functions.verdict_writer import PENDING_CONDITION, SETTLE_CONDITION, AlreadySettled, is_condition_failure
+
+# Storage backends for tickets (and their ticket-details side items), results, adjudication leases, notification digest ledgers and
+# the device endpoint cache.
+# DynamoStorage is what the Lambdas run; MemoryStorage and SqliteStorage keep the same keys,
+# index projections, conditional writes and Limit/LastEvaluatedKey pagination, so the
+# pipeline can run, be profiled and load-tested without AWS (STORAGE_BACKEND=memory|sqlite).
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'dynamodb')
+STORAGE_SQLITE_PATH = os.environ.get('STORAGE_SQLITE_PATH', 'xoso-local.sqlite3')
+
+# Keys plus NonKeyAttributes of DrawDatePendingIndex (serverless.yml)
+PENDING_INDEX_ATTRIBUTES = (
+    'ticketId', 'drawDate', 'province',
+    'userId', 'ticketNumber', 'region', 'quantity', 'deviceToken', 'hasBeenChecked', 'isPending'
+)
+
+# Same filter the DynamoDB backend sends with the DrawDatePendingIndex query
+PENDING_FILTER = 'attribute_not_exists(hasBeenChecked) OR hasBeenChecked = :false OR (attribute_exists(isPending) AND isPending = :true)'
+
+# BatchWriteItem accepts at most 25 put requests per call
+BATCH_WRITE_LIMIT = 25
+MAX_BATCH_WRITE_ATTEMPTS = 6
+BATCH_RETRY_BASE_SECONDS = 0.05
+
+
+def _json_default(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _plain(item):
+    """Decimal-free copy, the shape the DynamoDB backend decodes items to"""
+    return json.loads(json.dumps(item, default=_json_default))
+
+
+def is_pending_ticket(ticket):
+    """Local evaluation of PENDING_FILTER"""
+    return ('hasBeenChecked' not in ticket or ticket['hasBeenChecked'] is False or
+            ticket.get('isPending') is True)
+
+
+def _project(item, attributes):
+    return {k: item[k] for k in attributes if k in item}
+
+
+def _page(rows, sort_key, key_attributes, limit, start_key, item_filter=None):
+    """
+    DynamoDB Query pagination over already-matched rows: rows are read in sort_key order after
+    start_key, Limit counts rows read before item_filter, and a LastEvaluatedKey is returned
+    whenever Limit stopped the read.
+    Returns: (items, last_key or None)
+    """
+    rows = sorted(rows, key=sort_key)
+    if start_key:
+        after = sort_key(start_key)
+        rows = [row for row in rows if sort_key(row) > after]
+
+    evaluated = rows[:limit] if limit else rows
+    last_key = None
+    if limit and len(rows) >= limit and evaluated:
+        last_key = _project(evaluated[-1], key_attributes)
+
+    items = [row for row in evaluated if item_filter is None or item_filter(row)]
+    return items, last_key
+
+
+def _user_index_order(ticket):
+    # UserIndex has no sort key (DynamoDB order is unspecified); local backends use ticketId
+    return ticket['ticketId']
+
+
+def _pending_index_order(ticket):
+    return (ticket.get('province', ''), ticket['ticketId'])
+
+
+def _settle_condition(ticket, quantity):
+    """Local evaluation of SETTLE_CONDITION"""
+    return 'isWinner' not in ticket and ('quantity' not in ticket or ticket['quantity'] == quantity)
+
+
+def _quantity_condition(ticket, total_win_amount):
+    """Local evaluation of the update_ticket_quantity condition"""
+    if ticket is None:
+        return False
+    return ('isWinner' in ticket) if total_win_amount is not None else ('isWinner' not in ticket)
+
+
+def _settled(ticket, updates):
+    settled = dict(ticket, **_plain(updates))
+    settled.pop('isPending', None)
+    return settled
+
+
+class DynamoStorage:
+    def __init__(self):
+        self.dynamodb = get_client('dynamodb')
+        self.tickets_table = os.environ['DYNAMODB_TICKETS_TABLE']
+        self.results_table = os.environ['DYNAMODB_RESULTS_TABLE']
+        self.details_table = os.environ.get('DYNAMODB_TICKET_DETAILS_TABLE')
+        self.leases_table = os.environ.get('DYNAMODB_LEASES_TABLE')
+        self.devices_table = os.environ.get('DYNAMODB_DEVICES_TABLE')
+
+    # Tickets
+
+    def put_ticket(self, item):
+        self.dynamodb.put_item(TableName=self.tickets_table, Item=encode_item(item))
+
+    def put_ticket_if_absent(self, item):
+        """Returns: False if a ticket with this ticketId is already stored (it is left untouched)"""
+        try:
+            self.dynamodb.put_item(
+                TableName=self.tickets_table,
+                Item=encode_item(item),
+                ConditionExpression='attribute_not_exists(ticketId)'
+            )
+            return True
+        except Exception as e:
+            if is_condition_failure(e):
+                return False
+            raise
+
+    def put_tickets(self, items, details=()):
+        """
+        Bulk load tickets and ticket-details items (BatchWriteItem, 25 puts per request), retrying
+        unprocessed items with exponential backoff and jitter up to MAX_BATCH_WRITE_ATTEMPTS times.
+        Returns: list of ticketIds whose ticket item could not be written
+        """
+        puts = [(self.tickets_table, item) for item in items] + [(self.details_table, item) for item in details]
+        failed = []
+        for start in range(0, len(puts), BATCH_WRITE_LIMIT):
+            request_items = {}
+            for table_name, item in puts[start:start + BATCH_WRITE_LIMIT]:
+                request_items.setdefault(table_name, []).append({'PutRequest': {'Item': encode_item(item)}})
+
+            for attempt in range(MAX_BATCH_WRITE_ATTEMPTS):
+                request_items = self.dynamodb.batch_write_item(RequestItems=request_items).get('UnprocessedItems') or {}
+                if not request_items or attempt == MAX_BATCH_WRITE_ATTEMPTS - 1:
+                    break
+                delay = BATCH_RETRY_BASE_SECONDS * (2 ** attempt)
+                print(f"⚠️ {sum(len(requests) for requests in request_items.values())} unprocessed items, retrying in {delay:.2f}s")
+                time.sleep(delay + random.uniform(0, delay))
+
+            for table_name, requests in request_items.items():
+                for request in requests:
+                    ticket_id = request['PutRequest']['Item']['ticketId']['S']
+                    if table_name == self.tickets_table:
+                        failed.append(ticket_id)
+                    else:
+                        # Details are best-effort; the ticket itself was stored
+                        print(f"⚠️ Could not store details for ticket {ticket_id}")
+        return failed
+
+    def put_ticket_details(self, item):
+        self.dynamodb.put_item(TableName=self.details_table, Item=encode_item(item))
+
+    def get_ticket(self, ticket_id, consistent=False):
+        return get_item(self.tickets_table, {'ticketId': ticket_id}, consistent=consistent)
+
+    def query_user_tickets(self, user_id, limit=None, start_key=None):
+        return query_page(
+            self.tickets_table, 'userId', user_id, index_name='UserIndex',
+            scan_forward=False, limit=limit, start_key=start_key
+        )
+
+    def query_pending_tickets(self, draw_date, limit=None, start_key=None):
+        return query_page(
+            self.tickets_table, 'drawDate', draw_date, index_name='DrawDatePendingIndex',
+            limit=limit, start_key=start_key,
+            filter_expression=PENDING_FILTER, filter_values={':false': False, ':true': True}
+        )
+
+    def settle_ticket(self, ticket_id, updates, quantity):
+        """
+        SET the verdict attributes and REMOVE isPending, unless the ticket is already settled.
+        quantity: the ticket quantity the verdict (totalWinAmount) was computed for
+        Raises AlreadySettled if another run settled it (or changed its quantity) first.
+        """
+        names = {f"#u{i}": name for i, name in enumerate(updates)}
+        values = {f":u{i}": encode_value(value) for i, value in enumerate(updates.values())}
+        values[':quantity'] = encode_value(quantity)
+        try:
+            self.dynamodb.update_item(
+                TableName=self.tickets_table,
+                Key={'ticketId': {'S': ticket_id}},
+                UpdateExpression='SET ' + ', '.join(f"#u{i} = :u{i}" for i in range(len(updates))) + ' REMOVE isPending',
+                ConditionExpression=SETTLE_CONDITION,
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values
+            )
+        except Exception as e:
+            if is_condition_failure(e):
+                raise AlreadySettled(ticket_id)
+            raise
+
+    def update_ticket_quantity(self, ticket_id, quantity, updated_at, total_win_amount=None):
+        """
+        SET quantity (and totalWinAmount when given) in one conditional update: without a total
+        the ticket must exist and still be pending, with one it must already be settled.
+        Returns: False if the ticket is missing or its settlement state changed
+        """
+        values = {':quantity': encode_value(quantity), ':updated': encode_value(updated_at)}
+        update_expression = 'SET quantity = :quantity, updatedAt = :updated'
+        if total_win_amount is not None:
+            update_expression += ', totalWinAmount = :total'
+            values[':total'] = encode_value(total_win_amount)
+            condition = 'attribute_exists(isWinner)'
+        else:
+            condition = 'attribute_exists(ticketId) AND ' + PENDING_CONDITION
+        try:
+            self.dynamodb.update_item(
+                TableName=self.tickets_table,
+                Key={'ticketId': {'S': ticket_id}},
+                UpdateExpression=update_expression,
+                ConditionExpression=condition,
+                ExpressionAttributeValues=values
+            )
+            return True
+        except Exception as e:
+            if is_condition_failure(e):
+                return False
+            raise
+
+    # Results
+
+    def get_draw(self, province, date):
+        return get_item(self.results_table, {'province': province, 'date': date}, decoder=decode_results_item)
+
+    def batch_get_draws(self, draw_keys, keys_only=False):
+        items = batch_get_items(
+            self.results_table,
+            [{'province': province, 'date': date} for province, date in draw_keys],
+            attributes=['province', 'date'] if keys_only else None,
+            decoder=decode_results_item
+        )
+        return {(item['province'], item['date']): item for item in items}
+
+    def put_draw_if_absent(self, item):
+        try:
+            self.dynamodb.put_item(
+                TableName=self.results_table,
+                Item=encode_item(item),
+                ConditionExpression='attribute_not_exists(province)'
+            )
+            return True
+        except Exception as e:
+            if is_condition_failure(e):
+                return False
+            raise
+
+    # Leases
+
+    def acquire_lease(self, lease_id, owner, duration):
+        now = int(time.time())
+        try:
+            self.dynamodb.put_item(
+                TableName=self.leases_table,
+                Item={
+                    'leaseId': {'S': lease_id},
+                    'owner': {'S': owner},
+                    'expiresAt': {'N': str(now + duration)},
+                    'heartbeatAt': {'N': str(now)}
+                },
+                ConditionExpression='attribute_not_exists(leaseId) OR expiresAt < :now OR #owner = :owner',
+                ExpressionAttributeNames={'#owner': 'owner'},
+                ExpressionAttributeValues={':now': {'N': str(now)}, ':owner': {'S': owner}}
+            )
+            return True
+        except Exception as e:
+            if is_condition_failure(e):
+                return False
+            raise
+
+    def renew_lease(self, lease_id, owner, duration):
+        now = int(time.time())
+        try:
+            self.dynamodb.update_item(
+                TableName=self.leases_table,
+                Key={'leaseId': {'S': lease_id}},
+                UpdateExpression='SET expiresAt = :expires, heartbeatAt = :now',
+                ConditionExpression='#owner = :owner',
+                ExpressionAttributeNames={'#owner': 'owner'},
+                ExpressionAttributeValues={
+                    ':expires': {'N': str(now + duration)},
+                    ':now': {'N': str(now)},
+                    ':owner': {'S': owner}
+                }
+            )
+            return True
+        except Exception as e:
+            if is_condition_failure(e):
+                return False
+            raise
+
+    def get_lease(self, lease_id):
+        return get_item(self.leases_table, {'leaseId': lease_id})
+
+    def release_lease(self, lease_id, owner):
+        try:
+            self.dynamodb.delete_item(
+                TableName=self.leases_table,
+                Key={'leaseId': {'S': lease_id}},
+                ConditionExpression='#owner = :owner',
+                ExpressionAttributeNames={'#owner': 'owner'},
+                ExpressionAttributeValues={':owner': {'S': owner}}
+            )
+        except Exception as e:
+            if not is_condition_failure(e):
+                raise
+
+    # Notification digest ledgers (leases table, expired by its TTL)
+
+    def get_digest_ledger(self, digest_id):
+        ledger = get_item(self.leases_table, {'leaseId': digest_id}, consistent=True)
+        if ledger is not None:
+            ledger['digestId'] = ledger.pop('leaseId')
+        return ledger
+
+    def put_digest_ledger(self, ledger, expected_version):
+        """
+        Write the ledger if it is still at expected_version (None: must not exist yet).
+        Returns: False if a concurrent dispatcher changed it first
+        """
+        item = {k: v for k, v in ledger.items() if k != 'digestId'}
+        item['leaseId'] = ledger['digestId']
+        if expected_version is None:
+            condition = {'ConditionExpression': 'attribute_not_exists(leaseId)'}
+        else:
+            condition = {
+                'ConditionExpression': 'version = :expected',
+                'ExpressionAttributeValues': {':expected': encode_value(expected_version)}
+            }
+        try:
+            self.dynamodb.put_item(TableName=self.leases_table, Item=encode_item(item), **condition)
+            return True
+        except Exception as e:
+            if is_condition_failure(e):
+                return False
+            raise
+
+    # Device endpoint cache
+
+    def get_device(self, device_token):
+        return get_item(self.devices_table, {'deviceToken': device_token})
+
+    def put_device(self, item):
+        self.dynamodb.put_item(TableName=self.devices_table, Item=encode_item(item))
+
+
+class MemoryStorage:
+    """Process-local backend; one lock makes every operation atomic like a conditional write"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tickets = {}
+        self.details = {}
+        self.results = {}
+        self.leases = {}
+        self.digests = {}
+        self.devices = {}
+
+    # Tickets
+
+    def put_ticket(self, item):
+        with self.lock:
+            self.tickets[item['ticketId']] = _plain(item)
+
+    def put_ticket_if_absent(self, item):
+        with self.lock:
+            if item['ticketId'] in self.tickets:
+                return False
+            self.tickets[item['ticketId']] = _plain(item)
+            return True
+
+    def put_tickets(self, items, details=()):
+        plain = [_plain(item) for item in items]
+        plain_details = [_plain(item) for item in details]
+        with self.lock:
+            self.tickets.update((item['ticketId'], item) for item in plain)
+            self.details.update((item['ticketId'], item) for item in plain_details)
+        return []
+
+    def put_ticket_details(self, item):
+        with self.lock:
+            self.details[item['ticketId']] = _plain(item)
+
+    def get_ticket(self, ticket_id, consistent=False):
+        with self.lock:
+            return copy.deepcopy(self.tickets.get(ticket_id))
+
+    def query_user_tickets(self, user_id, limit=None, start_key=None):
+        with self.lock:
+            rows = [t for t in self.tickets.values() if t.get('userId') == user_id]
+            items, last_key = _page(rows, _user_index_order, ('ticketId', 'userId'), limit, start_key)
+            return copy.deepcopy(items), last_key
+
+    def query_pending_tickets(self, draw_date, limit=None, start_key=None):
+        with self.lock:
+            rows = [t for t in self.tickets.values() if t.get('drawDate') == draw_date and 'province' in t]
+            items, last_key = _page(
+                rows, _pending_index_order, ('ticketId', 'drawDate', 'province'), limit, start_key, is_pending_ticket
+            )
+            return [_project(t, PENDING_INDEX_ATTRIBUTES) for t in items], last_key
+
+    def settle_ticket(self, ticket_id, updates, quantity):
+        with self.lock:
+            ticket = self.tickets.get(ticket_id, {'ticketId': ticket_id})
+            if not _settle_condition(ticket, quantity):
+                raise AlreadySettled(ticket_id)
+            self.tickets[ticket_id] = _settled(ticket, updates)
+
+    def update_ticket_quantity(self, ticket_id, quantity, updated_at, total_win_amount=None):
+        with self.lock:
+            ticket = self.tickets.get(ticket_id)
+            if not _quantity_condition(ticket, total_win_amount):
+                return False
+            ticket.update(quantity=quantity, updatedAt=updated_at)
+            if total_win_amount is not None:
+                ticket['totalWinAmount'] = _plain(total_win_amount)
+            return True
+
+    # Results
+
+    def get_draw(self, province, date):
+        with self.lock:
+            return copy.deepcopy(self.results.get((province, date)))
+
+    def batch_get_draws(self, draw_keys, keys_only=False):
+        with self.lock:
+            found = {}
+            for draw_key in draw_keys:
+                item = self.results.get(tuple(draw_key))
+                if item is not None:
+                    found[tuple(draw_key)] = _project(item, ('province', 'date')) if keys_only else copy.deepcopy(item)
+            return found
+
+    def put_draw_if_absent(self, item):
+        with self.lock:
+            draw_key = (item['province'], item['date'])
+            if draw_key in self.results:
+                return False
+            self.results[draw_key] = _plain(item)
+            return True
+
+    # Leases
+
+    def acquire_lease(self, lease_id, owner, duration):
+        now = int(time.time())
+        with self.lock:
+            lease = self.leases.get(lease_id)
+            if lease and lease['expiresAt'] >= now and lease['owner'] != owner:
+                return False
+            self.leases[lease_id] = {'leaseId': lease_id, 'owner': owner, 'expiresAt': now + duration, 'heartbeatAt': now}
+            return True
+
+    def renew_lease(self, lease_id, owner, duration):
+        now = int(time.time())
+        with self.lock:
+            lease = self.leases.get(lease_id)
+            if not lease or lease['owner'] != owner:
+                return False
+            lease.update(expiresAt=now + duration, heartbeatAt=now)
+            return True
+
+    def get_lease(self, lease_id):
+        with self.lock:
+            return copy.deepcopy(self.leases.get(lease_id))
+
+    def release_lease(self, lease_id, owner):
+        with self.lock:
+            lease = self.leases.get(lease_id)
+            if lease and lease['owner'] == owner:
+                del self.leases[lease_id]
+
+    # Notification digest ledgers
+
+    def get_digest_ledger(self, digest_id):
+        with self.lock:
+            return copy.deepcopy(self.digests.get(digest_id))
+
+    def put_digest_ledger(self, ledger, expected_version):
+        with self.lock:
+            current = self.digests.get(ledger['digestId'])
+            if (current['version'] if current else None) != expected_version:
+                return False
+            self.digests[ledger['digestId']] = _plain(ledger)
+            return True
+
+    # Device endpoint cache
+
+    def get_device(self, device_token):
+        with self.lock:
+            return copy.deepcopy(self.devices.get(device_token))
+
+    def put_device(self, item):
+        with self.lock:
+            self.devices[item['deviceToken']] = _plain(item)
+
+
+class SqliteStorage:
+    """
+    Single-file backend for local runs that outlive the process. Items are stored as JSON next
+    to their key and index columns; one connection guarded by a lock serves every thread.
+    """
+
+    SCHEMA = [
+        'CREATE TABLE IF NOT EXISTS tickets (ticket_id TEXT PRIMARY KEY, user_id TEXT, draw_date TEXT, province TEXT, item TEXT NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS tickets_user ON tickets (user_id, ticket_id)',
+        'CREATE INDEX IF NOT EXISTS tickets_draw_date ON tickets (draw_date, province, ticket_id)',
+        'CREATE TABLE IF NOT EXISTS ticket_details (ticket_id TEXT PRIMARY KEY, item TEXT NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS results (province TEXT, date TEXT, item TEXT NOT NULL, PRIMARY KEY (province, date))',
+        'CREATE TABLE IF NOT EXISTS leases (lease_id TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at INTEGER NOT NULL, heartbeat_at INTEGER NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS digests (digest_id TEXT PRIMARY KEY, version INTEGER NOT NULL, item TEXT NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS devices (device_token TEXT PRIMARY KEY, item TEXT NOT NULL)'
+    ]
+
+    def __init__(self, path=STORAGE_SQLITE_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        for statement in self.SCHEMA:
+            self.conn.execute(statement)
+
+    def _write_ticket(self, item):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO tickets (ticket_id, user_id, draw_date, province, item) VALUES (?, ?, ?, ?, ?)',
+            (item['ticketId'], item.get('userId'), item.get('drawDate'), item.get('province'),
+             json.dumps(item, default=_json_default))
+        )
+
+    def _write_details(self, item):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO ticket_details (ticket_id, item) VALUES (?, ?)',
+            (item['ticketId'], json.dumps(item, default=_json_default))
+        )
+
+    # Tickets
+
+    def put_ticket(self, item):
+        with self.lock:
+            self._write_ticket(item)
+
+    def put_ticket_if_absent(self, item):
+        with self.lock:
+            cursor = self.conn.execute(
+                'INSERT OR IGNORE INTO tickets (ticket_id, user_id, draw_date, province, item) VALUES (?, ?, ?, ?, ?)',
+                (item['ticketId'], item.get('userId'), item.get('drawDate'), item.get('province'),
+                 json.dumps(item, default=_json_default))
+            )
+        return cursor.rowcount == 1
+
+    def put_tickets(self, items, details=()):
+        # One transaction for the whole load instead of one commit per row
+        with self.lock:
+            self.conn.execute('BEGIN')
+            try:
+                for item in items:
+                    self._write_ticket(item)
+                for item in details:
+                    self._write_details(item)
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        return []
+
+    def put_ticket_details(self, item):
+        with self.lock:
+            self._write_details(item)
+
+    def get_ticket(self, ticket_id, consistent=False):
+        with self.lock:
+            row = self.conn.execute('SELECT item FROM tickets WHERE ticket_id = ?', (ticket_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query_user_tickets(self, user_id, limit=None, start_key=None):
+        with self.lock:
+            rows = self.conn.execute('SELECT item FROM tickets WHERE user_id = ?', (user_id,)).fetchall()
+        return _page([json.loads(r[0]) for r in rows], _user_index_order, ('ticketId', 'userId'), limit, start_key)
+
+    def query_pending_tickets(self, draw_date, limit=None, start_key=None):
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT item FROM tickets WHERE draw_date = ? AND province IS NOT NULL', (draw_date,)
+            ).fetchall()
+        items, last_key = _page(
+            [json.loads(r[0]) for r in rows], _pending_index_order, ('ticketId', 'drawDate', 'province'),
+            limit, start_key, is_pending_ticket
+        )
+        return [_project(t, PENDING_INDEX_ATTRIBUTES) for t in items], last_key
+
+    def settle_ticket(self, ticket_id, updates, quantity):
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self.conn.execute('SELECT item FROM tickets WHERE ticket_id = ?', (ticket_id,)).fetchone()
+                ticket = json.loads(row[0]) if row else {'ticketId': ticket_id}
+                if not _settle_condition(ticket, quantity):
+                    raise AlreadySettled(ticket_id)
+                self._write_ticket(_settled(ticket, updates))
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+
+    def update_ticket_quantity(self, ticket_id, quantity, updated_at, total_win_amount=None):
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self.conn.execute('SELECT item FROM tickets WHERE ticket_id = ?', (ticket_id,)).fetchone()
+                ticket = json.loads(row[0]) if row else None
+                if not _quantity_condition(ticket, total_win_amount):
+                    self.conn.execute('ROLLBACK')
+                    return False
+                ticket.update(quantity=quantity, updatedAt=updated_at)
+                if total_win_amount is not None:
+                    ticket['totalWinAmount'] = _plain(total_win_amount)
+                self._write_ticket(ticket)
+                self.conn.execute('COMMIT')
+                return True
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+
+    # Results
+
+    def get_draw(self, province, date):
+        with self.lock:
+            row = self.conn.execute('SELECT item FROM results WHERE province = ? AND date = ?', (province, date)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def batch_get_draws(self, draw_keys, keys_only=False):
+        found = {}
+        with self.lock:
+            for province, date in draw_keys:
+                row = self.conn.execute('SELECT item FROM results WHERE province = ? AND date = ?', (province, date)).fetchone()
+                if row:
+                    found[(province, date)] = {'province': province, 'date': date} if keys_only else json.loads(row[0])
+        return found
+
+    def put_draw_if_absent(self, item):
+        with self.lock:
+            cursor = self.conn.execute(
+                'INSERT OR IGNORE INTO results (province, date, item) VALUES (?, ?, ?)',
+                (item['province'], item['date'], json.dumps(item, default=_json_default))
+            )
+        return cursor.rowcount == 1
+
+    # Leases
+
+    def acquire_lease(self, lease_id, owner, duration):
+        now = int(time.time())
+        with self.lock:
+            cursor = self.conn.execute(
+                'INSERT INTO leases (lease_id, owner, expires_at, heartbeat_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (lease_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at, '
+                'heartbeat_at = excluded.heartbeat_at WHERE leases.expires_at < ? OR leases.owner = excluded.owner',
+                (lease_id, owner, now + duration, now, now)
+            )
+        return cursor.rowcount == 1
+
+    def renew_lease(self, lease_id, owner, duration):
+        now = int(time.time())
+        with self.lock:
+            cursor = self.conn.execute(
+                'UPDATE leases SET expires_at = ?, heartbeat_at = ? WHERE lease_id = ? AND owner = ?',
+                (now + duration, now, lease_id, owner)
+            )
+        return cursor.rowcount == 1
+
+    def get_lease(self, lease_id):
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT owner, expires_at, heartbeat_at FROM leases WHERE lease_id = ?', (lease_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return {'leaseId': lease_id, 'owner': row[0], 'expiresAt': row[1], 'heartbeatAt': row[2]}
+
+    def release_lease(self, lease_id, owner):
+        with self.lock:
+            self.conn.execute('DELETE FROM leases WHERE lease_id = ? AND owner = ?', (lease_id, owner))
+
+    # Notification digest ledgers
+
+    def get_digest_ledger(self, digest_id):
+        with self.lock:
+            row = self.conn.execute('SELECT item FROM digests WHERE digest_id = ?', (digest_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_digest_ledger(self, ledger, expected_version):
+        item = json.dumps(ledger, default=_json_default)
+        with self.lock:
+            if expected_version is None:
+                cursor = self.conn.execute(
+                    'INSERT OR IGNORE INTO digests (digest_id, version, item) VALUES (?, ?, ?)',
+                    (ledger['digestId'], ledger['version'], item)
+                )
+            else:
+                cursor = self.conn.execute(
+                    'UPDATE digests SET version = ?, item = ? WHERE digest_id = ? AND version = ?',
+                    (ledger['version'], item, ledger['digestId'], expected_version)
+                )
+        return cursor.rowcount == 1
+
+    # Device endpoint cache
+
+    def get_device(self, device_token):
+        with self.lock:
+            row = self.conn.execute('SELECT item FROM devices WHERE device_token = ?', (device_token,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_device(self, item):
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO devices (device_token, item) VALUES (?, ?)',
+                (item['deviceToken'], json.dumps(item, default=_json_default))
+            )
+
+
+_storage = None
+
+
+def get_storage():
+    """Container-scoped backend selected by STORAGE_BACKEND (dynamodb, memory or sqlite)"""
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == 'memory':
+            _storage = MemoryStorage()
+        elif STORAGE_BACKEND == 'sqlite':
+            _storage = SqliteStorage()
+        else:
+            _storage = DynamoStorage()
+    return _storage
+
+
+def set_storage(storage):
+    """Install a backend explicitly (local harnesses and benchmarks)"""
+    global _storage
+    _storage = storage
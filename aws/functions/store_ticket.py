@@ -1,15 +1,151 @@
 import json
 import uuid
-import boto3
 from datetime import datetime
-import os
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(os.environ['DYNAMODB_TICKETS_TABLE'])
+from functions.instrumentation import instrument_handler
+from functions.provinces import get_province_key
+from functions.storage import get_storage
+from functions.ticket_archive import get_details_expiry
+from functions.verdict_writer import write_in_parallel
 
+REQUIRED_FIELDS = ['userId', 'ticketNumber', 'province', 'drawDate', 'region']
+
+# Bulky, rarely-read attributes kept in the ticket-details side table instead of the ticket
+# item, so GSI reads and index writes don't pay for them
+COLD_ATTRIBUTES = ['ocrRawText', 'userEmail']
+
+# Namespace for ticket IDs derived from client idempotency keys
+IDEMPOTENCY_NAMESPACE = uuid.UUID('6f1c2a8e-3d4b-5e6f-9a0b-1c2d3e4f5a6b')
+
+MAX_BATCH_TICKETS = 100
+
+def validate_ticket(ticket):
+    """Returns: the first missing required field, or None"""
+    for field in REQUIRED_FIELDS:
+        if not ticket.get(field):
+            return field
+    return None
+
+def get_ticket_id(ticket):
+    """
+    Ticket ID for a new ticket. With a client-supplied idempotencyKey the ID is derived
+    from (userId, idempotencyKey), so a retried request maps onto the same row.
+    """
+    idempotency_key = ticket.get('idempotencyKey')
+    if idempotency_key:
+        return str(uuid.uuid5(IDEMPOTENCY_NAMESPACE, f"{ticket['userId']}:{idempotency_key}"))
+    return str(uuid.uuid4())
+
+def build_ticket_item(ticket, ticket_id):
+    """Prepare the DynamoDB item for a validated ticket payload"""
+    now = datetime.utcnow().isoformat()
+    item = {
+        'ticketId': ticket_id,
+        'userId': ticket['userId'],
+        'ticketNumber': ticket['ticketNumber'],
+        'province': get_province_key(ticket['province']),
+        'drawDate': ticket['drawDate'],
+        'region': ticket['region'],
+        'deviceToken': ticket.get('deviceToken', ''),
+        'scannedAt': ticket.get('scannedAt', now),
+        'imagePath': ticket.get('imagePath', ''),
+        'status': 'pending',
+        'processed': False,
+        'createdAt': now,
+        'updatedAt': now
+    }
+    if ticket.get('idempotencyKey'):
+        item['idempotencyKey'] = ticket['idempotencyKey']
+    return item
+
+def build_details_item(ticket, ticket_id):
+    """
+    Prepare the ticket-details item, or None if the payload has no cold attributes.
+    It carries its own expiresAt so TTL removes it along with the ticket instead of orphaning it.
+    """
+    details = {field: ticket[field] for field in COLD_ATTRIBUTES if ticket.get(field)}
+    if not details:
+        return None
+    details['ticketId'] = ticket_id
+    details['expiresAt'] = get_details_expiry(ticket['drawDate'])
+    return details
+
+def put_keyed_ticket(item, details, already_stored):
+    """
+    Conditional put of a ticket with an idempotency key; runs on a writer thread.
+    A ticket already stored by an earlier attempt is left untouched (even if settled since)
+    and its ID added to already_stored.
+    """
+    store = get_storage()
+    if not store.put_ticket_if_absent(item):
+        already_stored.add(item['ticketId'])
+        return
+
+    if details:
+        try:
+            store.put_ticket_details(details)
+        except Exception as e:
+            # Details are best-effort; the ticket itself was stored
+            print(f"⚠️ Could not store details for ticket {item['ticketId']}: {e}")
+
+def store_ticket_batch(tickets):
+    """
+    Store several tickets in one request.
+    Tickets whose idempotencyKey was already stored (client retries) are not written again.
+    Returns: response body dict
+    """
+    results = []
+    items = []
+    seen_ids = set()
+    tickets_by_id = {}
+
+    for ticket in tickets:
+        ticket_id = get_ticket_id(ticket)
+        if ticket_id in seen_ids:
+            # Same idempotency key twice in one request
+            results.append({'ticketId': ticket_id, 'alreadyStored': True})
+            continue
+        seen_ids.add(ticket_id)
+        tickets_by_id[ticket_id] = ticket
+        items.append(build_ticket_item(ticket, ticket_id))
+        results.append({'ticketId': ticket_id, 'alreadyStored': False})
+
+    # Retried tickets (idempotencyKey) are written one by one with attribute_not_exists, in
+    # parallel: BatchWriteItem cannot be conditional, and a check-then-write would let a
+    # concurrent or late retry overwrite the stored (possibly settled) ticket
+    keyed_items = [item for item in items if 'idempotencyKey' in item]
+    already_stored = set()
+    failed = write_in_parallel(
+        lambda item: put_keyed_ticket(item, build_details_item(tickets_by_id[item['ticketId']], item['ticketId']), already_stored),
+        ((item['ticketId'], item) for item in keyed_items)
+    )
+    if already_stored:
+        print(f"Skipped {len(already_stored)} tickets already stored by an earlier attempt")
+
+    # Tickets without a key get fresh IDs and cannot collide, so they go through BatchWriteItem
+    unkeyed_items = [item for item in items if 'idempotencyKey' not in item]
+    details_items = [build_details_item(tickets_by_id[item['ticketId']], item['ticketId']) for item in unkeyed_items]
+    failed.update(get_storage().put_tickets(unkeyed_items, [details for details in details_items if details]))
+    for result in results:
+        if result['ticketId'] in already_stored:
+            result['alreadyStored'] = True
+        result['success'] = result['ticketId'] not in failed
+
+    stored_count = len(items) - len(failed) - len(already_stored)
+    print(f"✅ Stored {stored_count} tickets ({len(already_stored)} already stored, {len(failed)} failed)")
+
+    return {
+        'success': not failed,
+        'tickets': results,
+        'storedCount': stored_count,
+        'failedCount': len(failed)
+    }
+
+@instrument_handler('storeTicket')
 def handler(event, context):
     """
-    Store a lottery ticket in DynamoDB for future processing
+    Store a lottery ticket in DynamoDB for future processing.
+    Accepts a single ticket payload, or {"tickets": [...]} to store a multi-ticket scan at once.
     """
     try:
         # Parse request body
@@ -17,11 +153,20 @@ def handler(event, context):
             body = json.loads(event['body'])
         else:
             body = event.get('body', {})
-        
-        # Required fields
-        required_fields = ['userId', 'ticketNumber', 'province', 'drawDate', 'region']
-        for field in required_fields:
-            if not body.get(field):
+
+        if 'tickets' in body:
+            tickets = body['tickets']
+            if not isinstance(tickets, list) or not tickets or len(tickets) > MAX_BATCH_TICKETS:
+                error = f'tickets must be a list of 1 to {MAX_BATCH_TICKETS} tickets'
+            else:
+                error = None
+                for position, ticket in enumerate(tickets):
+                    missing = validate_ticket(ticket) if isinstance(ticket, dict) else 'ticket'
+                    if missing:
+                        error = f'Missing required field: {missing} (ticket {position})'
+                        break
+
+            if error:
                 return {
                     'statusCode': 400,
                     'headers': {
@@ -31,43 +176,61 @@ def handler(event, context):
                     },
                     'body': json.dumps({
                         'success': False,
-                        'error': f'Missing required field: {field}'
+                        'error': error
                     })
                 }
-        
-        # Always create a new ticket (no deduplication here)
+
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Methods': 'OPTIONS,POST'
+                },
+                'body': json.dumps(store_ticket_batch(tickets))
+            }
+
+        # Required fields
+        missing = validate_ticket(body)
+        if missing:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Methods': 'OPTIONS,POST'
+                },
+                'body': json.dumps({
+                    'success': False,
+                    'error': f'Missing required field: {missing}'
+                })
+            }
+
+        # Always create a new ticket (no deduplication here) unless the client retries with the same idempotencyKey
         user_id = body['userId']
-        ticket_number = body['ticketNumber']
-        province = body['province']
-        draw_date = body['drawDate']
-        
+
         # Generate ticket ID
-        ticket_id = str(uuid.uuid4())
-        
+        ticket_id = get_ticket_id(body)
+
         # Prepare ticket data
-        ticket_data = {
-            'ticketId': ticket_id,
-            'userId': user_id,
-            'ticketNumber': ticket_number,
-            'province': province,
-            'drawDate': draw_date,
-            'region': body['region'],
-            'deviceToken': body.get('deviceToken', ''),
-            'userEmail': body.get('userEmail', ''),
-            'scannedAt': body.get('scannedAt', datetime.utcnow().isoformat()),
-            'ocrRawText': body.get('ocrRawText', ''),
-            'imagePath': body.get('imagePath', ''),
-            'status': 'pending',
-            'processed': False,
-            'createdAt': datetime.utcnow().isoformat(),
-            'updatedAt': datetime.utcnow().isoformat()
-        }
-        
+        ticket_data = build_ticket_item(body, ticket_id)
+
         # Store in DynamoDB
-        table.put_item(Item=ticket_data)
-        
-        print(f"✅ Stored ticket {ticket_id} for user {user_id}")
-        
+        store = get_storage()
+        already_stored = False
+        if 'idempotencyKey' in ticket_data:
+            if not store.put_ticket_if_absent(ticket_data):
+                already_stored = True
+                print(f"Ticket {ticket_id} already stored for idempotency key {ticket_data['idempotencyKey']}")
+        else:
+            store.put_ticket(ticket_data)
+
+        if not already_stored:
+            details = build_details_item(body, ticket_id)
+            if details:
+                store.put_ticket_details(details)
+            print(f"✅ Stored ticket {ticket_id} for user {user_id}")
+
         return {
             'statusCode': 200,
             'headers': {
@@ -78,11 +241,12 @@ def handler(event, context):
             'body': json.dumps({
                 'success': True,
                 'isDuplicate': False,
+                'alreadyStored': already_stored,
                 'ticketId': ticket_id,
-                'message': 'Ticket stored successfully'
+                'message': 'Ticket already stored' if already_stored else 'Ticket stored successfully'
             })
         }
-        
+
     except Exception as e:
         print(f"❌ Error storing ticket: {str(e)}")
         return {
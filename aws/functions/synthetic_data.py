@@ -0,0 +1,290 @@
+import datetime
+import itertools
+import json
+import random
+import uuid
+
+from functions.draw_calendar import get_draws, get_region_draw_time
+from functions.provinces import get_region_from_province
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Seeded synthetic draws and tickets for benchmarks, load tests and local backends.
+# NumPy is optional: with it, draws for a whole date range and each chunk of tickets are
+# sampled column-wise in a handful of vectorized calls; without it the same distributions
+# are sampled with the random module. A seed reproduces the same data on the same path
+# (the NumPy and random streams differ).
+
+# Prize tiers per region as (tier, numbers drawn, digits), in xoso188 detail[] order
+PRIZE_LAYOUT = {
+    'north': (
+        ('DB', 1, 5), ('G1', 1, 5), ('G2', 2, 5), ('G3', 6, 5),
+        ('G4', 4, 4), ('G5', 6, 4), ('G6', 3, 3), ('G7', 4, 2)
+    ),
+    'south': (
+        ('DB', 1, 6), ('G1', 1, 5), ('G2', 1, 5), ('G3', 2, 5), ('G4', 7, 5),
+        ('G5', 1, 4), ('G6', 3, 4), ('G7', 1, 3), ('G8', 1, 2)
+    )
+}
+PRIZE_LAYOUT['central'] = PRIZE_LAYOUT['south']
+
+TICKET_DIGITS = {'north': 5, 'south': 6, 'central': 6}
+
+# Ticket distributions (defaults for generate_tickets)
+# - users: Zipf-like, user of rank r buys in proportion to r ** -USER_SKEW
+# - numbers: uniform, except LUCKY_SHARE of tickets end in a favoured pair
+# - duplicates: DUPLICATE_RATE of tickets are bought several times (quantity 2..MAX_QUANTITY)
+USER_SKEW = 0.8
+LUCKY_ENDINGS = (68, 86, 79, 39, 99, 88, 66, 36, 38, 78)
+LUCKY_SHARE = 0.2
+DUPLICATE_RATE = 0.08
+MAX_QUANTITY = 10
+
+# Tickets are scanned between 06:00 and the first draw of the day
+SCAN_WINDOW_SECONDS = (6 * 3600, 16 * 3600)
+
+TICKET_CHUNK_SIZE = 100000
+
+# Every field a generate_tickets item can carry, with its Arrow type: the Parquet schema for
+# tickets, since a chunk only has quantity if one of its tickets was bought more than once
+TICKET_COLUMNS = (
+    ('ticketId', 'string'), ('userId', 'string'), ('ticketNumber', 'string'), ('province', 'string'),
+    ('drawDate', 'string'), ('region', 'string'), ('deviceToken', 'string'), ('scannedAt', 'string'),
+    ('imagePath', 'string'), ('status', 'string'), ('processed', 'bool'), ('createdAt', 'string'),
+    ('updatedAt', 'string'), ('quantity', 'int64')
+)
+
+SYNTHETIC_NAMESPACE = uuid.UUID('0b7d3f5e-9a2c-4e61-8d17-5c4b2a9f6e30')
+
+
+def make_rng(seed=None):
+    """NumPy Generator when NumPy is installed, else random.Random"""
+    return np.random.default_rng(seed) if np is not None else random.Random(seed)
+
+
+def _uses_numpy(rng):
+    return np is not None and isinstance(rng, np.random.Generator)
+
+
+def _integers(rng, highs):
+    """One integer in [0, high) per entry of highs"""
+    if _uses_numpy(rng):
+        return rng.integers(0, np.asarray(highs, dtype=np.int64)).tolist()
+    return [rng.randrange(high) for high in highs]
+
+
+def _draw_highs(region):
+    return [10 ** digits for _, count, digits in PRIZE_LAYOUT[region] for _ in range(count)]
+
+
+def _split_prizes(region, values):
+    prizes = {}
+    position = 0
+    for tier, count, digits in PRIZE_LAYOUT[region]:
+        prizes[tier] = [f"{value:0{digits}d}" for value in values[position:position + count]]
+        position += count
+    return prizes
+
+
+def generate_prizes(region, rng):
+    """Prize map for one draw with the region's tier counts and digit lengths"""
+    return _split_prizes(region, _integers(rng, _draw_highs(region)))
+
+
+def _draw_item(draw, draw_date, prizes):
+    published_at = draw['drawTime'] + datetime.timedelta(minutes=35)
+    return {
+        'province': draw['province'],
+        'date': draw_date,
+        'region': draw['region'],
+        'prizes': prizes,
+        'createdAt': published_at.replace(tzinfo=None).isoformat(),
+        'source': 'synthetic'
+    }
+
+
+def generate_draw(province, draw_date, rng=None):
+    """Results item for one province and date (same shape fetchDailyResults stores)"""
+    region = get_region_from_province(province)
+    draw = {'province': province, 'region': region, 'drawTime': get_region_draw_time(region, draw_date)}
+    return _draw_item(draw, draw_date, generate_prizes(region, rng or make_rng()))
+
+
+def iter_draw_dates(start_date, end_date):
+    day = datetime.date.fromisoformat(start_date)
+    end = datetime.date.fromisoformat(end_date)
+    while day <= end:
+        yield day.isoformat()
+        day += datetime.timedelta(days=1)
+
+
+def generate_draws(start_date, end_date, rng, regions=None):
+    """
+    Results items for every calendar draw from start_date to end_date (inclusive),
+    holiday suspensions excluded; all prize numbers are sampled in one call.
+    """
+    scheduled = [
+        (draw, draw_date)
+        for draw_date in iter_draw_dates(start_date, end_date)
+        for draw in get_draws(draw_date)
+        if not regions or draw['region'] in regions
+    ]
+    highs = [_draw_highs(draw['region']) for draw, _ in scheduled]
+    values = _integers(rng, list(itertools.chain.from_iterable(highs)))
+
+    items = []
+    position = 0
+    for (draw, draw_date), draw_highs in zip(scheduled, highs):
+        prizes = _split_prizes(draw['region'], values[position:position + len(draw_highs)])
+        position += len(draw_highs)
+        items.append(_draw_item(draw, draw_date, prizes))
+    return items
+
+
+def _sample_ticket_columns(rng, size, user_cum_weights, draw_digits, duplicate_rate, lucky_share):
+    """Column-wise sample of one chunk: lists of user index, draw index, number, quantity, scan offset, id bytes"""
+    if _uses_numpy(rng):
+        users = np.searchsorted(user_cum_weights, rng.random(size) * user_cum_weights[-1], side='right')
+        draws = rng.integers(0, len(draw_digits), size)
+        numbers = rng.integers(0, 10 ** np.asarray(draw_digits, dtype=np.int64)[draws])
+        endings = np.asarray(LUCKY_ENDINGS)[rng.integers(0, len(LUCKY_ENDINGS), size)]
+        numbers = np.where(rng.random(size) < lucky_share, numbers // 100 * 100 + endings, numbers)
+        extra = np.minimum(rng.geometric(0.5, size), MAX_QUANTITY - 1)
+        quantities = np.where(rng.random(size) < duplicate_rate, 1 + extra, 1)
+        scanned = rng.integers(*SCAN_WINDOW_SECONDS, size)
+        return (users.tolist(), draws.tolist(), numbers.tolist(), quantities.tolist(),
+                scanned.tolist(), rng.bytes(16 * size))
+
+    users = rng.choices(range(len(user_cum_weights)), cum_weights=user_cum_weights, k=size)
+    draws = [rng.randrange(len(draw_digits)) for _ in range(size)]
+    numbers = []
+    quantities = []
+    for draw in draws:
+        number = rng.randrange(10 ** draw_digits[draw])
+        if rng.random() < lucky_share:
+            number = number // 100 * 100 + rng.choice(LUCKY_ENDINGS)
+        numbers.append(number)
+        quantity = 1
+        if rng.random() < duplicate_rate:
+            while quantity < MAX_QUANTITY:
+                quantity += 1
+                if rng.random() < 0.5:
+                    break
+        quantities.append(quantity)
+    scanned = [rng.randrange(*SCAN_WINDOW_SECONDS) for _ in range(size)]
+    return users, draws, numbers, quantities, scanned, rng.randbytes(16 * size)
+
+
+def generate_users(count, seed=0):
+    """(userId, deviceToken) pairs; device tokens are derived from the seed so reruns match"""
+    return [
+        (f"synthetic-user-{i:07d}", uuid.uuid5(SYNTHETIC_NAMESPACE, f"{seed}:{i}").hex * 2)
+        for i in range(count)
+    ]
+
+
+def generate_tickets(count, draws, users, rng, duplicate_rate=DUPLICATE_RATE, lucky_share=LUCKY_SHARE,
+                     chunk_size=TICKET_CHUNK_SIZE):
+    """
+    Pending ticket items (same shape storeTicket writes) for the given draws (results items,
+    see generate_draws) and users (see generate_users), spread uniformly over the draws.
+    Yields: lists of up to chunk_size items, so millions of tickets never sit in memory at once
+    """
+    user_cum_weights = list(itertools.accumulate((rank + 1) ** -USER_SKEW for rank in range(len(users))))
+    draw_digits = [TICKET_DIGITS[draw['region']] for draw in draws]
+
+    for start in range(0, count, chunk_size):
+        size = min(chunk_size, count - start)
+        users_idx, draws_idx, numbers, quantities, scanned, id_bytes = _sample_ticket_columns(
+            rng, size, user_cum_weights, draw_digits, duplicate_rate, lucky_share
+        )
+        chunk = []
+        for i in range(size):
+            user_id, device_token = users[users_idx[i]]
+            draw = draws[draws_idx[i]]
+            scanned_at = f"{draw['date']}T{scanned[i] // 3600:02d}:{scanned[i] // 60 % 60:02d}:{scanned[i] % 60:02d}"
+            item = {
+                'ticketId': str(uuid.UUID(bytes=id_bytes[16 * i:16 * i + 16], version=4)),
+                'userId': user_id,
+                'ticketNumber': f"{numbers[i]:0{draw_digits[draws_idx[i]]}d}",
+                'province': draw['province'],
+                'drawDate': draw['date'],
+                'region': draw['region'],
+                'deviceToken': device_token,
+                'scannedAt': scanned_at,
+                'imagePath': '',
+                'status': 'pending',
+                'processed': False,
+                'createdAt': scanned_at,
+                'updatedAt': scanned_at
+            }
+            if quantities[i] > 1:
+                item['quantity'] = quantities[i]
+            chunk.append(item)
+        yield chunk
+
+
+def write_jsonl(path, chunks):
+    """Write lists of items as JSON lines. Returns: number of items written"""
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            for item in chunk:
+                f.write(json.dumps(item, ensure_ascii=False))
+                f.write('\n')
+            written += len(chunk)
+    return written
+
+
+def write_parquet(path, chunks, columns=None):
+    """
+    Write lists of items as one Parquet file (requires pyarrow). Nested values (prize maps)
+    are stored as JSON strings.
+    columns: (name, Arrow type) pairs fixing the schema, with None written where an item lacks
+    a column (see TICKET_COLUMNS); without it the schema comes from the first chunk
+    Returns: number of items written
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(name, pa.type_for_alias(type_name)) for name, type_name in columns]) if columns else None
+    writer = None
+    written = 0
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            names = schema.names if schema is not None else dict.fromkeys(key for item in chunk for key in item)
+            arrays = {}
+            for name in names:
+                values = [item.get(name) for item in chunk]
+                if any(isinstance(v, dict) for v in values):
+                    values = [json.dumps(v, ensure_ascii=False) if v is not None else None for v in values]
+                arrays[name] = values
+            table = pa.table(arrays, schema=schema)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            else:
+                table = table.select(writer.schema.names).cast(writer.schema)
+            writer.write_table(table)
+            written += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
+
+def load_into_storage(store, draws, ticket_chunks):
+    """
+    Put draws (skipping ones already stored) and tickets into a storage backend.
+    Returns: (draws stored, tickets stored)
+    """
+    stored_draws = sum(1 for item in draws if store.put_draw_if_absent(item))
+    stored_tickets = 0
+    for chunk in ticket_chunks:
+        failed = store.put_tickets(chunk)
+        stored_tickets += len(chunk) - len(failed)
+    return stored_draws, stored_tickets
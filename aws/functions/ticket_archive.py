@@ -0,0 +1,119 @@
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from decimal import Decimal
+
+# Settled tickets stay in the hot table this long; DynamoDB TTL then expires them and the
+# stream-triggered archiveExpiredTickets function moves them to S3
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '90'))
+
+# Ticket-details items are written before the ticket is settled (and gets its expiresAt), so
+# they expire this long after the ticket would if it were settled on draw night
+DETAILS_EXPIRY_GRACE_DAYS = 30
+
+ARCHIVE_PREFIX = 'tickets'
+
+# Parallel S3 reads when loading a user's archive (the low-level client is thread-safe)
+MAX_READ_WORKERS = 8
+
+
+def get_archive_expiry(now=None):
+    """Epoch seconds for the expiresAt (TTL) attribute of a ticket settled now"""
+    now = now if now is not None else time.time()
+    return int(now) + ARCHIVE_AFTER_DAYS * 24 * 3600
+
+
+def get_details_expiry(draw_date, now=None):
+    """
+    Epoch seconds for the expiresAt (TTL) attribute of a ticket-details item: ARCHIVE_AFTER_DAYS
+    plus DETAILS_EXPIRY_GRACE_DAYS after the draw (or after now, for tickets stored late)
+    """
+    now = now if now is not None else time.time()
+    try:
+        draw_time = datetime.strptime(draw_date, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        draw_time = now
+    return get_archive_expiry(max(draw_time, now)) + DETAILS_EXPIRY_GRACE_DAYS * 24 * 3600
+
+
+def get_user_prefix(user_id):
+    return f"{ARCHIVE_PREFIX}/{user_id}/"
+
+
+def _to_json_value(obj):
+    if isinstance(obj, list):
+        return [_to_json_value(i) for i in obj]
+    elif isinstance(obj, dict):
+        return {k: _to_json_value(v) for k, v in obj.items()}
+    elif isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    elif isinstance(obj, set):
+        return [_to_json_value(i) for i in sorted(obj)]
+    return obj
+
+
+def get_archive_key(user_id, archived_at, first_sequence, last_sequence):
+    """
+    Object key for one user's share of a stream batch. It depends only on the batch (creation
+    time of its first record and the first/last stream sequence numbers), so a retried batch
+    overwrites its own object instead of archiving the same tickets twice.
+    """
+    day = datetime.fromtimestamp(archived_at, timezone.utc).strftime('%Y-%m-%d')
+    return f"{get_user_prefix(user_id)}{day}/{first_sequence}-{last_sequence}.jsonl.gz"
+
+
+def write_archive(s3, bucket, user_id, tickets, archived_at, first_sequence, last_sequence):
+    """
+    Write one user's expired tickets as a gzip-compressed JSON-lines object.
+    Each stream batch gets its own key under the user's prefix (see get_archive_key).
+    Returns: the object key
+    """
+    lines = '\n'.join(json.dumps(_to_json_value(ticket), ensure_ascii=False) for ticket in tickets)
+    key = get_archive_key(user_id, archived_at, first_sequence, last_sequence)
+
+    s3.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=gzip.compress(lines.encode('utf-8')),
+        ContentType='application/x-ndjson',
+        ContentEncoding='gzip'
+    )
+    return key
+
+
+def _read_archive_object(s3, bucket, key):
+    body = s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+    return [json.loads(line) for line in gzip.decompress(body).decode('utf-8').splitlines() if line.strip()]
+
+
+def read_archived_tickets(s3, bucket, user_id):
+    """
+    Return every archived ticket of a user (in no particular order), once per ticketId.
+    Objects are fetched in parallel; a ticket found in several objects (a stream batch that was
+    retried in a different shape) is returned once.
+    """
+    keys = []
+    list_kwargs = {'Bucket': bucket, 'Prefix': get_user_prefix(user_id)}
+
+    while True:
+        response = s3.list_objects_v2(**list_kwargs)
+        keys.extend(obj['Key'] for obj in response.get('Contents', []))
+
+        if not response.get('IsTruncated'):
+            break
+        list_kwargs['ContinuationToken'] = response['NextContinuationToken']
+
+    if not keys:
+        return []
+
+    tickets = {}
+    with ThreadPoolExecutor(max_workers=min(MAX_READ_WORKERS, len(keys))) as executor:
+        for lines in executor.map(lambda key: _read_archive_object(s3, bucket, key), keys):
+            for ticket in lines:
+                ticket['isArchived'] = True
+                tickets.setdefault(ticket.get('ticketId'), ticket)
+
+    return list(tickets.values())
@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+
+# Parallel DynamoDB writers; use the low-level client (thread-safe) inside write functions,
+# boto3 resources must not be shared across threads
+MAX_WRITE_WORKERS = 16
+
+# Verdict writes only land on tickets nobody has settled yet, so concurrent runs
+# (cron, on-demand fetches, checkTicket) never settle or notify a ticket twice
+PENDING_CONDITION = 'attribute_not_exists(isWinner)'
+
+# Verdict writes store totalWinAmount = winAmount * the quantity the settling run read, so they
+# also require that quantity to be unchanged (:quantity). A concurrent duplicateTicket then fails
+# the write instead of leaving a stale total; the ticket stays pending for the next run.
+SETTLE_CONDITION = f"{PENDING_CONDITION} AND (attribute_not_exists(quantity) OR quantity = :quantity)"
+
+
+class AlreadySettled(Exception):
+    """Raised by a write function when a concurrent run settled the ticket (or changed its quantity) first"""
+
+
+def is_condition_failure(error):
+    """True for a botocore ConditionalCheckFailedException from either client or resource"""
+    response = getattr(error, 'response', None) or {}
+    return response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException'
+
+
+def write_in_parallel(write_fn, jobs, max_workers=MAX_WRITE_WORKERS):
+    """
+    Run write_fn(job) for every (key, job) pair on a thread pool.
+    Returns: set of keys whose write raised (including AlreadySettled)
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return set()
+
+    failed = set()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as executor:
+        futures = {executor.submit(write_fn, job): key for key, job in jobs}
+        for future, key in futures.items():
+            try:
+                future.result()
+            except AlreadySettled:
+                print(f"⏭️ {key} already settled by another run")
+                failed.add(key)
+            except Exception as e:
+                print(f"❌ Write failed for {key}: {e}")
+                failed.add(key)
+
+    return failed
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark the DynamoDB item decoding paths.
+
+Compares, per item shape (results item with nested prizes, ticket item):
+  resource  boto3 TypeDeserializer (what Table.get_item/query run) + the convert-Decimals pass
+  codec     functions.dynamo_codec decoders (plain int/float/str, no Decimal)
+Both paths are checked to produce the same values before timing. Runs offline; items are
+synthetic AttributeValue maps shaped like the stored ones.
+
+Usage examples:
+  python scripts/benchmark_codec.py
+  python scripts/benchmark_codec.py --items 5000 --repeat 7
+
+Requires:
+  pip install boto3
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from boto3.dynamodb.types import TypeDeserializer
+
+from functions.dynamo_codec import decode_item, decode_results_item, encode_value
+
+SOUTH_PRIZE_COUNTS = {'DB': 1, 'G1': 1, 'G2': 1, 'G3': 2, 'G4': 7, 'G5': 1, 'G6': 3, 'G7': 1, 'G8': 1}
+
+
+def make_results_item(rng):
+    prizes = {tier: [f"{rng.randrange(10 ** 6):06d}" for _ in range(count)] for tier, count in SOUTH_PRIZE_COUNTS.items()}
+    return encode_value({
+        'province': 'Bến Tre',
+        'date': '2025-03-04',
+        'region': 'south',
+        'prizes': prizes,
+        'createdAt': '2025-03-04T16:50:00',
+        'updatedAt': '2025-03-04T16:50:00'
+    })['M']
+
+
+def make_ticket_item(rng):
+    return encode_value({
+        'ticketId': f"{rng.getrandbits(64):016x}",
+        'userId': 'user-benchmark',
+        'ticketNumber': f"{rng.randrange(10 ** 6):06d}",
+        'province': 'Bến Tre',
+        'drawDate': '2025-03-04',
+        'region': 'south',
+        'status': 'checked',
+        'isWinner': rng.random() < 0.1,
+        'winAmount': rng.choice([0, 0, 0, 100000, 200000]),
+        'quantity': rng.randint(1, 3),
+        'expiresAt': 1748995200,
+        'scannedAt': '2025-03-04T10:00:00'
+    })['M']
+
+
+def convert_decimals(obj):
+    # The pass get_user_tickets ran over resource-layer items before json.dumps
+    if isinstance(obj, list):
+        return [convert_decimals(i) for i in obj]
+    elif isinstance(obj, dict):
+        return {k: convert_decimals(v) for k, v in obj.items()}
+    elif isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    return obj
+
+
+def resource_path(items):
+    deserializer = TypeDeserializer()
+    return [convert_decimals({k: deserializer.deserialize(v) for k, v in item.items()}) for item in items]
+
+
+def best_per_item_us(func, items, repeat):
+    timings = timeit.repeat(lambda: func(items), number=1, repeat=repeat)
+    return min(timings) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DynamoDB item decoding')
+    parser.add_argument('--items', type=int, default=2000, help='Items per shape')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions (best is reported)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    shapes = [
+        ('results', [make_results_item(rng) for _ in range(args.items)], decode_results_item),
+        ('ticket', [make_ticket_item(rng) for _ in range(args.items)], decode_item)
+    ]
+
+    for name, items, decoder in shapes:
+        codec = lambda batch, decoder=decoder: [decoder(item) for item in batch]
+        if codec(items) != resource_path(items):
+            print(f"{name}: codec output differs from the resource path")
+            sys.exit(1)
+
+        resource_us = best_per_item_us(resource_path, items, args.repeat)
+        codec_us = best_per_item_us(codec, items, args.repeat)
+        print(f"{name:8s}  resource {resource_us:7.2f} us/item  codec {codec_us:7.2f} us/item  speedup {resource_us / codec_us:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Measure cold import time of every Lambda handler module.
+
+Each module is imported in a fresh interpreter (like a Lambda cold start) with dummy
+environment variables, so no AWS access is needed: clients are only constructed, never called.
+Reports the median of --runs imports per module and exits non-zero when any module is over
+--budget-ms, so cold-start regressions (a heavy import or client creation at module level)
+are caught before deploying.
+
+Usage examples:
+  python scripts/benchmark_imports.py
+  python scripts/benchmark_imports.py --runs 10 --budget-ms 800
+  python scripts/benchmark_imports.py --module functions.check_ticket
+
+Requires:
+  pip install boto3 -r requirements.txt
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+AWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HANDLER_MODULES = [
+    'functions.store_ticket',
+    'functions.check_ticket',
+    'functions.settle_user_tickets',
+    'functions.quick_check',
+    'functions.check_ocr_candidates',
+    'functions.get_user_tickets',
+    'functions.process_winners',
+    'functions.fetch_results',
+    'functions.duplicate_ticket',
+    'functions.fetch_daily_results',
+    'functions.archive_tickets',
+    'functions.dispatch_notifications',
+    'functions.capacity_rollup'
+]
+
+DUMMY_ENVIRONMENT = {
+    'DYNAMODB_TICKETS_TABLE': 'xoso-tickets-bench',
+    'DYNAMODB_RESULTS_TABLE': 'xoso-results-bench',
+    'DYNAMODB_TICKET_DETAILS_TABLE': 'xoso-tickets-bench-details',
+    'DYNAMODB_DEVICES_TABLE': 'xoso-devices-bench',
+    'DYNAMODB_LEASES_TABLE': 'xoso-leases-bench',
+    'TICKET_ARCHIVE_BUCKET': 'xoso-ticket-archive-bench',
+    'REGION': 'ap-southeast-1',
+    'AWS_DEFAULT_REGION': 'ap-southeast-1',
+    'AWS_ACCESS_KEY_ID': 'bench',
+    'AWS_SECRET_ACCESS_KEY': 'bench',
+    'STAGE': 'bench'
+}
+
+# Runs in the child interpreter; prints the import time in milliseconds
+TIMER_SNIPPET = (
+    "import time, importlib; t = time.perf_counter(); "
+    "importlib.import_module({module!r}); "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+
+def time_import(module):
+    env = dict(os.environ, **DUMMY_ENVIRONMENT)
+    result = subprocess.run(
+        [sys.executable, '-c', TIMER_SNIPPET.format(module=module)],
+        cwd=AWS_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'import failed')
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark cold import time of the Lambda handler modules')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh-interpreter imports per module')
+    parser.add_argument('--budget-ms', type=float, default=1000.0, help='Fail when a median exceeds this')
+    parser.add_argument('--module', action='append', help='Only benchmark this module (repeatable)')
+    args = parser.parse_args()
+
+    over_budget = []
+    for module in args.module or HANDLER_MODULES:
+        try:
+            timings = [time_import(module) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{module:40s}  ERROR: {e}")
+            over_budget.append(module)
+            continue
+
+        median = statistics.median(timings)
+        flag = '  OVER BUDGET' if median > args.budget_ms else ''
+        print(f"{module:40s}  median {median:8.1f} ms  min {min(timings):8.1f} ms  max {max(timings):8.1f} ms{flag}")
+        if median > args.budget_ms:
+            over_budget.append(module)
+
+    if over_budget:
+        print(f"{len(over_budget)} module(s) over the {args.budget_ms:.0f} ms budget or failing: {', '.join(over_budget)}")
+        sys.exit(1)
+    print(f"All modules within the {args.budget_ms:.0f} ms budget")
+
+
+if __name__ == '__main__':
+    main()
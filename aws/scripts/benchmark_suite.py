@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the hot paths, with stored baselines and a regression gate.
+
+Micro benchmarks (per call):
+  winner.<module>.<region>    check_vietnamese_lottery_winner as checkTicket and fetchDailyResults call it
+  parse.<module>              parse_xoso188_result on a south and a north payload
+  schedule.<case>             should_province_have_drawing for a drawing / non-drawing province
+Macro benchmarks (per handler run):
+  check_ticket.<case>         checkTicket handler on MemoryStorage: settle, already settled, no draw
+  process_pending_tickets     fetchDailyResults' settlement of --pending-tickets tickets on MemoryStorage
+
+Inputs come from functions.synthetic_data with a fixed seed and a fixed draw date, SNS is a
+local stand-in and handler logs go to /dev/null, so nothing leaves the machine. Each benchmark
+reports the best and median of --repeat timings; comparisons use the best.
+
+Usage examples:
+  python scripts/benchmark_suite.py run
+  python scripts/benchmark_suite.py run --save benchmark-baseline.json
+  python scripts/benchmark_suite.py compare benchmark-baseline.json --threshold 0.15
+  python scripts/benchmark_suite.py compare benchmark-baseline.json --current other-run.json
+  python scripts/benchmark_suite.py run --filter winner
+
+Requires:
+  pip install boto3 -r requirements.txt   (boto3 is only imported, never called)
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+AWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AWS_DIR)
+
+DUMMY_ENVIRONMENT = {
+    'DYNAMODB_TICKETS_TABLE': 'xoso-tickets-bench',
+    'DYNAMODB_RESULTS_TABLE': 'xoso-results-bench',
+    'DYNAMODB_TICKET_DETAILS_TABLE': 'xoso-tickets-bench-details',
+    'DYNAMODB_DEVICES_TABLE': 'xoso-devices-bench',
+    'DYNAMODB_LEASES_TABLE': 'xoso-leases-bench',
+    'REGION': 'ap-southeast-1',
+    'AWS_DEFAULT_REGION': 'ap-southeast-1',
+    'AWS_ACCESS_KEY_ID': 'bench',
+    'AWS_SECRET_ACCESS_KEY': 'bench',
+    'STAGE': 'bench',
+    'STORAGE_BACKEND': 'memory',
+    # The SNS publish token bucket would turn process_pending_tickets into a 20/s sleep benchmark
+    'PUSH_PUBLISH_RATE': '1000000',
+    'PUSH_PUBLISH_BURST': '1000000',
+    # Nothing should fetch results; if something does, fail fast instead of reaching the internet
+    'RESULTS_API_BASE': 'http://127.0.0.1:9'
+}
+
+# A Tuesday: three southern, two central and one northern draw
+DRAW_DATE = '2025-03-04'
+SEED = 20250304
+BASELINE_VERSION = 1
+
+
+class LocalSns:
+    class EndpointDisabledException(Exception):
+        pass
+
+    class NotFoundException(Exception):
+        pass
+
+    def __init__(self):
+        self.exceptions = self
+
+    def create_platform_endpoint(self, PlatformApplicationArn, Token, CustomUserData=None):
+        return {'EndpointArn': f"{PlatformApplicationArn}/endpoint/{Token[:16]}"}
+
+    def set_endpoint_attributes(self, EndpointArn, Attributes):
+        return {}
+
+    def publish(self, **kwargs):
+        return {'MessageId': 'bench'}
+
+
+def xoso188_issue(prizes, layout, draw_date):
+    detail = [','.join(prizes[tier]) for tier, _, _ in layout]
+    day = datetime.date.fromisoformat(draw_date)
+    return {'turnNum': day.strftime('%d/%m/%Y'), 'detail': json.dumps(detail)}
+
+
+def build_benchmarks(pending_tickets):
+    """Returns: list of (name, setup or None, function); setup runs untimed before each timing"""
+    from functions import bootstrap, check_ticket, draw_calendar, fetch_daily_results
+    from functions.storage import MemoryStorage, set_storage
+    from functions.synthetic_data import PRIZE_LAYOUT, generate_draws, generate_tickets, generate_users, make_rng
+
+    bootstrap._clients['sns'] = LocalSns()
+
+    rng = make_rng(SEED)
+    draws = generate_draws(DRAW_DATE, DRAW_DATE, rng)
+    draws_by_region = {draw['region']: draw for draw in draws}
+    users = generate_users(max(pending_tickets // 5, 1), seed=SEED)
+    tickets = next(generate_tickets(max(pending_tickets, 300), draws, users, rng))
+
+    benchmarks = []
+
+    # Winner check: cycle through 100 tickets of the region, including one DB and one G8/G7 winner
+    for module_name, module in (('check_ticket', check_ticket), ('fetch_daily_results', fetch_daily_results)):
+        for region, draw in sorted(draws_by_region.items()):
+            numbers = [t['ticketNumber'] for t in tickets if t['region'] == region][:98]
+            numbers += [draw['prizes']['DB'][0], numbers[0][:-2] + draw['prizes']['G8' if region != 'north' else 'G7'][0]]
+            prizes = draw['prizes']
+            benchmarks.append((
+                f"winner.{module_name}.{region}", None,
+                lambda check=module.check_vietnamese_lottery_winner, numbers=numbers, prizes=prizes, region=region:
+                    [check(number, prizes, region) for number in numbers]
+            ))
+
+    # Parsing an API payload
+    issues = [xoso188_issue(draws_by_region[region]['prizes'], PRIZE_LAYOUT[region], DRAW_DATE) for region in ('south', 'north')]
+    for module_name, module in (('check_ticket', check_ticket), ('fetch_daily_results', fetch_daily_results)):
+        benchmarks.append((
+            f"parse.{module_name}", None,
+            lambda parse=module.parse_xoso188_result: [parse(issue) for issue in issues]
+        ))
+
+    # Schedule lookups
+    drawing = draws_by_region['south']['province']
+    benchmarks.append(('schedule.drawing', None, lambda: draw_calendar.should_province_have_drawing(drawing, DRAW_DATE)))
+    benchmarks.append(('schedule.no_drawing', None, lambda: draw_calendar.should_province_have_drawing('Hà Nội', DRAW_DATE)))
+
+    # checkTicket handler on MemoryStorage; the settle case puts its pending ticket back before each run
+    pending = dict(tickets[0], quantity=2)
+    settled = dict(tickets[1], ticketId='bench-settled', isWinner=False, winAmount=0, hasBeenChecked=True)
+    no_draw = dict(tickets[2], ticketId='bench-no-draw', province='Hà Nội', drawDate='2025-03-05', region='north')
+    check_store = MemoryStorage()
+    for draw in draws:
+        check_store.put_draw_if_absent(draw)
+    check_store.put_tickets([pending, settled, no_draw])
+    # Benchmarks run in list order, so this store serves every check_ticket case
+    set_storage(check_store)
+
+    def reset_pending():
+        check_store.put_ticket(pending)
+
+    for case, ticket in (('settle', pending), ('settled', settled), ('no_draw', no_draw)):
+        event = {'body': json.dumps({'ticketId': ticket['ticketId']})}
+        benchmarks.append((
+            f"check_ticket.{case}", reset_pending if case == 'settle' else None,
+            lambda state=None, event=event: check_ticket.handler(event, None)
+        ))
+
+    # Settlement of a draw date's pending tickets; each run starts from a fresh store
+    batch = tickets[:pending_tickets]
+
+    def load_pending():
+        store = MemoryStorage()
+        for draw in draws:
+            store.put_draw_if_absent(draw)
+        store.put_tickets(batch)
+        set_storage(store)
+        return store
+
+    benchmarks.append((
+        'process_pending_tickets', load_pending,
+        lambda store: fetch_daily_results.process_pending_tickets(store, DRAW_DATE)
+    ))
+
+    return benchmarks
+
+
+def time_benchmark(setup, func, repeat, min_time):
+    """Returns: (best, median) seconds per call"""
+    if setup is not None:
+        # Whole runs: one call per timing, fresh state each time
+        timings = []
+        for _ in range(repeat):
+            state = setup()
+            start = time.perf_counter()
+            func(state)
+            timings.append(time.perf_counter() - start)
+        return min(timings), statistics.median(timings)
+
+    # Calibrate the loop count so one timing lasts at least min_time
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return min(timings), statistics.median(timings)
+
+
+def run_suite(args):
+    os.environ.update(DUMMY_ENVIRONMENT)
+    results = {}
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        benchmarks = build_benchmarks(args.pending_tickets)
+        for name, setup, func in benchmarks:
+            if args.filter and not any(f in name for f in args.filter):
+                continue
+            best, median = time_benchmark(setup, func, args.repeat, args.min_time)
+            results[name] = {'bestUs': round(best * 1e6, 3), 'medianUs': round(median * 1e6, 3)}
+            print(f"{name:38s}  best {best * 1e6:12.1f} us  median {median * 1e6:12.1f} us", file=sys.stderr)
+
+    return {
+        'version': BASELINE_VERSION,
+        'createdAt': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'pendingTickets': args.pending_tickets,
+        'benchmarks': results
+    }
+
+
+def load_report(path):
+    with open(path) as f:
+        report = json.load(f)
+    if report.get('version') != BASELINE_VERSION:
+        sys.exit(f"{path}: unsupported baseline version {report.get('version')}")
+    return report
+
+
+def compare_reports(baseline, current, threshold):
+    """Print per-benchmark deltas. Returns: names that regressed beyond threshold"""
+    regressions = []
+    for name, entry in sorted(current['benchmarks'].items()):
+        base = baseline['benchmarks'].get(name)
+        if base is None:
+            print(f"{name:38s}  {entry['bestUs']:12.1f} us  (new, no baseline)")
+            continue
+        change = entry['bestUs'] / base['bestUs'] - 1 if base['bestUs'] else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:38s}  {base['bestUs']:12.1f} -> {entry['bestUs']:12.1f} us  {change:+7.1%}{flag}")
+    for name in sorted(set(baseline['benchmarks']) - set(current['benchmarks'])):
+        print(f"{name:38s}  (in baseline, not run)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark suite with baseline comparison')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run the suite')
+    run_parser.add_argument('--save', help='Write the results as a baseline JSON file')
+
+    compare_parser = subparsers.add_parser('compare', help='Compare against a baseline; exit 1 on regression')
+    compare_parser.add_argument('baseline', help='Baseline JSON written by run --save')
+    compare_parser.add_argument('--current', help='Compare this saved run instead of running the suite')
+    compare_parser.add_argument('--threshold', type=float, default=0.15, help='Allowed slowdown (0.15 = 15%%)')
+
+    for sub in (run_parser, compare_parser):
+        sub.add_argument('--filter', action='append', help='Only benchmarks whose name contains this (repeatable)')
+        sub.add_argument('--repeat', type=int, default=7, help='Timings per benchmark (best and median are kept)')
+        sub.add_argument('--min-time', type=float, default=0.1, help='Seconds per timing for micro benchmarks')
+        sub.add_argument('--pending-tickets', type=int, default=2000, help='Tickets settled by process_pending_tickets')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        report = run_suite(args)
+        if args.save:
+            with open(args.save, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"Baseline written to {args.save}")
+        return
+
+    baseline = load_report(args.baseline)
+    current = load_report(args.current) if args.current else run_suite(args)
+    if current.get('pendingTickets') != baseline.get('pendingTickets'):
+        print(f"⚠️ process_pending_tickets sizes differ ({baseline.get('pendingTickets')} vs {current.get('pendingTickets')} tickets)")
+    if current.get('machine') != baseline.get('machine') or current.get('python') != baseline.get('python'):
+        print(f"⚠️ Baseline from {baseline.get('machine')} / Python {baseline.get('python')}, "
+              f"current {current.get('machine')} / Python {current.get('python')}")
+
+    regressions = compare_reports(baseline, current, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"No benchmark regressed more than {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
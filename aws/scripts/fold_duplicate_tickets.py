@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Fold legacy duplicate ticket rows into their originals.
+
+duplicateTicket used to write up to 9 physical copies of a ticket (isDuplicate=True,
+originalTicketId=<id>). Tickets now carry a `quantity` instead. This script:
+- scans the tickets table for isDuplicate rows
+- sets quantity = 1 + number of copies on each original (and totalWinAmount if settled)
+- deletes the copies
+
+Copies whose original no longer exists are left untouched and reported.
+Runs as a dry run unless --apply is given.
+
+Usage examples:
+  python scripts/fold_duplicate_tickets.py --table xoso-tickets-dev
+  python scripts/fold_duplicate_tickets.py --table xoso-tickets-prod --region ap-southeast-1 --apply
+
+Requires:
+  pip install boto3
+"""
+import argparse
+from collections import defaultdict
+from decimal import Decimal
+
+import boto3
+from boto3.dynamodb.conditions import Attr
+
+
+def scan_duplicates(table):
+    """Return {originalTicketId: [duplicate ticketIds]} for every legacy duplicate row"""
+    duplicates = defaultdict(list)
+    scan_kwargs = {
+        'FilterExpression': Attr('isDuplicate').eq(True),
+        'ProjectionExpression': 'ticketId, originalTicketId'
+    }
+
+    while True:
+        response = table.scan(**scan_kwargs)
+        for item in response.get('Items', []):
+            if item.get('originalTicketId'):
+                duplicates[item['originalTicketId']].append(item['ticketId'])
+
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            break
+        scan_kwargs['ExclusiveStartKey'] = last_key
+
+    return duplicates
+
+
+def fold_original(table, original_id, copy_ids, apply):
+    """
+    Fold the copies of one original. Returns True if the original exists.
+    """
+    original = table.get_item(Key={'ticketId': original_id}).get('Item')
+    if not original:
+        print(f"⚠️ Original {original_id} not found, leaving {len(copy_ids)} copies in place")
+        return False
+
+    quantity = int(original.get('quantity', 1)) + len(copy_ids)
+    print(f"{original_id}: {len(copy_ids)} copies -> quantity {quantity}")
+
+    if not apply:
+        return True
+
+    update_expression = 'SET quantity = :quantity'
+    expression_values = {':quantity': quantity}
+    if original.get('isWinner'):
+        update_expression += ', totalWinAmount = :total'
+        expression_values[':total'] = Decimal(str(original.get('winAmount', 0))) * quantity
+
+    table.update_item(
+        Key={'ticketId': original_id},
+        UpdateExpression=update_expression,
+        ExpressionAttributeValues=expression_values
+    )
+
+    with table.batch_writer() as batch:
+        for copy_id in copy_ids:
+            batch.delete_item(Key={'ticketId': copy_id})
+
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fold legacy duplicate ticket rows into quantity records')
+    parser.add_argument('--table', required=True, help='Tickets table name, e.g. xoso-tickets-dev')
+    parser.add_argument('--region', default='ap-southeast-1')
+    parser.add_argument('--apply', action='store_true', help='Write changes (default is a dry run)')
+    args = parser.parse_args()
+
+    table = boto3.resource('dynamodb', region_name=args.region).Table(args.table)
+
+    duplicates = scan_duplicates(table)
+    print(f"Found {sum(len(ids) for ids in duplicates.values())} duplicate rows for {len(duplicates)} originals")
+
+    folded = 0
+    for original_id, copy_ids in duplicates.items():
+        if fold_original(table, original_id, copy_ids, args.apply):
+            folded += 1
+
+    action = 'Folded' if args.apply else 'Would fold'
+    print(f"{action} {folded} originals")
+
+
+if __name__ == '__main__':
+    main()
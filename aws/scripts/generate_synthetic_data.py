@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Generate reproducible synthetic draws and tickets.
+
+Draws follow the draw calendar (provinces per weekday, holiday suspensions) with each
+region's real prize tiers. Tickets are pending, spread over those draws, with Zipf-like
+users, favoured number endings and multi-copy purchases (see functions/synthetic_data.py).
+
+Outputs:
+  jsonl    <out-dir>/draws.jsonl and <out-dir>/tickets.jsonl
+  parquet  <out-dir>/draws.parquet and <out-dir>/tickets.parquet (prize maps as JSON strings)
+  storage  straight into the STORAGE_BACKEND backend (memory is pointless here; use sqlite
+           with STORAGE_SQLITE_PATH, or dynamodb with the DYNAMODB_* table variables)
+
+Usage examples:
+  python scripts/generate_synthetic_data.py --start 2025-03-01 --end 2025-03-07 --tickets 1000000
+  python scripts/generate_synthetic_data.py --tickets 5000000 --users 500000 --format parquet --out-dir /tmp/xoso
+  STORAGE_BACKEND=sqlite STORAGE_SQLITE_PATH=/tmp/xoso.sqlite3 python scripts/generate_synthetic_data.py --format storage
+
+Requires:
+  nothing beyond the standard library; numpy makes generation much faster,
+  pyarrow is needed for --format parquet, boto3 for the dynamodb backend
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions import synthetic_data
+from functions.synthetic_data import (
+    TICKET_COLUMNS, generate_draws, generate_tickets, generate_users, load_into_storage, make_rng, write_jsonl,
+    write_parquet
+)
+
+
+def main():
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+    parser = argparse.ArgumentParser(description='Generate synthetic draws and tickets')
+    parser.add_argument('--start', default=(yesterday - datetime.timedelta(days=6)).isoformat(), help='First draw date (YYYY-MM-DD)')
+    parser.add_argument('--end', default=yesterday.isoformat(), help='Last draw date (YYYY-MM-DD)')
+    parser.add_argument('--regions', nargs='*', choices=['south', 'central', 'north'], help='Only these regions')
+    parser.add_argument('--tickets', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--duplicate-rate', type=float, default=synthetic_data.DUPLICATE_RATE)
+    parser.add_argument('--lucky-share', type=float, default=synthetic_data.LUCKY_SHARE)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--format', choices=['jsonl', 'parquet', 'storage'], default='jsonl')
+    parser.add_argument('--out-dir', default='.')
+    args = parser.parse_args()
+
+    started = time.time()
+    rng = make_rng(args.seed)
+    draws = generate_draws(args.start, args.end, rng, regions=args.regions)
+    if not draws:
+        sys.exit(f"No draws between {args.start} and {args.end}")
+    users = generate_users(args.users, seed=args.seed)
+    tickets = generate_tickets(
+        args.tickets, draws, users, rng, duplicate_rate=args.duplicate_rate, lucky_share=args.lucky_share
+    )
+
+    if args.format == 'storage':
+        from functions.storage import get_storage
+        stored_draws, stored_tickets = load_into_storage(get_storage(), draws, tickets)
+        print(f"Stored {stored_draws} draws and {stored_tickets} tickets")
+    else:
+        os.makedirs(args.out_dir, exist_ok=True)
+        draws_path = os.path.join(args.out_dir, f"draws.{args.format}")
+        tickets_path = os.path.join(args.out_dir, f"tickets.{args.format}")
+        if args.format == 'jsonl':
+            write_jsonl(draws_path, [draws])
+            written = write_jsonl(tickets_path, tickets)
+        else:
+            write_parquet(draws_path, [draws])
+            written = write_parquet(tickets_path, tickets, columns=TICKET_COLUMNS)
+        print(f"Wrote {len(draws)} draws to {draws_path} and {written} tickets to {tickets_path}")
+
+    engine = 'numpy' if synthetic_data.np is not None else 'random'
+    print(f"Generated with {engine} (seed {args.seed}) in {time.time() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
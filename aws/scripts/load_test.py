@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Replay a draw night against local stand-ins and report throughput, latency and AWS call counts
+per handler.
+
+Stand-ins:
+  DynamoDB          moto (tables mirror serverless-*.yml, indexes included)
+  xoso188.net       local HTTP server (RESULTS_API_BASE), results published --publish-delay
+                    seconds into the storm
+  SNS, Lambda       fake clients installed in the bootstrap client cache; the async
+                    fetchDailyResults invocations checkTicket makes run on a background pool
+  SQS               unset NOTIFICATION_QUEUE_URL, so digests are delivered inline
+
+Load profile:
+  1. store    --tickets tickets from --users users (storeTicket, --batch-size per request)
+  2. storm    --storm-requests checkTicket polls on random tickets right after the draw
+  3. settle   fetchDailyResults for the draw date, then the processWinners cron
+  4. history  --history-requests getUserTickets calls
+Each phase runs with --concurrency client threads.
+
+Usage examples:
+  python scripts/load_test.py
+  python scripts/load_test.py --tickets 200000 --users 40000 --storm-requests 100000 --concurrency 64
+  python scripts/load_test.py --json-out load-report.json
+
+Requires:
+  pip install boto3 moto requests -r requirements.txt
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+AWS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AWS_DIR)
+
+LOCAL_ENVIRONMENT = {
+    'DYNAMODB_TICKETS_TABLE': 'xoso-tickets-load',
+    'DYNAMODB_RESULTS_TABLE': 'xoso-results-load',
+    'DYNAMODB_TICKET_DETAILS_TABLE': 'xoso-tickets-load-details',
+    'DYNAMODB_DEVICES_TABLE': 'xoso-devices-load',
+    'DYNAMODB_LEASES_TABLE': 'xoso-leases-load',
+    'REGION': 'ap-southeast-1',
+    'AWS_DEFAULT_REGION': 'ap-southeast-1',
+    'AWS_ACCESS_KEY_ID': 'load',
+    'AWS_SECRET_ACCESS_KEY': 'load',
+    'STAGE': 'load',
+    'STORAGE_BACKEND': 'dynamodb'
+}
+
+# (table, key schema, attribute types, GSIs as (name, key schema, projection))
+TABLES = [
+    ('DYNAMODB_TICKETS_TABLE', [('ticketId', 'HASH')],
+     {'ticketId': 'S', 'userId': 'S', 'drawDate': 'S', 'province': 'S'},
+     [('UserIndex', [('userId', 'HASH')], {'ProjectionType': 'ALL'}),
+      ('DrawDatePendingIndex', [('drawDate', 'HASH'), ('province', 'RANGE')], {
+          'ProjectionType': 'INCLUDE',
+          'NonKeyAttributes': ['userId', 'ticketNumber', 'region', 'quantity', 'deviceToken', 'hasBeenChecked', 'isPending']
+      })]),
+    ('DYNAMODB_TICKET_DETAILS_TABLE', [('ticketId', 'HASH')], {'ticketId': 'S'}, []),
+    ('DYNAMODB_DEVICES_TABLE', [('deviceToken', 'HASH')], {'deviceToken': 'S'}, []),
+    ('DYNAMODB_LEASES_TABLE', [('leaseId', 'HASH')], {'leaseId': 'S'}, []),
+    ('DYNAMODB_RESULTS_TABLE', [('province', 'HASH'), ('date', 'RANGE')],
+     {'province': 'S', 'date': 'S', 'region': 'S'},
+     [('RegionDateIndex', [('region', 'HASH'), ('date', 'RANGE')], {'ProjectionType': 'ALL'}),
+      ('DateIndex', [('date', 'HASH')], {'ProjectionType': 'ALL'})])
+]
+
+class Recorder:
+    """Latencies and AWS calls per handler; calls are attributed to the calling thread's handler"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.phase = None
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.calls = defaultdict(Counter)
+        self.phase_walls = {}
+
+    def current(self):
+        # Worker threads spawned inside a handler (parallel writers, heartbeats) fall back to the phase
+        return getattr(self.local, 'handler', None) or self.phase
+
+    def count(self, service, operation):
+        with self.lock:
+            self.calls[self.current()][f"{service}:{operation}"] += 1
+
+    def run(self, name, handler, event):
+        self.local.handler = name
+        start = time.perf_counter()
+        try:
+            response = handler(event, None)
+            failed = not isinstance(response, dict) or response.get('statusCode', 200) >= 500
+        except Exception:
+            failed = True
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.local.handler = None
+        with self.lock:
+            self.latencies[name].append(elapsed)
+            if failed:
+                self.errors[name] += 1
+
+
+class FakeSns:
+    class EndpointDisabledException(Exception):
+        pass
+
+    class NotFoundException(Exception):
+        pass
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.exceptions = self
+
+    def create_platform_endpoint(self, PlatformApplicationArn, Token, CustomUserData=None):
+        self.recorder.count('sns', 'CreatePlatformEndpoint')
+        return {'EndpointArn': f"{PlatformApplicationArn}/endpoint/{Token[:16]}"}
+
+    def set_endpoint_attributes(self, EndpointArn, Attributes):
+        self.recorder.count('sns', 'SetEndpointAttributes')
+        return {}
+
+    def publish(self, **kwargs):
+        self.recorder.count('sns', 'Publish')
+        return {'MessageId': f"load-{random.getrandbits(64):016x}"}
+
+
+class FakeLambda:
+    """Event invocations of fetchDailyResults run in the background, like the real async invoke"""
+
+    def __init__(self, recorder, handlers, pool):
+        self.recorder = recorder
+        self.handlers = handlers
+        self.pool = pool
+        self.futures = []
+
+    def invoke(self, FunctionName, InvocationType='RequestResponse', Payload='{}'):
+        self.recorder.count('lambda', 'Invoke')
+        name = FunctionName.rsplit('-', 1)[-1]
+        handler = self.handlers.get(name)
+        if handler:
+            self.futures.append(self.pool.submit(self.recorder.run, f"{name} (async)", handler, json.loads(Payload)))
+        return {'StatusCode': 202}
+
+
+def build_draw_payload(rng, region, draw_date):
+    from functions.synthetic_data import PRIZE_LAYOUT, generate_prizes
+
+    # detail[] lists each tier's numbers comma-separated, in PRIZE_LAYOUT order
+    prizes = generate_prizes(region, rng)
+    detail = [','.join(prizes[tier]) for tier, _, _ in PRIZE_LAYOUT[region]]
+    return {'turnNum': draw_date.strftime('%d/%m/%Y'), 'detail': json.dumps(detail)}
+
+
+def start_results_server(draws_by_code, published):
+    """Fake xoso188 history API; serves a province's draw once published is set"""
+    request_count = Counter()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            api_code = self.path.rstrip('/').rsplit('/', 1)[-1]
+            request_count[api_code] += 1
+            issues = [draws_by_code[api_code]] if published.is_set() and api_code in draws_by_code else []
+            body = json.dumps({'success': True, 't': {'issueList': issues}}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, request_count
+
+
+def create_tables(dynamodb):
+    for env_name, key_schema, attributes, indexes in TABLES:
+        params = {
+            'TableName': os.environ[env_name],
+            'KeySchema': [{'AttributeName': name, 'KeyType': key_type} for name, key_type in key_schema],
+            'AttributeDefinitions': [{'AttributeName': name, 'AttributeType': t} for name, t in attributes.items()],
+            'BillingMode': 'PAY_PER_REQUEST'
+        }
+        if indexes:
+            params['GlobalSecondaryIndexes'] = [
+                {
+                    'IndexName': index_name,
+                    'KeySchema': [{'AttributeName': name, 'KeyType': key_type} for name, key_type in index_keys],
+                    'Projection': projection
+                }
+                for index_name, index_keys, projection in indexes
+            ]
+        dynamodb.create_table(**params)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def run_phase(recorder, name, jobs, concurrency, quiet):
+    """Run (handler_name, handler, event) jobs on concurrency threads; records the phase wall time"""
+    recorder.phase = name
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull if quiet else sys.stdout):
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for handler_name, handler, event in jobs:
+                executor.submit(recorder.run, handler_name, handler, event)
+    recorder.phase_walls[name] = time.perf_counter() - start
+
+
+def build_report(recorder):
+    report = {}
+    for name, latencies in recorder.latencies.items():
+        ordered = sorted(latencies)
+        wall = recorder.phase_walls.get(name) or sum(ordered) / 1000
+        report[name] = {
+            'calls': len(ordered),
+            'errors': recorder.errors[name],
+            'throughputPerSecond': len(ordered) / wall if wall else 0.0,
+            'p50Ms': percentile(ordered, 0.50),
+            'p95Ms': percentile(ordered, 0.95),
+            'p99Ms': percentile(ordered, 0.99),
+            'awsCalls': dict(recorder.calls.get(name, {}))
+        }
+    unattributed = {name: dict(calls) for name, calls in recorder.calls.items() if name not in report}
+    return report, unattributed
+
+
+def print_report(report, unattributed, api_requests):
+    print(f"{'handler':34s} {'calls':>8s} {'errors':>7s} {'req/s':>9s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}")
+    for name, row in report.items():
+        print(f"{name:34s} {row['calls']:8d} {row['errors']:7d} {row['throughputPerSecond']:9.1f} "
+              f"{row['p50Ms']:9.2f} {row['p95Ms']:9.2f} {row['p99Ms']:9.2f}")
+    print()
+    print('AWS calls per handler:')
+    for name, row in report.items():
+        calls = ', '.join(f"{op}={n}" for op, n in sorted(row['awsCalls'].items()))
+        print(f"  {name}: {calls or '-'}")
+    for name, calls in unattributed.items():
+        print(f"  {name} (worker threads): {', '.join(f'{op}={n}' for op, n in sorted(calls.items()))}")
+    print(f"Results API requests: {sum(api_requests.values())} across {len(api_requests)} provinces")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local end-to-end load test of a draw night')
+    parser.add_argument('--tickets', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=4000)
+    parser.add_argument('--batch-size', type=int, default=1, help='Tickets per storeTicket request')
+    parser.add_argument('--storm-requests', type=int, default=10000, help='checkTicket polls after the draw')
+    parser.add_argument('--publish-delay', type=float, default=2.0, help='Seconds into the storm before results appear')
+    parser.add_argument('--history-requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--verbose', action='store_true', help='Keep handler logs')
+    parser.add_argument('--json-out', help='Also write the report to this file')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    os.environ.update(LOCAL_ENVIRONMENT)
+    published = threading.Event()
+
+    from moto import mock_aws
+
+    with mock_aws():
+        import boto3
+
+        create_tables(boto3.client('dynamodb', region_name=os.environ['REGION']))
+
+        # provinces reads RESULTS_API_BASE at import, so the fake API must be up first
+        draws_by_code = {}
+        server, api_requests = start_results_server(draws_by_code, published)
+        os.environ['RESULTS_API_BASE'] = f"http://127.0.0.1:{server.server_port}"
+
+        from functions.draw_calendar import get_draws
+        from functions.provinces import get_province_api_code
+
+        # The draw is yesterday's, so every handler considers its results due
+        draw_day = datetime.datetime.now().date() - datetime.timedelta(days=1)
+        draw_date = draw_day.isoformat()
+        draws = get_draws(draw_date)
+        if not draws:
+            sys.exit(f"No draws on {draw_date} (holiday suspension); nothing to replay")
+        for draw in draws:
+            draws_by_code[get_province_api_code(draw['province'])] = build_draw_payload(rng, draw['region'], draw_day)
+
+        # Handler modules read their environment and create tables at import
+        from functions import bootstrap
+        from functions import check_ticket, fetch_daily_results, get_user_tickets, process_winners, store_ticket
+        from functions.storage import get_storage
+
+        recorder = Recorder()
+        async_pool = ThreadPoolExecutor(max_workers=4)
+        fake_lambda = FakeLambda(recorder, {'fetchDailyResults': fetch_daily_results.handler}, async_pool)
+        bootstrap._clients['sns'] = FakeSns(recorder)
+        bootstrap._clients['lambda'] = fake_lambda
+        for client in (bootstrap.get_client('dynamodb'), bootstrap.get_resource('dynamodb').meta.client):
+            client.meta.events.register(
+                'before-call.dynamodb', lambda model, **kwargs: recorder.count('dynamodb', model.name)
+            )
+
+        # 1. Tickets stored over the day
+        users = [(f"load-user-{i}", f"{rng.getrandbits(128):032x}") for i in range(args.users)]
+        tickets = []
+        for _ in range(args.tickets):
+            user_id, device_token = rng.choice(users)
+            draw = rng.choice(draws)
+            digits = 5 if draw['region'] == 'north' else 6
+            tickets.append({
+                'userId': user_id,
+                'deviceToken': device_token,
+                'ticketNumber': f"{rng.randrange(10 ** digits):0{digits}d}",
+                'province': draw['province'],
+                'drawDate': draw_date,
+                'region': draw['region']
+            })
+        batches = [tickets[i:i + args.batch_size] for i in range(0, len(tickets), args.batch_size)]
+        run_phase(recorder, 'store_ticket', (
+            ('store_ticket', store_ticket.handler,
+             {'body': json.dumps(batch[0] if len(batch) == 1 else {'tickets': batch})})
+            for batch in batches
+        ), args.concurrency, not args.verbose)
+
+        ticket_ids = []
+        for user_id, _ in users:
+            items, start_key = [], None
+            while True:
+                page, start_key = get_storage().query_user_tickets(user_id, start_key=start_key)
+                items.extend(page)
+                if not start_key:
+                    break
+            ticket_ids.extend(item['ticketId'] for item in items)
+
+        # 2. Polling storm right after the draw; results appear on the fake API after the delay
+        threading.Timer(args.publish_delay, published.set).start()
+        run_phase(recorder, 'check_ticket', (
+            ('check_ticket', check_ticket.handler, {'body': json.dumps({'ticketId': rng.choice(ticket_ids)})})
+            for _ in range(args.storm_requests)
+        ), args.concurrency, not args.verbose)
+        published.set()
+        wait(fake_lambda.futures)
+
+        # 3. Settlement
+        run_phase(recorder, 'fetch_daily_results', [
+            ('fetch_daily_results', fetch_daily_results.handler, {'date': draw_date})
+        ], 1, not args.verbose)
+        run_phase(recorder, 'process_winners', [
+            ('process_winners', process_winners.handler, {})
+        ], 1, not args.verbose)
+
+        # 4. History reads
+        run_phase(recorder, 'get_user_tickets', (
+            ('get_user_tickets', get_user_tickets.handler, {'pathParameters': {'userId': rng.choice(users)[0]}})
+            for _ in range(args.history_requests)
+        ), args.concurrency, not args.verbose)
+
+        async_pool.shutdown()
+        server.shutdown()
+
+    report, unattributed = build_report(recorder)
+    print_report(report, unattributed, api_requests)
+    if args.json_out:
+        with open(args.json_out, 'w') as f:
+            json.dump({'handlers': report, 'workerThreads': unattributed,
+                       'resultsApiRequests': dict(api_requests), 'arguments': vars(args)}, f, indent=2)
+        print(f"Report written to {args.json_out}")
+
+
+if __name__ == '__main__':
+    main()
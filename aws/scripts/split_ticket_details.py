@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Move cold ticket attributes (ocrRawText, userEmail) into the ticket-details table.
+
+storeTicket used to write these directly into the ticket item, so every UserIndex read and
+every index write paid for them. New tickets keep them in the side table; this script
+migrates existing items:
+- scans the tickets table for items that still carry a cold attribute
+- writes {ticketId, ocrRawText, userEmail, expiresAt} to the details table; expiresAt is the
+  ticket's own expiresAt if it has one, else derived from its drawDate like storeTicket does
+- removes the attributes from the ticket item
+
+Runs as a dry run unless --apply is given. Safe to re-run.
+
+Usage examples:
+  python scripts/split_ticket_details.py --stage dev
+  python scripts/split_ticket_details.py --stage prod --region ap-southeast-1 --apply
+
+Requires:
+  pip install boto3
+"""
+import argparse
+import os
+import sys
+
+import boto3
+from boto3.dynamodb.conditions import Attr
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from functions.ticket_archive import get_details_expiry
+
+COLD_ATTRIBUTES = ['ocrRawText', 'userEmail']
+
+
+def scan_items_with_cold_attributes(table):
+    """Yield ticket items that still carry at least one cold attribute"""
+    condition = Attr(COLD_ATTRIBUTES[0]).exists()
+    for attribute in COLD_ATTRIBUTES[1:]:
+        condition = condition | Attr(attribute).exists()
+
+    scan_kwargs = {
+        'FilterExpression': condition,
+        'ProjectionExpression': ', '.join(['ticketId', 'drawDate', 'expiresAt'] + COLD_ATTRIBUTES)
+    }
+
+    while True:
+        response = table.scan(**scan_kwargs)
+        for item in response.get('Items', []):
+            yield item
+
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            break
+        scan_kwargs['ExclusiveStartKey'] = last_key
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move cold ticket attributes into the ticket-details table')
+    parser.add_argument('--stage', required=True, help='Deployment stage, e.g. dev or prod')
+    parser.add_argument('--service', default='xoso')
+    parser.add_argument('--region', default='ap-southeast-1')
+    parser.add_argument('--apply', action='store_true', help='Write changes (default is a dry run)')
+    args = parser.parse_args()
+
+    dynamodb = boto3.resource('dynamodb', region_name=args.region)
+    tickets_table = dynamodb.Table(f"{args.service}-tickets-{args.stage}")
+    details_table = dynamodb.Table(f"{args.service}-tickets-{args.stage}-details")
+
+    migrated = 0
+    for item in scan_items_with_cold_attributes(tickets_table):
+        details = {attribute: item[attribute] for attribute in COLD_ATTRIBUTES if item.get(attribute)}
+        migrated += 1
+
+        if not args.apply:
+            continue
+
+        # Details first, so an interrupted run never loses data
+        if details:
+            details['ticketId'] = item['ticketId']
+            details['expiresAt'] = item.get('expiresAt') or get_details_expiry(item.get('drawDate'))
+            details_table.put_item(Item=details)
+
+        tickets_table.update_item(
+            Key={'ticketId': item['ticketId']},
+            UpdateExpression='REMOVE ' + ', '.join(COLD_ATTRIBUTES)
+        )
+
+        if migrated % 500 == 0:
+            print(f"Migrated {migrated} tickets...")
+
+    action = 'Migrated' if args.apply else 'Would migrate'
+    print(f"{action} {migrated} tickets")
+
+
+if __name__ == '__main__':
+    main()
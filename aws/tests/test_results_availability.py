@@ -0,0 +1,42 @@
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from functions import results_availability
+from functions.draw_calendar import VIETNAM_TZ
+
+
+def frozen_now(now):
+    """datetime stand-in whose now() is fixed (Vietnam time)"""
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now.astimezone(tz) if tz else now.replace(tzinfo=None)
+    return mock.patch.object(results_availability, 'datetime', FrozenDatetime)
+
+
+class ShouldTriggerBackgroundFetchTest(unittest.TestCase):
+    def test_today_before_first_draw(self):
+        with frozen_now(datetime(2025, 3, 5, 10, 0, tzinfo=VIETNAM_TZ)):
+            self.assertFalse(results_availability.should_trigger_background_fetch('2025-03-05'))
+
+    def test_today_after_first_draw(self):
+        with frozen_now(datetime(2025, 3, 5, 16, 30, tzinfo=VIETNAM_TZ)):
+            self.assertTrue(results_availability.should_trigger_background_fetch('2025-03-05'))
+
+    def test_today_suspended(self):
+        # Tết: no draws at all, so nothing to fetch even in the evening
+        with frozen_now(datetime(2026, 2, 17, 20, 0, tzinfo=VIETNAM_TZ)):
+            self.assertFalse(results_availability.should_trigger_background_fetch('2026-02-17'))
+
+    def test_past_day(self):
+        with frozen_now(datetime(2025, 3, 6, 8, 0, tzinfo=VIETNAM_TZ)):
+            self.assertTrue(results_availability.should_trigger_background_fetch('2025-03-05'))
+
+    def test_future_day(self):
+        with frozen_now(datetime(2025, 3, 5, 20, 0, tzinfo=VIETNAM_TZ)):
+            self.assertFalse(results_availability.should_trigger_background_fetch('2025-03-06'))
+
+
+if __name__ == '__main__':
+    unittest.main()